@@ -1,28 +1,48 @@
+import os
+import asyncio
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
-from config import OPENROUTER_API_KEY
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from typing_extensions import NotRequired
+from config import (
+    OPENROUTER_API_KEY, MEMORY_DB_PATH, MEMORY_MAX_TOKENS,
+    MEMORY_KEEP_TOOL_RESULTS, MEMORY_TOOL_RESULT_CHARS
+)
 from agent.prompt import get_prompt_template
 from tools.vst_tools import (
-    list_tracks_and_vsts, list_vst_parameters, set_multiple_vst_parameters,
+    list_tracks_and_vsts, list_vst_parameters, search_vst_parameters, set_multiple_vst_parameters,
     add_vst_to_track, remove_vst_from_track
 )
-from tools.audio_tools import analyze_track_audio
-from tools.ml_tools import analyze_uploaded_audio, suggest_audio_processing
+from tools.audio_tools import analyze_track_audio, analyze_tracks_audio, analyze_track_live
+from tools.ml_tools import analyze_uploaded_audio, suggest_audio_processing, separate_audio_stems
+from tools.batch_tools import analyze_audio_folder
+from tools.eq_tools import evaluate_eq_candidates
+from core.concurrency import concurrent_tool
+from core.memory import make_pre_model_hook, make_prompt
 from i18n.utils import i18n
 
 # --- 1. Configuración de herramientas ---
+# Cada herramienta tiene variante asíncrona, así que las llamadas independientes de un
+# mismo paso del agente se ejecutan a la vez. Las lecturas de Reaper van en paralelo, las
+# mutaciones en exclusiva y el análisis DSP en un pool de procesos.
 tools = [
-    list_tracks_and_vsts,
-    list_vst_parameters,
-    set_multiple_vst_parameters,
-    add_vst_to_track,
-    remove_vst_from_track,
-    analyze_track_audio,
-    analyze_uploaded_audio,
-    suggest_audio_processing,
-    # separate_audio_full
+    concurrent_tool(list_tracks_and_vsts, kind="reaper"),
+    concurrent_tool(list_vst_parameters, kind="reaper"),
+    concurrent_tool(search_vst_parameters, kind="reaper"),
+    concurrent_tool(set_multiple_vst_parameters, kind="reaper", write=True),
+    concurrent_tool(add_vst_to_track, kind="reaper", write=True),
+    concurrent_tool(remove_vst_from_track, kind="reaper", write=True),
+    # Renderizan con acceso exclusivo a Reaper y analizan en el pool DSP
+    concurrent_tool(analyze_track_audio, kind="local"),
+    concurrent_tool(analyze_tracks_audio, kind="local"),
+    concurrent_tool(analyze_track_live, kind="local"),
+    concurrent_tool(evaluate_eq_candidates, kind="local"),
+    concurrent_tool(analyze_uploaded_audio, kind="local"),
+    concurrent_tool(suggest_audio_processing, kind="local"),
+    concurrent_tool(analyze_audio_folder, kind="local"),
+    concurrent_tool(separate_audio_stems, kind="local"),
 ]
 
 # --- 2. Configuración del modelo ---
@@ -31,13 +51,48 @@ llm = ChatOpenAI(
     temperature=0.1,
     api_key=SecretStr(OPENROUTER_API_KEY or ""),
     base_url="https://openrouter.ai/api/v1",
+    # Uso de tokens también en streaming, para la instrumentación por turno
+    stream_usage=True,
 )
 
 # --- 3. Configuración de memoria con LangGraph ---
-memory = MemorySaver()
+# Checkpointer persistente en SQLite; sin langgraph-checkpoint-sqlite la memoria es sólo en proceso.
+try:
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except ImportError:
+    AsyncSqliteSaver = None
+
+memory = None
+_memory_lock = asyncio.Lock()
+
+async def get_checkpointer():
+    """Crea el checkpointer en el primer uso: la conexión aiosqlite pertenece al event loop activo."""
+    global memory
+    async with _memory_lock:
+        if memory is None:
+            if AsyncSqliteSaver is None:
+                print("Aviso: langgraph-checkpoint-sqlite no está instalado; la memoria no persistirá.")
+                memory = MemorySaver()
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(MEMORY_DB_PATH)), exist_ok=True)
+                memory = AsyncSqliteSaver(await aiosqlite.connect(MEMORY_DB_PATH))
+                await memory.setup()
+    return memory
+
+class EQnityState(AgentState):
+    # Resumen acumulado de los mensajes que pre_model_hook retira del estado (core.memory.SUMMARY_KEY)
+    summary: NotRequired[dict]
+
+# Acota el historial guardado y el que recibe el modelo en cada paso
+pre_model_hook = make_pre_model_hook(
+    max_tokens=MEMORY_MAX_TOKENS,
+    keep_tool_results=MEMORY_KEEP_TOOL_RESULTS,
+    tool_result_chars=MEMORY_TOOL_RESULT_CHARS,
+)
 
 # --- 4. Función para crear/actualizar el agente con el idioma correcto ---
-def create_agent_with_language(language: str = "es"):
+def create_agent_with_language(language: str = "es", checkpointer=None):
     """Crea o actualiza el agente con el prompt en el idioma especificado"""
     if language is None:
         language = i18n.current_lang
@@ -47,15 +102,20 @@ def create_agent_with_language(language: str = "es"):
     return create_react_agent(
         llm,
         tools,
-        checkpointer=memory,
-        prompt=prompt_template  # LangGraph usa state_schema en lugar de prompt
+        checkpointer=checkpointer,
+        prompt=make_prompt(prompt_template),
+        pre_model_hook=pre_model_hook,
+        state_schema=EQnityState,
     )
 
-# --- 5. Crear agente inicial ---
-agent_executor = create_agent_with_language()
+# --- 5. Agentes precompilados por idioma (compartidos por todas las sesiones) ---
+SUPPORTED_LANGUAGES = ("es", "en")
+_agents = {}
 
-# --- 6. Función para actualizar el idioma del agente ---
-def update_agent_language(language: str):
-    """Actualiza el idioma del agente"""
-    global agent_executor
-    agent_executor = create_agent_with_language(language)
\ No newline at end of file
+async def get_agent_executor(language: str = None):
+    """Devuelve el agente del idioma pedido; la primera llamada compila los de todos los idiomas."""
+    if not _agents:
+        checkpointer = await get_checkpointer()
+        for lang in SUPPORTED_LANGUAGES:
+            _agents.setdefault(lang, create_agent_with_language(lang, checkpointer))
+    return _agents.get(language or i18n.current_lang, _agents["es"])
@@ -0,0 +1,128 @@
+"""
+Validación del modelo offline de ReaEQ (core.eq_model.DryRender).
+
+DryRender.evaluate no filtra el audio: multiplica los espectros por bloque del
+render seco por la respuesta en magnitud de cada curva. Aquí se compara cada
+métrica del modelo con la misma métrica medida sobre el audio filtrado en el
+tiempo con core.eq_model.apply_curve:
+
+- lufs: core.loudness.measure_loudness sobre el audio filtrado (medidor
+  independiente, filtro K en el tiempo).
+- band_energy: FFT del audio filtrado completo, sin trocear en bloques.
+- centroid: DryRender del audio filtrado evaluado sin curva (mismos bloques;
+  aísla el efecto de no arrastrar la cola del filtro entre bloques).
+
+La diferencia debe quedar en décimas de dB (o de semitono para el centroide),
+como afirma el docstring del módulo; en bandas casi vacías basta con que la
+energía de la banda difiera menos del 0.1 % de la total. Se mide además el
+coste de evaluar candidatos con el modelo frente a filtrar y medir cada uno.
+
+Uso:
+    python -m benchmarks.bench_eq_model [archivo1.wav archivo2.wav ...]
+
+Devuelve código de salida 1 si alguna métrica supera la tolerancia.
+"""
+import sys
+import time
+import numpy as np
+import soundfile as sf
+from core.eq_model import DryRender, apply_curve
+from core.loudness import measure_loudness
+from benchmarks.bench_features import synthetic_signals
+
+# dB para band_energy, LU para lufs, semitonos para el centroide
+EQ_MODEL_ATOL = 0.5
+# Una banda casi vacía (un notch sobre un seno puro la deja 25 dB por debajo del
+# total) amplifica en dB diferencias mínimas de energía: se acepta también un
+# error absoluto del 0.1 % de la energía total
+BAND_SHARE_ATOL = 1e-3
+BAND = (200.0, 2000.0)
+
+CURVES = {
+    "sin EQ": [],
+    "mezcla": [
+        {"type": "high_pass", "freq_hz": 80, "q": 0.707},
+        {"type": "peak", "freq_hz": 400, "gain_db": -4, "bandwidth_oct": 1.5},
+        {"type": "high_shelf", "freq_hz": 6000, "gain_db": 3, "q": 0.707},
+    ],
+    "realce grave +12 dB": [{"type": "peak", "freq_hz": 100, "gain_db": 12, "q": 4.0}],
+    "paso bajo 2 kHz": [{"type": "low_pass", "freq_hz": 2000, "q": 0.707}],
+    "notch 440 Hz": [{"type": "notch", "freq_hz": 440, "q": 8.0}],
+}
+TARGETS = [
+    {"metric": "centroid", "value": 1000.0},
+    {"metric": "band_energy", "low_hz": BAND[0], "high_hz": BAND[1], "value": 0.0},
+    {"metric": "lufs", "value": -23.0},
+]
+
+
+def _band_energy_db(audio, sr, low, high):
+    """Energía entre low y high respecto a la total (dB), con la FFT de toda la señal."""
+    power = (np.abs(np.fft.rfft(audio, axis=0)) ** 2).sum(axis=1)
+    freqs = np.fft.rfftfreq(audio.shape[0], 1.0 / sr)
+    in_band = power[(freqs >= low) & (freqs <= high)].sum()
+    return 10.0 * np.log10(max(in_band, 1e-20) / max(power.sum(), 1e-20))
+
+
+def measured_metrics(audio, sr, bands):
+    """Métricas del audio filtrado en el tiempo: (centroide Hz, band_energy dB, LUFS)."""
+    filtered = apply_curve(audio, sr, bands)
+    centroid = DryRender(filtered, sr).evaluate([[]], TARGETS[:1])[0]["values"][0]
+    return centroid, _band_energy_db(filtered, sr, *BAND), measure_loudness(filtered, sr)["integrated"]
+
+
+def compare(name, audio, sr):
+    audio = audio if audio.ndim == 2 else audio[:, np.newaxis]
+    dry = DryRender(audio, sr)
+    model = dry.evaluate(list(CURVES.values()), TARGETS)
+    failures = 0
+    print(f"\n== {name}: {audio.shape[0] / sr:.1f} s @ {sr} Hz, {audio.shape[1]} canal(es)")
+    print(f"  {'curva':<22}{'Δ centroide':>13}{'Δ banda':>10}{'Δ LUFS':>9}")
+    for (label, bands), result in zip(CURVES.items(), model):
+        centroid, band_db, lufs = measured_metrics(audio, sr, bands)
+        m_centroid, m_band, m_lufs = result["values"]
+        deltas = (
+            12.0 * abs(np.log2(max(m_centroid, 1e-3) / max(centroid, 1e-3))),
+            abs(m_band - band_db),
+            abs(m_lufs - lufs) if np.isfinite(lufs) or np.isfinite(m_lufs) else 0.0,
+        )
+        share_err = abs(10.0 ** (m_band / 10.0) - 10.0 ** (band_db / 10.0))
+        ok = (deltas[0] <= EQ_MODEL_ATOL and deltas[2] <= EQ_MODEL_ATOL
+              and (deltas[1] <= EQ_MODEL_ATOL or share_err <= BAND_SHARE_ATOL))
+        failures += not ok
+        print(f"  {label:<22}{deltas[0]:>10.3f} st{deltas[1]:>7.3f} dB{deltas[2]:>6.3f} LU  {'OK' if ok else 'FALLO'}")
+    return failures, dry
+
+
+def time_candidates(name, dry, audio, sr, count=32):
+    curves = [[{"type": "peak", "freq_hz": 100 * 1.2 ** k, "gain_db": 6, "q": 1.0}] for k in range(count)]
+    start = time.perf_counter()
+    dry.evaluate(curves, TARGETS)
+    t_model = time.perf_counter() - start
+    start = time.perf_counter()
+    for bands in curves:
+        measured_metrics(audio, sr, bands)
+    t_direct = time.perf_counter() - start
+    print(f"  {count} candidatos ({name}): modelo {t_model * 1000:8.1f} ms | filtrar y medir "
+          f"{t_direct * 1000:8.1f} ms | x{t_direct / t_model:.1f}")
+
+
+def main():
+    if len(sys.argv) > 1:
+        signals = {path: sf.read(path, dtype="float32", always_2d=True) for path in sys.argv[1:]}
+    else:
+        signals = synthetic_signals()
+    failures = 0
+    drys = {}
+    for name, (audio, sr) in signals.items():
+        failed, drys[name] = compare(name, audio, sr)
+        failures += failed
+    print("\n== Coste")
+    for name, (audio, sr) in signals.items():
+        time_candidates(name, drys[name], audio if audio.ndim == 2 else audio[:, np.newaxis], sr)
+    print("\nModelo:", "OK" if not failures else "FALLO")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Paridad y tiempos del motor de características con STFT compartido.
+
+Compara core.features.compute_features con las llamadas individuales a
+librosa.feature que usaba extract_features originalmente.
+
+Con --streaming compara además el modo por bloques
+(core.features.compute_features_streaming) contra el análisis en memoria,
+con las tolerancias documentadas en StreamingFeatureAnalyzer, y mide el pico
+de memoria de Python de cada modo.
+
+Uso:
+    python -m benchmarks.bench_features [--streaming] [archivo1.wav archivo2.wav ...]
+
+Sin archivos usa señales sintéticas. Devuelve código de salida 1 si alguna
+característica supera la tolerancia.
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+import librosa
+import soundfile as sf
+from core.features import compute_features, compute_features_streaming
+
+RTOL = 1e-4
+ATOL = 1e-6
+
+# Tolerancias documentadas del modo por bloques (relativas salvo indicación)
+STREAMING_TOLERANCES = {
+    "spectral_centroid": 0.005,
+    "spectral_rolloff": 0.005,
+    "spectral_bandwidth": 0.005,
+    "rms": 0.005,
+    "zero_crossing_rate": 0.01,
+}
+STREAMING_MFCC_ATOL_DB = 0.5
+STREAMING_TEMPO_ATOL_BPM = 4.0
+
+
+def reference_features(y, sr):
+    """Implementación original: una llamada a librosa por característica."""
+    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+    return {
+        "spectral_centroid": float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))),
+        "zero_crossing_rate": float(np.mean(librosa.feature.zero_crossing_rate(y))),
+        "tempo": float(librosa.feature.tempo(y=y, sr=sr).mean()),
+        "rms": float(np.mean(librosa.feature.rms(y=y))),
+        "spectral_rolloff": float(np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))),
+        "spectral_bandwidth": float(np.mean(librosa.feature.spectral_bandwidth(y=y, sr=sr))),
+        "mfcc_means": [float(np.mean(m)) for m in mfccs][:5],
+    }
+
+
+def synthetic_signals(sr=44100, seconds=30):
+    rng = np.random.default_rng(0)
+    t = np.arange(sr * seconds) / sr
+    clicks = np.zeros_like(t)
+    clicks[:: int(sr * 60 / 120)] = 1.0  # 120 BPM
+    kick = np.convolve(clicks, np.exp(-np.arange(2000) / 200.0) * np.sin(2 * np.pi * 60 * np.arange(2000) / sr))[: len(t)]
+    tone = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.1 * np.sin(2 * np.pi * 3520 * t)
+    noise = 0.05 * rng.standard_normal(len(t))
+    # Introducción casi en silencio: el máximo acumulado al principio queda muy por debajo del global
+    intro = np.concatenate((1e-4 * rng.standard_normal(sr * 8), np.zeros(sr * 2)))
+    return {
+        "tone+kick (44.1k)": ((tone + kick).astype(np.float32), sr),
+        "noise (48k)": (rng.standard_normal(48000 * seconds).astype(np.float32) * 0.1, 48000),
+        "intro silenciosa (44.1k)": (np.concatenate((intro, tone + kick)).astype(np.float32), sr),
+        "mix (22.05k)": (librosa.resample((tone + kick + noise).astype(np.float32), orig_sr=sr, target_sr=22050), 22050),
+    }
+
+
+def _timed(fn, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def compare(name, y, sr):
+    ref, t_ref = _timed(reference_features, y, sr)
+    new, t_new = _timed(compute_features, y, sr)
+    ok = True
+    print(f"\n== {name}: {len(y) / sr:.1f} s @ {sr} Hz")
+    for key, ref_value in ref.items():
+        a = np.atleast_1d(np.asarray(ref_value, dtype=np.float64))
+        b = np.atleast_1d(np.asarray(new[key], dtype=np.float64))
+        close = a.shape == b.shape and np.allclose(a, b, rtol=RTOL, atol=ATOL)
+        err = float(np.max(np.abs(a - b))) if a.shape == b.shape else float("nan")
+        ok &= close
+        print(f"  {'OK ' if close else 'ERR'} {key:<20} max|Δ|={err:.3e}")
+    print(f"  librosa individual: {t_ref * 1000:8.1f} ms | STFT compartido: {t_new * 1000:8.1f} ms "
+          f"| x{t_ref / t_new:.2f}")
+    return ok
+
+
+def _peak_memory(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _load_in_memory(path):
+    y, sr = librosa.load(path, sr=None)
+    return compute_features(y, sr)
+
+
+def compare_streaming(name, path):
+    ref, t_ref, m_ref = _peak_memory(_load_in_memory, path)
+    new, t_new, m_new = _peak_memory(compute_features_streaming, path)
+    ok = True
+    print(f"\n== {name} (streaming)")
+    for key, tol in STREAMING_TOLERANCES.items():
+        rel = abs(new[key] - ref[key]) / max(abs(ref[key]), 1e-12)
+        ok &= rel <= tol
+        print(f"  {'OK ' if rel <= tol else 'ERR'} {key:<20} rel={rel:.3e} (tol {tol})")
+    mfcc_err = float(np.max(np.abs(np.subtract(new["mfcc_means"], ref["mfcc_means"]))))
+    tempo_err = abs(new["tempo"] - ref["tempo"])
+    ok &= mfcc_err <= STREAMING_MFCC_ATOL_DB and tempo_err <= STREAMING_TEMPO_ATOL_BPM
+    print(f"  {'OK ' if mfcc_err <= STREAMING_MFCC_ATOL_DB else 'ERR'} {'mfcc_means':<20} max|Δ|={mfcc_err:.3f} dB")
+    print(f"  {'OK ' if tempo_err <= STREAMING_TEMPO_ATOL_BPM else 'ERR'} {'tempo':<20} "
+          f"{ref['tempo']:.1f} vs {new['tempo']:.1f} BPM")
+    print(f"  en memoria: {t_ref * 1000:8.1f} ms, pico {m_ref / 1e6:7.1f} MB | "
+          f"por bloques: {t_new * 1000:8.1f} ms, pico {m_new / 1e6:7.1f} MB")
+    return ok
+
+
+def main(args):
+    streaming = "--streaming" in args
+    paths = [a for a in args if a != "--streaming"]
+    if paths:
+        signals = {p: librosa.load(p, sr=None) for p in paths}
+    else:
+        signals = synthetic_signals()
+    results = [compare(name, y, sr) for name, (y, sr) in signals.items()]
+    if streaming:
+        with tempfile.TemporaryDirectory() as tmp:
+            for i, (name, (y, sr)) in enumerate(signals.items()):
+                # Con archivos reales el nombre es la ruta; las señales sintéticas se escriben a disco
+                path = name
+                if not paths:
+                    path = os.path.join(tmp, f"{i}.wav")
+                    sf.write(path, y, sr, subtype="FLOAT")
+                results.append(compare_streaming(name, path))
+    print("\nParidad:", "OK" if all(results) else "FALLO")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
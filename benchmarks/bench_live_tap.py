@@ -0,0 +1,98 @@
+"""
+Lector del tap en directo contra un escritor que simula Reaper en otro proceso.
+
+Lanza benchmarks.fake_live_tap, lee repetidamente los últimos segundos con
+core.live_tap.LiveTapReader y comprueba que:
+- el audio coincide muestra a muestra con la señal del simulador,
+- las lecturas contiguas son vistas sobre el mapa (sin copia),
+- ninguna instantánea validada fue sobrescrita durante su uso.
+Mide además el coste de cada lectura y del análisis que hace analyze_track_live.
+
+Uso:
+    python -m benchmarks.bench_live_tap [--seconds 5] [--reads 50] [--sr 48000]
+
+Devuelve código de salida 1 si alguna comprobación falla.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from core.live_tap import LiveTapReader
+from benchmarks.fake_live_tap import expected_signal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _wait_for(reader_path, frames, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if os.path.exists(reader_path) and os.path.getsize(reader_path) > 0:
+            try:
+                with LiveTapReader(reader_path) as reader:
+                    if reader.position()[0] >= frames:
+                        return
+            except ValueError:
+                pass  # Cabecera aún sin escribir
+        time.sleep(0.05)
+    raise TimeoutError("El simulador no escribió audio a tiempo.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="Segundos leídos en cada instantánea")
+    parser.add_argument("--reads", type=int, default=50)
+    parser.add_argument("--sr", type=int, default=48000)
+    args = parser.parse_args()
+
+    from tools.audio_tools import _analyze_buffer
+
+    tmp = tempfile.mkdtemp(prefix="eqnity_tap_")
+    path = os.path.join(tmp, "tap.f32")
+    writer = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_live_tap", "--path", path, "--sr", str(args.sr)],
+        cwd=ROOT,
+    )
+    ok = True
+    try:
+        _wait_for(path, int(args.seconds * args.sr))
+        read_times, views, invalid = [], 0, 0
+        with LiveTapReader(path) as reader:
+            for _ in range(args.reads):
+                start = time.perf_counter()
+                snapshot = reader.snapshot(args.seconds)
+                read_times.append(time.perf_counter() - start)
+                views += np.shares_memory(snapshot.audio, reader._data)
+                expected = expected_signal(snapshot.start, len(snapshot.audio), reader.sample_rate)
+                matches = np.array_equal(snapshot.audio, expected)
+                if not reader.is_valid(snapshot):
+                    invalid += 1
+                elif not matches:
+                    ok = False
+                    print(f"ERR contenido distinto en el frame {snapshot.start}")
+                time.sleep(0.02)
+
+            snapshot = reader.snapshot(args.seconds)
+            start = time.perf_counter()
+            analysis = _analyze_buffer(snapshot.audio, snapshot.sample_rate)
+            analysis_time = time.perf_counter() - start
+            age = reader.age()
+
+        print(f"{args.reads} lecturas de {args.seconds:.1f} s @ {args.sr} Hz: "
+              f"mediana {np.median(read_times) * 1e6:.1f} µs, máx {max(read_times) * 1e6:.1f} µs; "
+              f"{views} sin copia, {args.reads - views} cruzando el final del anillo, {invalid} sobrescritas")
+        print(f"Análisis: {analysis_time * 1000:.1f} ms | loudness {analysis['loudness']:.2f} LUFS | "
+              f"centroide {analysis['spectral_centroid']:.0f} Hz | antigüedad {age:.2f} s")
+    finally:
+        writer.terminate()
+        writer.wait()
+        shutil.rmtree(tmp, ignore_errors=True)
+    print("Tap en directo:", "OK" if ok else "FALLO")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
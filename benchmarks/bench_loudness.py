@@ -0,0 +1,113 @@
+"""
+Paridad y coste del medidor EBU R128 incremental (core.loudness.LoudnessMeter).
+
+- Casos de EBU Tech 3341: seno de 1 kHz estéreo a -23 y -33 dBFS, cuyo
+  loudness momentáneo, corto plazo e integrado debe ser -23 / -33 LUFS ±0.1.
+- Loudness integrado frente a pyloudnorm (filter_class="DeMan", el mismo
+  filtro K) en señales sintéticas; se muestra también la diferencia con el
+  filtro por defecto de pyloudnorm.
+- Invariancia incremental: el resultado no depende del tamaño de bloque de push.
+- Coste por push para bloques de 512 muestras, en µs y en fracción de tiempo real.
+
+Uso:
+    python -m benchmarks.bench_loudness [archivo1.wav archivo2.wav ...]
+
+Devuelve código de salida 1 si algún caso supera su tolerancia.
+"""
+import sys
+import time
+import numpy as np
+import pyloudnorm as pyln
+import soundfile as sf
+from core.loudness import LoudnessMeter, measure_loudness
+from benchmarks.bench_features import synthetic_signals
+
+TECH_3341_ATOL_LU = 0.1
+PYLOUDNORM_ATOL_LU = 0.01
+BLOCK_SIZES = (64, 441, 4096, 1 << 16)
+TIMING_BLOCK = 512
+
+
+def tech_3341_cases(sr=48000, seconds=20):
+    t = np.arange(sr * seconds) / sr
+    cases = {}
+    for level in (-23.0, -33.0):
+        tone = 10.0 ** (level / 20.0) * np.sin(2 * np.pi * 1000.0 * t)
+        cases[f"seno 1 kHz {level:.0f} dBFS"] = (np.stack([tone, tone], axis=1), sr, level)
+    return cases
+
+
+def reference_signals():
+    signals = {name: (y, sr) for name, (y, sr) in synthetic_signals().items()}
+    # Estéreo con silencios: ejercita las puertas absoluta y relativa
+    rng = np.random.default_rng(1)
+    sr = 44100
+    bursts = rng.standard_normal((sr * 20, 2)) * 0.2
+    bursts[sr * 5:sr * 9] = 0.0
+    bursts[sr * 12:sr * 13] *= 0.01
+    signals["ráfagas estéreo (44.1k)"] = (bursts.astype(np.float32), sr)
+    return signals
+
+
+def _push_in_blocks(y, sr, block):
+    meter = LoudnessMeter(sr)
+    for start in range(0, len(y), block):
+        meter.push(y[start:start + block])
+    return meter
+
+
+def check_tech_3341():
+    failures = 0
+    print("== EBU Tech 3341")
+    for name, (y, sr, expected) in tech_3341_cases().items():
+        meter = _push_in_blocks(y, sr, 4800)
+        readings = {"M": meter.momentary(), "S": meter.short_term(), "I": meter.integrated()}
+        ok = all(abs(v - expected) <= TECH_3341_ATOL_LU for v in readings.values())
+        failures += not ok
+        cells = "  ".join(f"{k} {v:7.2f}" for k, v in readings.items())
+        print(f"  {name:<24}{cells}  {'OK' if ok else 'FALLO'}")
+    return failures
+
+
+def check_pyloudnorm(signals):
+    failures = 0
+    print("\n== Integrado frente a pyloudnorm (LUFS)")
+    print(f"  {'señal':<26}{'DeMan':>9}{'medidor':>9}{'Δ':>8}{'Δ filtro K':>12}{'máx Δ bloques':>15}")
+    for name, (y, sr) in signals.items():
+        ours = measure_loudness(y, sr)["integrated"]
+        deman = pyln.Meter(sr, filter_class="DeMan").integrated_loudness(y)
+        default = pyln.Meter(sr).integrated_loudness(y)
+        spread = max(abs(_push_in_blocks(y, sr, block).integrated() - ours) for block in BLOCK_SIZES)
+        ok = abs(ours - deman) <= PYLOUDNORM_ATOL_LU and spread <= 1e-6
+        failures += not ok
+        print(f"  {name:<26}{deman:>9.3f}{ours:>9.3f}{ours - deman:>8.3f}{ours - default:>12.3f}"
+              f"{spread:>15.1e}  {'OK' if ok else 'FALLO'}")
+    return failures
+
+
+def time_push(signals):
+    print(f"\n== Coste por push ({TIMING_BLOCK} muestras)")
+    for name, (y, sr) in signals.items():
+        meter = LoudnessMeter(sr)
+        blocks = [y[start:start + TIMING_BLOCK] for start in range(0, len(y) - TIMING_BLOCK, TIMING_BLOCK)]
+        start = time.perf_counter()
+        for block in blocks:
+            meter.push(block)
+        elapsed = time.perf_counter() - start
+        per_push = elapsed / len(blocks)
+        print(f"  {name:<26}{per_push * 1e6:>9.1f} µs/push  {elapsed / (len(y) / sr) * 100:>6.2f} % de tiempo real"
+              f"  (LRA {meter.loudness_range():.1f} LU, TP {meter.true_peak():.1f} dBTP)")
+
+
+def main():
+    if len(sys.argv) > 1:
+        signals = {path: sf.read(path, dtype="float32") for path in sys.argv[1:]}
+    else:
+        signals = reference_signals()
+    failures = check_tech_3341() + check_pyloudnorm(signals)
+    time_push(signals)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Resolución de nombres de parámetros (core.utils._ParamIndex) con bandas numeradas.
+
+Comprueba que un nombre aproximado nunca cambia de banda: 'Gain-Band 7' en un
+EQ de cuatro bandas no debe resolverse a 'Gain-Band 4', y los sinónimos y
+errores tipográficos de la banda correcta siguen resolviéndose. Mide además el
+coste de match/closest con los parámetros de un sintetizador grande.
+
+Uso:
+    python -m benchmarks.bench_param_match
+
+Devuelve código de salida 1 si algún caso falla.
+"""
+import sys
+import time
+
+from benchmarks import fake_reapy
+
+fake_reapy.install(fake_reapy.build_project(1))
+
+from core.utils import _ParamIndex  # noqa: E402
+
+EQ_NAMES = fake_reapy.PLUGIN_CATALOG["ReaEQ (Cockos)"]
+SYNTH_NAMES = fake_reapy.PLUGIN_CATALOG["ReaSynth (Cockos)"]
+
+# (nombre pedido, resultado esperado de match(fuzzy=True); None = sin coincidencia)
+CASES = [
+    ("Gain-Band 2", "Gain-Band 2"),
+    ("gain band 2", "Gain-Band 2"),
+    ("Frequency Band 1", "Freq-Band 1"),
+    ("Gain-Bnad 3", "Gain-Band 3"),
+    ("Gain-Band 7", None),
+    ("Freq Band 5", None),
+    ("Gain Band 12", None),
+    ("Gain-Band 04", "Gain-Band 4"),
+    ("BW-Band", None),
+]
+
+
+def check_cases():
+    index = _ParamIndex(EQ_NAMES)
+    failures = 0
+    print("== Bandas numeradas (ReaEQ)")
+    for requested, expected in CASES:
+        i = index.match(requested)
+        got = index.names[i] if i is not None else None
+        ok = got == expected
+        failures += not ok
+        print(f"  {requested!r:<22} -> {got!r:<16} {'OK' if ok else f'FALLO (esperado {expected!r})'}")
+    return failures
+
+
+def time_match(repeats=200):
+    index = _ParamIndex(SYNTH_NAMES)
+    queries = ["Param 150", "param 15O", "Parma 299", "Param 301"]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for query in queries:
+            index.match(query)
+    per_call = (time.perf_counter() - start) / (repeats * len(queries))
+    print(f"\n== match() con {len(SYNTH_NAMES)} parámetros: {per_call * 1e6:.1f} µs/llamada")
+
+
+def main():
+    failures = check_cases()
+    time_match()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
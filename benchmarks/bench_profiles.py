@@ -0,0 +1,86 @@
+"""
+Compromiso velocidad / precisión de los perfiles de análisis.
+
+Analiza cada archivo con todos los perfiles de tools.ml_tools.ANALYSIS_PROFILES
+(sin caché) y muestra el tiempo de cada uno, su aceleración respecto a
+"accurate" y el error relativo de cada característica frente a "accurate".
+Las características que un perfil no calcula aparecen como "-".
+
+Uso:
+    python -m benchmarks.bench_profiles [--repeat 3] [archivo1.wav archivo2.wav ...]
+
+Sin archivos usa señales sintéticas de 60 s escritas a disco, de modo que el
+muestreo por extractos del perfil fast entra en juego.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import soundfile as sf
+from benchmarks.bench_features import synthetic_signals
+from tools.ml_tools import ANALYSIS_PROFILES, _compute_features
+
+REFERENCE_PROFILE = "accurate"
+SCALAR_KEYS = ("spectral_centroid", "spectral_rolloff", "spectral_bandwidth", "rms", "zero_crossing_rate", "tempo")
+
+
+def _timed(path, params, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result, _ = _compute_features(path, params)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _relative_errors(features, reference):
+    errors = {}
+    for key in SCALAR_KEYS:
+        if key in features:
+            errors[key] = abs(features[key] - reference[key]) / max(abs(reference[key]), 1e-12)
+    if "mfcc_means" in features:
+        # MFCC en dB: error absoluto máximo entre coeficientes
+        errors["mfcc_means"] = float(np.max(np.abs(np.subtract(features["mfcc_means"], reference["mfcc_means"]))))
+    return errors
+
+
+def compare(name, path, repeat):
+    info = sf.info(path)
+    print(f"\n== {name}: {info.frames / info.samplerate:.1f} s @ {info.samplerate} Hz, {info.channels} canal(es)")
+    reference, t_ref = _timed(path, ANALYSIS_PROFILES[REFERENCE_PROFILE], repeat)
+    header = f"  {'perfil':<10}{'ms':>9}{'x':>7}" + "".join(f"{k[:10]:>12}" for k in SCALAR_KEYS) + f"{'mfcc dB':>10}"
+    print(header)
+    for profile, params in ANALYSIS_PROFILES.items():
+        if profile == REFERENCE_PROFILE:
+            features, seconds = reference, t_ref
+        else:
+            features, seconds = _timed(path, params, repeat)
+        errors = _relative_errors(features, reference)
+        cells = "".join(f"{errors[k] * 100:>11.2f}%" if k in errors else f"{'-':>12}" for k in SCALAR_KEYS)
+        mfcc = f"{errors['mfcc_means']:>10.2f}" if "mfcc_means" in errors else f"{'-':>10}"
+        print(f"  {profile:<10}{seconds * 1000:>9.1f}{t_ref / seconds:>7.2f}{cells}{mfcc}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        for path in args.files:
+            compare(path, path, args.repeat)
+        return 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (name, (y, sr)) in enumerate(synthetic_signals(seconds=60).items()):
+            path = os.path.join(tmp, f"{i}.wav")
+            sf.write(path, y, sr, subtype="FLOAT")
+            compare(name, path, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Tiempo de arranque en frío hasta tener la UI construida.
+
+Lanza un intérprete nuevo con `-X importtime` que importa ui y ejecuta
+build_ui(), mide el tiempo total y desglosa los imports más costosos. Indica
+además qué módulos pesados (DSP, ML, LangChain/LangGraph) se cargaron antes
+de que la UI estuviera lista: deberían cargarse de forma diferida.
+
+Uso:
+    python -m benchmarks.bench_startup [--runs 3] [--top 15] [--fail-on-heavy]
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Paquetes que no deberían importarse para mostrar la UI
+HEAVY_MODULES = (
+    "librosa", "sklearn", "scipy", "numba", "soundfile", "pyloudnorm",
+    "langgraph", "langchain", "langchain_core", "langchain_openai", "reapy",
+)
+
+SNIPPET = (
+    "import time; start = time.perf_counter(); "
+    "import ui; ui.build_ui(); "
+    "print(f'UI_READY {time.perf_counter() - start:.6f}')"
+)
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_once():
+    """Devuelve (segundos hasta la UI, {módulo: (propio_us, acumulado_us, nivel)})."""
+    env = dict(os.environ)
+    env.setdefault("OPENROUTER_API_KEY", "benchmark")
+    env["EQNITY_WARMUP_ON_START"] = "0"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    ready = re.search(r"UI_READY ([\d.]+)", proc.stdout)
+    if proc.returncode != 0 or not ready:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "fallo al construir la UI")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us), len(indent) // 2)
+    return float(ready.group(1)), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="Imports de primer nivel más costosos a mostrar")
+    parser.add_argument("--fail-on-heavy", action="store_true",
+                        help="Código de salida 1 si algún módulo pesado se importa al arrancar")
+    args = parser.parse_args()
+
+    times, modules = [], {}
+    for _ in range(args.runs):
+        seconds, modules = run_once()
+        times.append(seconds)
+
+    print(f"UI lista en {statistics.median(times):.3f} s (mediana de {len(times)}; "
+          f"mín {min(times):.3f} s, máx {max(times):.3f} s)")
+    print(f"Módulos importados: {len(modules)} | tiempo propio total: "
+          f"{sum(m[0] for m in modules.values()) / 1e6:.3f} s")
+
+    top_level = sorted(
+        ((cumulative, name) for name, (_, cumulative, level) in modules.items() if level == 0),
+        reverse=True,
+    )[:args.top]
+    print(f"\n{'Import (primer nivel)':<40}{'acumulado ms':>14}")
+    for cumulative, name in top_level:
+        print(f"{name:<40}{cumulative / 1000:>14.1f}")
+
+    loaded = sorted({name.split(".")[0] for name in modules} & set(HEAVY_MODULES))
+    if loaded:
+        print(f"\nMódulos pesados cargados antes de la UI: {', '.join(loaded)}")
+    else:
+        print("\nNingún módulo pesado se carga antes de la UI.")
+    return 1 if args.fail_on_heavy and loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
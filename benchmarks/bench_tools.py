@@ -0,0 +1,110 @@
+"""
+Benchmark de round-trips a Reaper, tiempo y memoria de cada @tool.
+
+Ejecuta las herramientas de tools/vst_tools.py y tools/audio_tools.py contra
+proyectos sintéticos de benchmarks.fake_reapy (sin Reaper). Cada herramienta
+se ejecuta dos veces seguidas (fría y caliente) para que se vea el efecto de
+las cachés. Las columnas "undo" y "redib." cuentan las entradas de deshacer y
+los redibujados de la interfaz que provoca cada llamada.
+
+Uso:
+    python -m benchmarks.bench_tools [--sizes 10,100,500] [--latency-ms 0.5]
+                                     [--batched-latency-ms 0.02] [--skip-audio]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+os.environ.setdefault("OPENROUTER_API_KEY", "benchmark")
+
+from benchmarks import fake_reapy  # noqa: E402
+from core.rpc import rpc_counter  # noqa: E402
+
+
+def _cases(include_audio):
+    eq_gains = [{"parameter_name": f"Gain-Band {b}", "value": 0.6} for b in range(1, 5)]
+    synth_changes = [{"parameter_name": f"Param {i}", "value": 0.25} for i in range(0, 300, 15)]
+    cases = [
+        ("list_tracks_and_vsts", {}),
+        ("list_vst_parameters", {"track_name": "Track 1", "vst_name": "ReaEQ (Cockos)"}),
+        ("search_vst_parameters", {"track_name": "Track 4", "vst_name": "ReaSynth (Cockos)", "query": "param 1"}),
+        ("set_multiple_vst_parameters", {"track_name": "Track 1", "vst_name": "ReaEQ (Cockos)", "changes": eq_gains}),
+        ("set_multiple_vst_parameters", {"track_name": "Track 4", "vst_name": "ReaSynth (Cockos)", "changes": synth_changes}),
+        ("add_vst_to_track", {"track_name": "Track 2", "vst_name": "ReaEQ"}),
+        ("remove_vst_from_track", {"track_name": "Track 2", "vst_name": "ReaEQ (Cockos)"}),
+    ]
+    if include_audio:
+        cases += [
+            ("analyze_track_audio", {"track_name": "Track 1", "duration": 2}),
+            ("analyze_tracks_audio", {"track_names": ["Track 1", "Track 2", "Track 3"], "duration": 2}),
+        ]
+    return cases
+
+
+def _load_tools(include_audio):
+    from tools import vst_tools
+    tools = {
+        name: getattr(vst_tools, name)
+        for name in ("list_tracks_and_vsts", "list_vst_parameters", "search_vst_parameters", "set_multiple_vst_parameters",
+                     "add_vst_to_track", "remove_vst_from_track")
+    }
+    if include_audio:
+        from tools import audio_tools
+        tools["analyze_track_audio"] = audio_tools.analyze_track_audio
+        tools["analyze_tracks_audio"] = audio_tools.analyze_tracks_audio
+    return tools
+
+
+def _run(tool, args):
+    project = fake_reapy._state["project"]
+    undo, redraws = len(project.undo_history), project.redraws
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with rpc_counter.measure() as rpc:
+            output = tool.invoke(args)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    failed = isinstance(output, str) and output.startswith("Error")
+    ui = (len(project.undo_history) - undo, project.redraws - redraws)
+    return rpc["calls"], elapsed, peak, ui, failed, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,500")
+    parser.add_argument("--latency-ms", type=float, default=0.5, help="Latencia simulada por RPC")
+    parser.add_argument("--batched-latency-ms", type=float, default=0.02,
+                        help="Latencia por RPC dentro de reapy.inside_reaper()")
+    parser.add_argument("--skip-audio", action="store_true", help="No ejecutar las herramientas de render")
+    args = parser.parse_args()
+
+    fake_reapy.configure(args.latency_ms / 1000, args.batched_latency_ms / 1000)
+    fake_reapy.install(fake_reapy.build_project(1))
+    include_audio = not args.skip_audio
+    tools = _load_tools(include_audio)
+
+    print(f"{'pistas':>6} | {'herramienta':<28} | {'pasada':<8} | {'RPCs':>6} | {'ms':>9} | {'pico KB':>9} | "
+          f"{'undo':>4} | {'redib.':>6}")
+    print("-" * 98)
+    errors = 0
+    for size in (int(s) for s in args.sizes.split(",")):
+        fake_reapy.install(fake_reapy.build_project(size))
+        for name, tool_args in _cases(include_audio):
+            for run in ("fría", "caliente"):
+                calls, elapsed, peak, (undo, redraws), failed, output = _run(tools[name], tool_args)
+                errors += failed
+                mark = " !" if failed else ""
+                print(f"{size:>6} | {name:<28} | {run:<8} | {calls:>6} | {elapsed * 1000:>9.1f} | "
+                      f"{peak / 1024:>9.1f} | {undo:>4} | {redraws:>6}{mark}")
+                if failed and run == "fría":
+                    print(f"         {output.splitlines()[0]}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Escritor local que simula el tap en directo de Reaper.
+
+Escribe en tiempo real, por bloques como los de una tarjeta de sonido, una
+señal estéreo determinista en el buffer circular de core.live_tap. Cada
+muestra depende sólo de su posición absoluta (ver expected_signal), de modo
+que un lector puede comprobar exactamente lo que lee.
+
+Uso:
+    python -m benchmarks.fake_live_tap [--path RUTA] [--sr 48000] [--block 512] [--duration 0]
+"""
+import sys
+import time
+import argparse
+import numpy as np
+from core.live_tap import RingBufferWriter, default_tap_path
+
+FREQS = (440.0, 660.0)
+AMPLITUDE = 0.25
+
+
+def expected_signal(start, frames, sr):
+    """Señal (frames, 2) que el simulador escribe a partir del frame absoluto `start`."""
+    n = np.arange(start, start + frames, dtype=np.float64)[:, np.newaxis]
+    # Envolvente de 4 Hz para que el nivel cambie y haya onsets
+    envelope = 0.5 + 0.5 * np.cos(2 * np.pi * 4.0 * n / sr)
+    return (AMPLITUDE * envelope * np.sin(2 * np.pi * np.asarray(FREQS) * n / sr)).astype(np.float32)
+
+
+def run(path, sr=48000, block=512, duration=0.0, capacity_seconds=30.0):
+    """Escribe hasta `duration` segundos (0 = sin límite) a ritmo de tiempo real."""
+    writer = RingBufferWriter(path, sr, channels=2, capacity_seconds=capacity_seconds)
+    start = time.perf_counter()
+    try:
+        while not duration or writer.write_pos < duration * sr:
+            writer.write(expected_signal(writer.write_pos, block, sr))
+            # Dormir hasta que el reloj alcance lo ya escrito, como un callback de audio
+            ahead = writer.write_pos / sr - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default=default_tap_path())
+    parser.add_argument("--sr", type=int, default=48000)
+    parser.add_argument("--block", type=int, default=512)
+    parser.add_argument("--duration", type=float, default=0.0, help="Segundos a escribir (0 = hasta interrumpir)")
+    args = parser.parse_args()
+    try:
+        run(args.path, args.sr, args.block, args.duration)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
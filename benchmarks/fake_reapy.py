@@ -0,0 +1,530 @@
+"""
+Sustituto local, en proceso, de la superficie de reapy que usan las herramientas.
+
+Permite ejecutar tools/vst_tools.py y tools/audio_tools.py sin Reaper. Cada
+acceso que en reapy sería una petición a Reaper cuenta como un RPC (en
+core.rpc.rpc_counter) y puede simular una latencia configurable; dentro de
+`inside_reaper()` se aplica la latencia reducida de una sesión por lotes.
+`perform_action(40078)` escribe WAVs sintéticos donde indique la
+configuración de render del proyecto.
+
+El proyecto lleva también la cuenta de los redibujados de la interfaz (uno por
+cambio, o uno al salir de `prevent_ui_refresh()` si hubo cambios) y de las
+entradas de deshacer que crea `undo_block()`.
+
+Uso:
+    from benchmarks import fake_reapy
+    project = fake_reapy.install(fake_reapy.build_project(n_tracks=100))
+    import tools.vst_tools  # importa reapy -> este módulo
+"""
+import os
+import sys
+import time
+import types
+import wave
+import itertools
+from contextlib import contextmanager
+from core.rpc import rpc_counter
+
+RENDER_ACTION = 40078
+SAMPLE_RATE = 44100
+
+
+class _Server:
+    """Latencias simuladas por llamada (segundos) y estado de las sesiones por lotes."""
+    latency = 0.0
+    batched_latency = 0.0
+    batch_depth = 0
+
+
+def configure(latency=0.0, batched_latency=0.0):
+    _Server.latency = latency
+    _Server.batched_latency = batched_latency
+
+
+def _rpc(n=1):
+    rpc_counter.increment(n)
+    delay = _Server.batched_latency if _Server.batch_depth else _Server.latency
+    if delay:
+        time.sleep(delay * n)
+
+
+@contextmanager
+def inside_reaper():
+    _Server.batch_depth += 1
+    try:
+        yield
+    finally:
+        _Server.batch_depth -= 1
+
+
+@contextmanager
+def prevent_ui_refresh():
+    project = _state["project"]
+    _rpc()
+    project.ui_refresh_depth += 1
+    try:
+        yield
+    finally:
+        _rpc()
+        project.ui_refresh_depth -= 1
+        if not project.ui_refresh_depth and project.pending_redraw:
+            project.pending_redraw = False
+            project.redraws += 1
+
+
+@contextmanager
+def undo_block(undo_name, flags=-1):
+    project = _state["project"]
+    _rpc()
+    project.undo_depth += 1
+    start = project.change_count
+    try:
+        yield
+    finally:
+        _rpc()
+        project.undo_depth -= 1
+        if not project.undo_depth and project.change_count != start:
+            project.undo_history.append(undo_name)
+
+
+# --- Estado del proyecto simulado ---
+
+_ids = itertools.count(0x1000)
+
+
+class ParamState:
+    def __init__(self, name, value=0.5):
+        self.name = name
+        self.value = value
+
+    @property
+    def formatted(self):
+        return f"{self.value:.2f}"
+
+
+class FXState:
+    def __init__(self, name, param_names):
+        self.name = name
+        self.guid = f"{{FX-{next(_ids):08X}}}"
+        self.params = [ParamState(p) for p in param_names]
+        self.enabled = True
+
+
+class TrackState:
+    def __init__(self, project, name, depth=0):
+        self.project = project
+        self.id = f"(MediaTrack*)0x{next(_ids):016X}"
+        self.guid = f"{{TR-{next(_ids):08X}}}"
+        self.name = name
+        self.depth = depth
+        self.muted = False
+        self.selected = False
+        self.fxs = []
+
+    @property
+    def index(self):
+        return self.project.tracks.index(self)
+
+
+class ProjectState:
+    def __init__(self, path, name="bench.rpp"):
+        self.id = f"(ReaProject*)0x{next(_ids):016X}"
+        self.path = path
+        self.name = name
+        self.tracks = []
+        self.cursor_position = 0.0
+        self.change_count = 0
+        self.undo_history = []
+        self.undo_depth = 0
+        self.redraws = 0
+        self.ui_refresh_depth = 0
+        self.pending_redraw = False
+        self.info = {
+            "RENDER_FILE": "", "RENDER_PATTERN": "", "RENDER_BOUNDSFLAG": 0.0,
+            "RENDER_STARTPOS": 0.0, "RENDER_ENDPOS": 0.0, "RENDER_SETTINGS": 0.0,
+        }
+
+    def touch(self):
+        self.change_count += 1
+        self.redraw()
+
+    def redraw(self):
+        if self.ui_refresh_depth:
+            self.pending_redraw = True
+        else:
+            self.redraws += 1
+
+    def track_by_id(self, track_id):
+        for t in self.tracks:
+            if t.id == track_id:
+                return t
+        raise ValueError(f"Pista inexistente: {track_id}")
+
+
+# Catálogo de plugins disponibles para add_fx: nombre -> nombres de parámetros
+PLUGIN_CATALOG = {
+    "ReaEQ (Cockos)": [f"{kind}-Band {b}" for b in range(1, 5) for kind in ("Freq", "Gain", "BW")]
+                      + ["Wet", "Dry"],
+    "ReaComp (Cockos)": ["Thresh", "Ratio", "Attack", "Release", "Pre-comp", "Knee", "Wet", "Dry"],
+    "ReaVerbate (Cockos)": ["Wet", "Dry", "Room size", "Dampening", "Width", "Delay", "Lowpass", "Hipass"],
+    "ReaSynth (Cockos)": [f"Param {i}" for i in range(300)],
+}
+
+_state = {"project": None}
+
+
+def build_project(n_tracks=10, fx_per_track=2, path=None):
+    """Crea un proyecto sintético con pistas, carpetas y FX del catálogo."""
+    import tempfile
+
+    project = ProjectState(path or tempfile.mkdtemp(prefix="fake_reaper_"))
+    plugins = list(PLUGIN_CATALOG)
+    for i in range(n_tracks):
+        track = TrackState(project, f"Track {i + 1}", depth=0 if i % 8 == 0 else 1)
+        for j in range(fx_per_track):
+            name = plugins[(i + j) % len(plugins)]
+            track.fxs.append(FXState(f"VST: {name}", PLUGIN_CATALOG[name]))
+        project.tracks.append(track)
+    return project
+
+
+# --- Superficie de reapy ---
+
+class FXParam:
+    def __init__(self, state):
+        self._state = state
+
+    @property
+    def name(self):
+        _rpc()
+        return self._state.name
+
+    @property
+    def formatted(self):
+        _rpc()
+        return self._state.formatted
+
+
+class FXParamsList:
+    def __init__(self, fx_state, project_state):
+        self._fx = fx_state
+        self._project = project_state
+
+    def __len__(self):
+        return len(self._fx.params)
+
+    def __iter__(self):
+        return (FXParam(p) for p in self._fx.params)
+
+    def __getitem__(self, i):
+        return FXParam(self._fx.params[i])
+
+    def __setitem__(self, i, value):
+        _rpc()
+        self._fx.params[i].value = float(value)
+        self._project.touch()
+
+
+class FX:
+    def __init__(self, parent=None, index=None, parent_id=None):
+        parent_id = parent_id if parent_id is not None else parent.id
+        self.parent_id = parent_id
+        self.index = index
+
+    @property
+    def _track(self):
+        return _state["project"].track_by_id(self.parent_id)
+
+    @property
+    def _fx(self):
+        return self._track.fxs[self.index]
+
+    @property
+    def name(self):
+        _rpc()
+        return self._fx.name
+
+    @property
+    def params(self):
+        _rpc()
+        return FXParamsList(self._fx, _state["project"])
+
+    def delete(self):
+        _rpc()
+        del self._track.fxs[self.index]
+        _state["project"].touch()
+
+
+class Track:
+    def __init__(self, id, project=None):
+        self.id = id
+
+    @property
+    def _t(self):
+        return _state["project"].track_by_id(self.id)
+
+    @property
+    def name(self):
+        _rpc()
+        return self._t.name
+
+    @property
+    def GUID(self):
+        _rpc()
+        return self._t.guid
+
+    @property
+    def index(self):
+        _rpc()
+        return self._t.index
+
+    @property
+    def project(self):
+        _rpc()
+        return Project()
+
+    @property
+    def is_muted(self):
+        _rpc()
+        return self._t.muted
+
+    def mute(self):
+        _rpc()
+        self._t.muted = True
+        _state["project"].touch()
+
+    def unmute(self):
+        _rpc()
+        self._t.muted = False
+        _state["project"].touch()
+
+    def select(self):
+        _rpc()
+        self._t.selected = True
+        _state["project"].redraw()
+
+    def unselect(self):
+        _rpc()
+        self._t.selected = False
+        _state["project"].redraw()
+
+    @property
+    def fxs(self):
+        _rpc()
+        return [FX(parent_id=self.id, index=i) for i in range(len(self._t.fxs))]
+
+    def add_fx(self, name):
+        _rpc()
+        match = next((p for p in PLUGIN_CATALOG if name.lower() in p.lower()), None)
+        if match is None:
+            return None
+        self._t.fxs.append(FXState(f"VST: {match}", PLUGIN_CATALOG[match]))
+        _state["project"].touch()
+        return FX(parent_id=self.id, index=len(self._t.fxs) - 1)
+
+
+class Project:
+    def __init__(self, id=None):
+        _rpc()
+        self._p = _state["project"]
+        self.id = self._p.id
+
+    @property
+    def name(self):
+        _rpc()
+        return self._p.name
+
+    @property
+    def path(self):
+        _rpc()
+        return self._p.path
+
+    @property
+    def cursor_position(self):
+        _rpc()
+        return self._p.cursor_position
+
+    @property
+    def tracks(self):
+        _rpc(1 + len(self._p.tracks))
+        return [Track(t.id) for t in self._p.tracks]
+
+    @contextmanager
+    def make_current_project(self):
+        _rpc()
+        yield self
+
+    def get_info_string(self, key):
+        _rpc()
+        return str(self._p.info.get(key, ""))
+
+    def get_info_value(self, key):
+        _rpc()
+        return float(self._p.info.get(key, 0.0))
+
+    def set_info_string(self, key, value):
+        _rpc()
+        self._p.info[key] = str(value)
+
+    def set_info_value(self, key, value):
+        _rpc()
+        self._p.info[key] = float(value)
+
+    def perform_action(self, action_id):
+        _rpc()
+        if action_id == RENDER_ACTION:
+            _render(self._p)
+
+
+def _render(project):
+    """Escribe los WAV que produciría Reaper con la configuración de render actual."""
+    import numpy as np
+
+    info = project.info
+    render_dir = info["RENDER_FILE"]
+    os.makedirs(render_dir, exist_ok=True)
+    seconds = max(0.1, info["RENDER_ENDPOS"] - info["RENDER_STARTPOS"])
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    rng = np.random.default_rng(0)
+
+    if int(info["RENDER_SETTINGS"]) & 2:
+        targets = [tr for tr in project.tracks if tr.selected]
+    else:
+        targets = [None]
+    for track in targets:
+        pattern = info["RENDER_PATTERN"] or os.path.splitext(project.name)[0]
+        if track is not None:
+            pattern = pattern.replace("$tracknumber", str(track.index + 1)).replace("$track", track.name)
+            freq = 110.0 * (1 + track.index % 24)
+            audio = 0.0 if track.muted else 0.3 * np.sin(2 * np.pi * freq * t) + 0.02 * rng.standard_normal(len(t))
+        else:
+            audio = 0.3 * np.sin(2 * np.pi * 220.0 * t)
+        samples = (np.clip(np.broadcast_to(audio, t.shape), -1, 1) * 32767).astype("<i2")
+        with wave.open(os.path.join(render_dir, f"{pattern}.wav"), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(samples.tobytes())
+
+
+# --- reascript_api (RPR) ---
+
+def _fx_state(track_id, fx_index):
+    return _state["project"].track_by_id(track_id).fxs[fx_index]
+
+
+def _rpr(fn):
+    def wrapper(*args):
+        _rpc()
+        return fn(*args)
+    return wrapper
+
+
+def _track_state_chunk(track_id, buf, size, is_undo):
+    track = _state["project"].track_by_id(track_id)
+    lines = ["<TRACK", f"NAME \"{track.name}\"", f"MUTESOLO {int(track.muted)} 0 0", f"SEL {int(track.selected)}",
+             f"TRACKID {track.guid}", "<FXCHAIN"]
+    for fx in track.fxs:
+        lines.append(f"BYPASS {int(not fx.enabled)} 0 0")
+        lines.append(f"<VST \"{fx.name}\" {fx.guid}")
+        lines.append(" ".join(f"{p.value:.6f}" for p in fx.params))
+        lines.append(">")
+        lines.append(f"FXID {fx.guid}")
+    lines += [">", ">"]
+    return (True, track_id, "\n".join(lines), size, is_undo)
+
+
+def _set_track_state_chunk(track_id, chunk, is_undo):
+    """Restaura nombre, mute, selección y cadena de FX desde un chunk de _track_state_chunk."""
+    track = _state["project"].track_by_id(track_id)
+    lines = chunk.splitlines()
+    fxs, enabled = [], True
+    for n, line in enumerate(lines):
+        if line.startswith("NAME "):
+            track.name = line[5:].strip('"')
+        elif line.startswith("MUTESOLO "):
+            track.muted = line.split()[1] == "1"
+        elif line.startswith("SEL "):
+            track.selected = line.split()[1] == "1"
+        elif line.startswith("BYPASS "):
+            enabled = line.split()[1] == "0"
+        elif line.startswith("<VST "):
+            name, guid = line[5:].rsplit(" ", 1)
+            name = name.strip('"')
+            catalog = PLUGIN_CATALOG[name.split(": ", 1)[-1]]
+            fx = FXState(name, catalog)
+            fx.guid, fx.enabled = guid, enabled
+            for param, value in zip(fx.params, lines[n + 1].split()):
+                param.value = float(value)
+            fxs.append(fx)
+    track.fxs = fxs
+    _state["project"].touch()
+    return True
+
+
+_TRACK_INFO = {"B_MUTE": "muted", "I_SELECTED": "selected"}
+
+
+def _get_track_info(track_id, key):
+    return float(getattr(_state["project"].track_by_id(track_id), _TRACK_INFO[key]))
+
+
+def _set_track_info(track_id, key, value):
+    setattr(_state["project"].track_by_id(track_id), _TRACK_INFO[key], bool(value))
+    if key == "B_MUTE":
+        _state["project"].touch()
+    else:
+        _state["project"].redraw()
+    return True
+
+
+def _delete_fx(track_id, fx_index):
+    del _state["project"].track_by_id(track_id).fxs[fx_index]
+    _state["project"].touch()
+    return True
+
+
+def _set_fx_enabled(track_id, fx_index, enabled):
+    _fx_state(track_id, fx_index).enabled = bool(enabled)
+    _state["project"].touch()
+
+
+def _set_param_normalized(track_id, fx_index, param_index, value):
+    _fx_state(track_id, fx_index).params[param_index].value = float(value)
+    _state["project"].touch()
+    return True
+
+
+reascript_api = types.SimpleNamespace(
+    GetProjectStateChangeCount=_rpr(lambda proj: _state["project"].change_count),
+    GetTrackStateChunk=_rpr(_track_state_chunk),
+    SetTrackStateChunk=_rpr(_set_track_state_chunk),
+    GetMediaTrackInfo_Value=_rpr(_get_track_info),
+    SetMediaTrackInfo_Value=_rpr(_set_track_info),
+    GetTrackDepth=_rpr(lambda tr: _state["project"].track_by_id(tr).depth),
+    TrackFX_GetFXGUID=_rpr(lambda tr, fx: _fx_state(tr, fx).guid),
+    TrackFX_GetNumParams=_rpr(lambda tr, fx: len(_fx_state(tr, fx).params)),
+    TrackFX_GetParamName=_rpr(
+        lambda tr, fx, i, buf, size: (True, tr, fx, i, _fx_state(tr, fx).params[i].name, size)
+    ),
+    TrackFX_GetParamNormalized=_rpr(lambda tr, fx, i: _fx_state(tr, fx).params[i].value),
+    TrackFX_GetFormattedParamValue=_rpr(
+        lambda tr, fx, i, buf, size: (True, tr, fx, i, _fx_state(tr, fx).params[i].formatted, size)
+    ),
+    TrackFX_FormatParamValueNormalized=_rpr(
+        lambda tr, fx, i, value, buf, size: (True, tr, fx, i, value, f"{value:.2f}", size)
+    ),
+    TrackFX_SetParamNormalized=_rpr(_set_param_normalized),
+    TrackFX_Delete=_rpr(_delete_fx),
+    TrackFX_GetCount=_rpr(lambda tr: len(_state["project"].track_by_id(tr).fxs)),
+    TrackFX_GetEnabled=_rpr(lambda tr, fx: _fx_state(tr, fx).enabled),
+    TrackFX_SetEnabled=_rpr(_set_fx_enabled),
+)
+
+
+def install(project):
+    """Registra este módulo como `reapy` y fija el proyecto actual. Devuelve el proyecto."""
+    _state["project"] = project
+    sys.modules["reapy"] = sys.modules[__name__]
+    return project
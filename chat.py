@@ -1,103 +1,224 @@
 import uuid
 import time
-from agent.main import agent_executor, update_agent_language
-from langchain_core.messages import HumanMessage
-from langchain_core.runnables import RunnableConfig
+from config import MEMORY_DB_PATH, SESSION_TTL_HOURS
+from core.memory import SessionStore
+from core.instrumentation import TurnRecorder, PHASES
 from utils import format_tool_call
-from i18n.utils import i18n, t
+from i18n.utils import t
 
-session_threads = {}
+# Sesión de la UI -> thread del checkpointer; persiste entre reinicios y expira por inactividad
+session_store = SessionStore(MEMORY_DB_PATH, ttl_seconds=SESSION_TTL_HOURS * 3600)
 
-def get_or_create_thread_id(session_id):
-    if session_id not in session_threads:
-        session_threads[session_id] = str(uuid.uuid4())
-    return session_threads[session_id]
+# El agente (LangChain/LangGraph y herramientas) se importa en el primer uso para que
+# la UI arranque sin esperarlo; main.py lo precarga en segundo plano.
+async def get_agent_executor(lang=None):
+    from agent.main import get_agent_executor as _get_agent_executor
+    return await _get_agent_executor(lang)
 
-def chat_function(message, history, session_id):
-    try:
-        thread_id = get_or_create_thread_id(session_id)
-        config = RunnableConfig(configurable={"thread_id": thread_id}, run_id=uuid.uuid4())
-        thinking_message = {
-            "role": "assistant",
-            "content": f"""
-<div class="thinking-box">
-    <div class="thinking-title">{t('processing_request')}</div>
-    <div class="thinking-content"></div>
+async def get_checkpointer():
+    from agent.main import get_checkpointer as _get_checkpointer
+    return await _get_checkpointer()
+
+async def _delete_thread(thread_id):
+    checkpointer = await get_checkpointer()
+    await checkpointer.adelete_thread(thread_id)
+
+async def _evict_idle_sessions():
+    if not session_store.sweep_due():
+        return
+    for thread_id in session_store.pop_expired():
+        await _delete_thread(thread_id)
+
+async def get_or_create_thread_id(session_id):
+    await _evict_idle_sessions()
+    return session_store.get_or_create(session_id)
+
+def _thinking_html(title, thoughts, done=False):
+    return f"""
+<div class="thinking-box{' done' if done else ''}">
+    <div class="thinking-title">{title}</div>
+    <div class="thinking-content">{thoughts.strip()}</div>
 </div>
-            """
-        }
-        history.append(thinking_message)
+    """
+
+def _format_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+def _perf_breakdown(summary, lang=None):
+    """Desglose del turno para la caja de pensamiento: cada paso del LLM y cada herramienta con sus fases."""
+    lines = [f"**{t('perf_breakdown', lang)}**"]
+    for k, step in enumerate(summary["llm"], start=1):
+        parts = [f"{step['seconds']:.2f} s"]
+        if step["first_token_seconds"] is not None:
+            parts.append(f"{t('first_token_time', lang)} {step['first_token_seconds']:.2f} s")
+        if step["input_tokens"] or step["output_tokens"]:
+            parts.append(f"{step['input_tokens']} → {step['output_tokens']} tokens")
+        lines.append(f"- {t('llm_step', lang)} {k}{' ⚠️' if step['error'] else ''}: " + " · ".join(parts))
+    for span in summary["tools"]:
+        parts = [f"{span['seconds']:.2f} s"]
+        parts += [f"{t('phase_' + name, lang)} {span['phases'][name]:.2f} s"
+                  for name in PHASES if span["phases"].get(name, 0.0) >= 0.005]
+        if span["rpc_calls"]:
+            parts.append(f"{span['rpc_calls']} RPC")
+        if span["bytes_read"]:
+            parts.append(_format_bytes(span["bytes_read"]))
+        lookups = span["cache_hits"] + span["cache_misses"]
+        if lookups:
+            parts.append(f"{t('feature_cache', lang)} {span['cache_hits']}/{lookups}")
+        lines.append(f"- `{span['tool']}`{' ⚠️' if span['error'] else ''}: " + " · ".join(parts))
+    return "\n".join(lines)
+
+def _chunk_text(content):
+    """Texto de un fragmento de mensaje (str o lista de bloques de contenido)."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content or []
+    )
+
+async def chat_function(message, history, session_id, lang=None):
+    """
+    Ejecuta un turno del agente y va actualizando el historial de Gradio.
+
+    Se procesan sólo los eventos nuevos: "updates" entrega los mensajes que añade
+    cada nodo (llamadas y resultados de herramientas) y "messages" los tokens del
+    modelo, que se muestran en cuanto llegan. Al final del turno se informa del
+    tiempo hasta el primer token de la respuesta, del tiempo total y del
+    desglose por paso del LLM y por herramienta (ver core.instrumentation),
+    que además se escribe en la traza JSONL.
+    `lang` es el idioma de la sesión: elige el agente precompilado y los textos.
+    """
+    from langchain_core.messages import HumanMessage, AIMessageChunk
+
+    turn_start = time.perf_counter()
+    first_token_time = None
+    turn = None
+    try:
+        agent_executor = await get_agent_executor(lang)
+        thread_id = await get_or_create_thread_id(session_id)
+        turn = TurnRecorder(thread_id)
+        config = turn.config(configurable={"thread_id": thread_id}, run_id=uuid.uuid4())
+        history.append({"role": "assistant", "content": _thinking_html(t('processing_request', lang), "")})
+        thinking_index = len(history) - 1
         yield history
 
         input_message = HumanMessage(content=message)
         accumulated_thoughts = ""
-        final_response_content = ""
+        answer_index = None
+        answer = ""
         tool_calls_count = 0
 
-        for event in agent_executor.stream(
+        async for mode, chunk in agent_executor.astream(
             {"messages": [input_message]},
             config,
-            stream_mode="values"
+            stream_mode=["updates", "messages"],
         ):
-            if "messages" not in event:
+            if mode == "messages":
+                msg_chunk, metadata = chunk
+                if metadata.get("langgraph_node") != "agent" or not isinstance(msg_chunk, AIMessageChunk):
+                    continue
+                text = _chunk_text(msg_chunk.content)
+                if not text:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - turn_start
+                answer += text
+                if answer_index is None:
+                    history.append({"role": "assistant", "content": answer})
+                    answer_index = len(history) - 1
+                else:
+                    history[answer_index]["content"] = answer
+                yield history
                 continue
-            for msg in event["messages"]:
-                new_thought = ""
-                if hasattr(msg, 'type') and msg.type == "ai" and hasattr(msg, "tool_calls") and msg.tool_calls:
-                    tool_calls_count += 1
-                    for tool_call in msg.tool_calls:
-                        tool_info = format_tool_call(tool_call)
-                        new_thought += f"\n\n**{t('tool_call')} #{tool_calls_count}**\n{tool_info}"
-                        time.sleep(0.3)
-                elif hasattr(msg, 'type') and msg.type == "tool":
-                    result_preview = str(msg.content)[:150] + "..." if len(str(msg.content)) > 150 else str(msg.content)
-                    new_thought += f"\n\n**{t('tool_result')}**\n`{result_preview}`"
-                    time.sleep(0.2)
-                elif hasattr(msg, 'type') and msg.type == "ai" and hasattr(msg, 'content') and msg.content:
-                    if not (hasattr(msg, "tool_calls") and msg.tool_calls):
-                        final_response_content = msg.content
-                if new_thought:
-                    accumulated_thoughts += new_thought
-                    thinking_content = accumulated_thoughts.strip()
-                    history[-1]["content"] = f"""
-<div class="thinking-box">
-    <div class="thinking-title">{t('processing_request')}</div>
-    <div class="thinking-content">{thinking_content}</div>
-</div>
-                    """
-                    yield history
-
-        final_thinking_content = accumulated_thoughts.strip()
-        history[-1]["content"] = f"""
-<div class="thinking-box done">
-    <div class="thinking-title">{t('analysis_completed')}</div>
-    <div class="thinking-content">{final_thinking_content}</div>
-</div>
-        """
-        yield history
 
-        if final_response_content:
-            time.sleep(0.5)
-            history.append({
-                "role": "assistant",
-                "content": final_response_content
-            })
-            yield history
+            new_thought = ""
+            for update in chunk.values():
+                for msg in (update or {}).get("messages", []):
+                    if msg.type == "ai" and msg.tool_calls:
+                        # Texto previo a una llamada a herramienta: es razonamiento, no la respuesta
+                        if answer:
+                            new_thought += f"\n\n{answer.strip()}"
+                            answer = ""
+                            if answer_index is not None:
+                                del history[answer_index]
+                                answer_index = None
+                            first_token_time = None
+                        tool_calls_count += 1
+                        for tool_call in msg.tool_calls:
+                            new_thought += f"\n\n**{t('tool_call', lang)} #{tool_calls_count}**\n{format_tool_call(tool_call)}"
+                    elif msg.type == "tool":
+                        content = str(msg.content)
+                        result_preview = content[:150] + "..." if len(content) > 150 else content
+                        new_thought += f"\n\n**{t('tool_result', lang)}**\n`{result_preview}`"
+                    elif msg.type == "ai" and msg.content and not answer:
+                        # Modelo sin streaming de tokens: la respuesta llega completa
+                        if first_token_time is None:
+                            first_token_time = time.perf_counter() - turn_start
+                        answer = _chunk_text(msg.content)
+                        history.append({"role": "assistant", "content": answer})
+                        answer_index = len(history) - 1
+            if new_thought:
+                accumulated_thoughts += new_thought
+                history[thinking_index]["content"] = _thinking_html(t('processing_request', lang), accumulated_thoughts)
+                yield history
+
+        total_time = time.perf_counter() - turn_start
+        timing = f"{t('total_time', lang)}: {total_time:.2f} s"
+        if first_token_time is not None:
+            timing = f"{t('first_token_time', lang)}: {first_token_time:.2f} s · {timing}"
+        turn.first_token_seconds = first_token_time
+        summary = turn.finish()
+        turn = None
+        accumulated_thoughts += "\n\n" + _perf_breakdown(summary, lang)
+        history[thinking_index]["content"] = _thinking_html(
+            f"{t('analysis_completed', lang)} <small>({timing})</small>", accumulated_thoughts, done=True
+        )
+        yield history
 
     except Exception as e:
-        error_message = f"{t('error_occurred')}: {str(e)}"
+        if turn is not None:
+            turn.first_token_seconds = first_token_time
+            turn.finish(status="error")
+            turn = None
+        error_message = f"{t('error_occurred', lang)}: {str(e)}"
         history.append({"role": "assistant", "content": error_message})
         yield history
 
-def clear_conversation(session_id):
-    if session_id in session_threads:
-        del session_threads[session_id]
+    finally:
+        # El cliente cerró el stream a mitad de turno
+        if turn is not None:
+            turn.finish(status="cancelled")
+
+async def restore_conversation(session_id, lang=None):
+    """
+    Al cargar la página: asigna un ID de sesión si el navegador no tenía uno y
+    reconstruye el chat visible a partir del historial guardado.
+    """
+    history = [{"role": "assistant", "content": t('welcome_message', lang)}]
+    if not session_id:
+        return str(uuid.uuid4()), history
+    thread_id = session_store.lookup(session_id)
+    if thread_id is None:
+        return session_id, history
+    agent_executor = await get_agent_executor(lang)
+    state = await agent_executor.aget_state({"configurable": {"thread_id": thread_id}})
+    for msg in state.values.get("messages", []):
+        if msg.type == "human":
+            history.append({"role": "user", "content": _chunk_text(msg.content)})
+        elif msg.type == "ai" and msg.content and not msg.tool_calls:
+            history.append({"role": "assistant", "content": _chunk_text(msg.content)})
+    return session_id, history
+
+async def clear_conversation(session_id, lang=None):
+    thread_id = session_store.reset(session_id)
+    if thread_id is not None:
+        await _delete_thread(thread_id)
     return [{
         "role": "assistant",
-        "content": t('conversation_restarted')
+        "content": t('conversation_restarted', lang)
     }]
-
-def update_language(lang: str):
-    """Actualiza el idioma del sistema"""
-    i18n.set_language(lang)
-    update_agent_language(lang)
\ No newline at end of file
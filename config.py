@@ -6,3 +6,75 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 if not OPENROUTER_API_KEY:
     print("Error: La variable de entorno OPENROUTER_API_KEY no está configurada.")
     exit()
+
+
+# --- Caché de características de audio ---
+FEATURE_CACHE_DIR = os.getenv(
+    "EQNITY_FEATURE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "eqnity", "features")
+)
+FEATURE_CACHE_MAX_ENTRIES = int(os.getenv("EQNITY_FEATURE_CACHE_MAX_ENTRIES", "512"))
+FEATURE_CACHE_MAX_BYTES = int(os.getenv("EQNITY_FEATURE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Archivos cuyo audio decodificado (float32, todos los canales) supere este
+# tamaño se analizan por bloques en lugar de cargarse enteros en memoria.
+STREAMING_THRESHOLD_MB = float(os.getenv("EQNITY_STREAMING_THRESHOLD_MB", "256"))
+
+# --- Render desde Reaper ---
+RENDER_TIMEOUT_SECONDS = float(os.getenv("EQNITY_RENDER_TIMEOUT_SECONDS", "30"))
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("EQNITY_RENDER_CACHE_MAX_ENTRIES", "64"))
+# Renders secos (sin el EQ evaluado) que se guardan en memoria para evaluar curvas offline
+DRY_RENDER_CACHE_MAX_ENTRIES = int(os.getenv("EQNITY_DRY_RENDER_CACHE_MAX_ENTRIES", "8"))
+EQ_MAX_CANDIDATES = int(os.getenv("EQNITY_EQ_MAX_CANDIDATES", "32"))
+
+# --- Escucha en directo (reaper/eqnity_tap.jsfx + reaper/eqnity_tap_bridge.lua) ---
+# Vacío = /dev/shm/eqnity_tap.f32 o el directorio temporal; debe coincidir con el bridge
+LIVE_TAP_PATH = os.getenv("EQNITY_LIVE_TAP_PATH", "")
+LIVE_TAP_FX_NAME = os.getenv("EQNITY_LIVE_TAP_FX_NAME", "EQnity live tap")
+# Sin escrituras durante más tiempo que esto, el tap se considera parado
+LIVE_TAP_MAX_AGE_SECONDS = float(os.getenv("EQNITY_LIVE_TAP_MAX_AGE_SECONDS", "2"))
+
+# --- Memoria de conversación ---
+MEMORY_DB_PATH = os.getenv(
+    "EQNITY_MEMORY_DB_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "eqnity", "memory.sqlite")
+)
+# Presupuesto aproximado de tokens del historial que se envía al modelo en cada paso
+MEMORY_MAX_TOKENS = int(os.getenv("EQNITY_MEMORY_MAX_TOKENS", "6000"))
+# Resultados de herramientas recientes que se envían completos; los anteriores se compactan
+MEMORY_KEEP_TOOL_RESULTS = int(os.getenv("EQNITY_MEMORY_KEEP_TOOL_RESULTS", "4"))
+MEMORY_TOOL_RESULT_CHARS = int(os.getenv("EQNITY_MEMORY_TOOL_RESULT_CHARS", "400"))
+# Las sesiones inactivas más tiempo que esto se eliminan junto con su historial
+SESSION_TTL_HOURS = float(os.getenv("EQNITY_SESSION_TTL_HOURS", "72"))
+
+# --- Concurrencia ---
+# Sesiones de chat atendidas a la vez por la cola de Gradio
+CHAT_CONCURRENCY_LIMIT = int(os.getenv("EQNITY_CHAT_CONCURRENCY_LIMIT", "4"))
+# Herramientas de sólo lectura que pueden consultar Reaper a la vez (las mutaciones van de una en una)
+REAPER_MAX_READERS = int(os.getenv("EQNITY_REAPER_MAX_READERS", "4"))
+# Procesos del pool de análisis DSP (0 = uno por CPU)
+DSP_WORKERS = int(os.getenv("EQNITY_DSP_WORKERS", "0"))
+
+# --- Arranque ---
+# Precarga en segundo plano del agente y del stack de análisis una vez visible la UI
+WARMUP_ON_START = os.getenv("EQNITY_WARMUP_ON_START", "1") != "0"
+
+# --- Separación de stems ---
+# Modelo ONNX opcional; sin él se usa el modo DSP (HPSS + máscaras espectrales)
+SEPARATION_MODEL_PATH = os.getenv("EQNITY_SEPARATION_MODEL_PATH", "")
+SEPARATION_OUTPUT_DIR = os.getenv("EQNITY_SEPARATION_OUTPUT_DIR", "output_stems")
+SEPARATION_CHUNK_SECONDS = float(os.getenv("EQNITY_SEPARATION_CHUNK_SECONDS", "30"))
+SEPARATION_OVERLAP_SECONDS = float(os.getenv("EQNITY_SEPARATION_OVERLAP_SECONDS", "2"))
+
+# --- Instrumentación de rendimiento ---
+# Traza JSONL con un registro por turno (LLM, herramientas, RPC, bytes); vacío = desactivada
+TRACE_PATH = os.getenv(
+    "EQNITY_TRACE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "eqnity", "trace.jsonl")
+)
+# Al superar este tamaño la traza rota a trace.jsonl.1, .2, ... (se conservan TRACE_BACKUPS)
+TRACE_MAX_BYTES = int(os.getenv("EQNITY_TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv("EQNITY_TRACE_BACKUPS", "3"))
+# Endpoint local con las métricas en formato de texto de Prometheus (0 = desactivado)
+METRICS_HOST = os.getenv("EQNITY_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("EQNITY_METRICS_PORT", "9464"))
@@ -0,0 +1,170 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class FeatureCache:
+    """
+    Caché persistente en disco, direccionada por contenido, para resultados de análisis.
+
+    Cada entrada es un JSON cuyo nombre incluye la versión del conjunto de
+    características, de modo que al cambiar la versión las entradas antiguas
+    dejan de coincidir y se purgan. El mtime de cada archivo se usa como marca
+    de último acceso para la evicción LRU.
+
+    Se consulta desde los procesos del pool DSP, así que no lleva contadores:
+    quien extrae devuelve si acertó y la herramienta lo anota con
+    core.instrumentation.record_cache_lookup.
+    """
+
+    def __init__(self, cache_dir: str, version: str, max_entries: int = 512, max_bytes: int = 16 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.version = str(version)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._digests = {}
+        self._prefix = f"v{self.version}-"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._purge_stale_versions()
+        except OSError:
+            pass
+
+    def file_digest(self, path: str) -> str:
+        """Hash del contenido del archivo, memorizado por (ruta, tamaño, mtime)."""
+        st = os.stat(path)
+        stamp = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        digest = self._digests.get(stamp)
+        if digest is None:
+            h = hashlib.blake2b(digest_size=20)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()
+            if len(self._digests) > 1024:
+                self._digests.clear()
+            self._digests[stamp] = digest
+        return digest
+
+    def make_key(self, path: str, params: dict) -> str:
+        """Clave a partir del contenido del archivo y de los parámetros de análisis."""
+        payload = json.dumps({"content": self.file_digest(path), "params": params}, sort_keys=True)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._prefix}{key}.json")
+
+    def get(self, key: str):
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != self.version:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def put(self, key: str, value) -> None:
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "value": value}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            self._remove(tmp_path)
+            return
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for e in it:
+                    if e.name.endswith(".json"):
+                        try:
+                            st = e.stat()
+                        except OSError:
+                            continue
+                        entries.append((st.st_mtime_ns, st.st_size, e.path, e.name))
+        except OSError:
+            pass
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total_bytes = sum(size for _, size, _, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path, _ = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+
+    def _purge_stale_versions(self) -> None:
+        for _, _, path, name in self._entries():
+            if not name.startswith(self._prefix):
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        for _, _, path, _ in self._entries():
+            self._remove(path)
+
+
+class MemoryLRUCache:
+    """Caché LRU en memoria, acotada por número de entradas, con contadores de aciertos y fallos."""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,238 @@
+import os
+import time
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import REAPER_MAX_READERS, DSP_WORKERS
+from core.instrumentation import tool_span, phase, add_phase_time
+from core.warmup import init_dsp_worker
+
+_dsp_pool = None
+_dsp_pool_lock = threading.Lock()
+
+
+class ReaperScheduler:
+    """
+    Planificador de acceso a Reaper: lecturas concurrentes, mutaciones exclusivas.
+
+    Las escrituras (cambios de parámetros, FX, mute o configuración de render)
+    esperan a que terminen las lecturas en curso y bloquean las nuevas, de modo
+    que nadie observa el proyecto a medio modificar. Las escrituras tienen
+    preferencia para no quedar bloqueadas por un flujo continuo de lecturas.
+    Es reentrante por hilo: una operación ya dentro del planificador puede
+    volver a entrar sin bloquearse.
+    """
+
+    def __init__(self, max_readers=4):
+        self.max_readers = max(1, max_readers)
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+        self.reads = 0
+        self.writes = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        depth = getattr(self._local, "read_depth", 0)
+        if self._writer == me or depth:
+            self._local.read_depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.read_depth = depth
+            return
+        with self._cond:
+            while (self._writer is not None or self._waiting_writers
+                   or self._readers >= self.max_readers):
+                self._cond.wait()
+            self._readers += 1
+            self.reads += 1
+        self._local.read_depth = 1
+        try:
+            yield
+        finally:
+            self._local.read_depth = 0
+            with self._cond:
+                self._readers -= 1
+                self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+            else:
+                if getattr(self._local, "read_depth", 0):
+                    raise RuntimeError("No se puede pasar de lectura a escritura en Reaper dentro de la misma operación.")
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self._writer = me
+                self._writer_depth = 1
+                self.writes += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "reads": self.reads,
+                "writes": self.writes,
+                "active_readers": self._readers,
+                "writer_active": self._writer is not None,
+                "waiting_writers": self._waiting_writers,
+            }
+
+
+reaper_scheduler = ReaperScheduler(REAPER_MAX_READERS)
+
+
+def dsp_pool_workers():
+    """Número de procesos del pool DSP compartido (EQNITY_DSP_WORKERS o uno por CPU)."""
+    return DSP_WORKERS or os.cpu_count() or 1
+
+
+def get_dsp_pool(max_workers=None):
+    """
+    Pool de procesos compartido para el análisis DSP (se crea en el primer uso).
+    Cada proceso se precalienta al arrancar (core.warmup.init_dsp_worker).
+    """
+    global _dsp_pool
+    with _dsp_pool_lock:
+        if _dsp_pool is None:
+            _dsp_pool = ProcessPoolExecutor(max_workers=max_workers or dsp_pool_workers(),
+                                            initializer=init_dsp_worker)
+        return _dsp_pool
+
+
+def replace_broken_dsp_pool(pool):
+    """
+    Retira `pool` y devuelve el pool DSP compartido vigente, creando uno nuevo si
+    `pool` era el compartido. Un proceso que muere (BrokenProcessPool) deja el
+    pool inservible para todas las llamadas siguientes, no sólo para la suya.
+    """
+    global _dsp_pool
+    with _dsp_pool_lock:
+        if _dsp_pool is pool:
+            _dsp_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+    return get_dsp_pool()
+
+
+def run_on_reaper(fn, *args, write=True, **kwargs):
+    """Ejecuta fn con acceso exclusivo a Reaper (o compartido con write=False)."""
+    wait_start = time.perf_counter()
+    with reaper_scheduler.write() if write else reaper_scheduler.read():
+        add_phase_time("reaper_wait", time.perf_counter() - wait_start)
+        with phase("reaper"):
+            return fn(*args, **kwargs)
+
+
+def run_dsp(fn, *args):
+    """
+    Ejecuta fn (función de módulo, serializable) en el pool de procesos DSP.
+    Si un proceso del pool muere, el pool se sustituye y fn se reintenta una vez.
+    """
+    with phase("dsp"):
+        pool = get_dsp_pool()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            pool = replace_broken_dsp_pool(pool)
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # Que las siguientes llamadas no hereden el pool roto
+            replace_broken_dsp_pool(pool)
+            raise
+
+
+def map_dsp(fn, items):
+    """
+    Como run_dsp para varias entradas en paralelo: devuelve [fn(x) for x in items].
+    Si un proceso del pool muere, el pool se sustituye y las entradas que no
+    terminaron se reintentan una vez.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    pending = list(range(len(items)))
+    with phase("dsp"):
+        for attempt in range(2):
+            pool = get_dsp_pool()
+            futures, lost = {}, []
+            try:
+                for i in pending:
+                    futures[i] = pool.submit(fn, items[i])
+            except BrokenProcessPool:
+                # El pool ya estaba roto: todo lo que falte se reintenta
+                lost = [i for i in pending if i not in futures]
+            for i, future in futures.items():
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    lost.append(i)
+            if not lost:
+                return results
+            # Que las siguientes llamadas no hereden el pool roto
+            replace_broken_dsp_pool(pool)
+            pending = sorted(lost)
+        raise BrokenProcessPool(f"Murió un proceso del pool DSP dos veces ({len(pending)} de {len(items)} entradas).")
+
+
+def concurrent_tool(base_tool, kind="reaper", write=False):
+    """
+    Devuelve una copia de la herramienta con variante síncrona y asíncrona.
+
+    - kind="reaper": el cuerpo accede a Reaper; con write=True en exclusiva,
+      si no en paralelo con otras lecturas.
+    - kind="local": el cuerpo se ejecuta tal cual (la propia herramienta
+      reparte su trabajo entre run_on_reaper y run_dsp).
+
+    La variante asíncrona delega en un hilo, de modo que varias llamadas sin
+    conflicto de un mismo paso del agente se ejecutan a la vez. Cada ejecución
+    se mide con core.instrumentation.tool_span; un resultado que empieza por
+    "Error" cuenta como fallo.
+    """
+    from langchain_core.tools import StructuredTool
+
+    func = base_tool.func
+
+    @functools.wraps(func)
+    def sync_func(*args, **kwargs):
+        with tool_span(base_tool.name) as span:
+            if kind == "reaper":
+                result = run_on_reaper(func, *args, write=write, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            span["error"] = isinstance(result, str) and result.lstrip().startswith("Error")
+            return result
+
+    @functools.wraps(func)
+    async def async_func(*args, **kwargs):
+        return await asyncio.to_thread(sync_func, *args, **kwargs)
+
+    return StructuredTool(
+        name=base_tool.name,
+        description=base_tool.description,
+        args_schema=base_tool.args_schema,
+        func=sync_func,
+        coroutine=async_func,
+        return_direct=base_tool.return_direct,
+    )
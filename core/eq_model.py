@@ -0,0 +1,215 @@
+"""
+Modelo offline de ReaEQ para evaluar curvas de EQ sobre un render seco.
+
+Cada banda se modela como un biquad RBJ (Audio EQ Cookbook). Las métricas se
+calculan en el dominio de la frecuencia: el render seco se trocea una sola vez
+en bloques de 400 ms con salto de 100 ms (los bloques "momentary" de
+ITU-R BS.1770) y cada candidato sólo multiplica esos espectros por la
+respuesta en magnitud de su curva, de modo que puntuar N candidatos son unos
+pocos productos de matrices en lugar de N filtrados y N análisis.
+
+Los bloques usan ventana rectangular, así que la energía por bloque coincide
+con la del filtrado en el tiempo salvo en los bordes de cada bloque (la cola
+del filtro no se arrastra al siguiente); para EQ de mezcla la diferencia es
+de décimas de dB. En bandas casi vacías (p. ej. un notch sobre un tono puro)
+el error en dB de band_energy crece, aunque la energía que falta sea ínfima.
+Ver benchmarks/bench_eq_model.py.
+"""
+import math
+import numpy as np
+import scipy.signal
+
+BAND_TYPES = ("peak", "low_shelf", "high_shelf", "low_pass", "high_pass", "notch", "band_pass")
+METRICS = ("centroid", "band_energy", "lufs")
+
+BLOCK_SECONDS = 0.4
+HOP_SECONDS = 0.1
+
+# Filtro de ponderación K de BS.1770: estantería + paso alto de Brecht De Man
+# (pyloudnorm, filter_class="DeMan"); a 48 kHz da los coeficientes de la norma
+_K_SHELF_HZ, _K_SHELF_DB, _K_SHELF_Q = 1681.9744509555319, 3.99984385397, 0.7071752369554193
+_K_HIGHPASS_HZ, _K_HIGHPASS_Q = 38.13547087613982, 0.5003270373253953
+_ABSOLUTE_GATE_LUFS = -70.0
+_RELATIVE_GATE_LU = -10.0
+
+
+def octaves_to_q(octaves):
+    n = 2.0 ** float(octaves)
+    return math.sqrt(n) / (n - 1.0)
+
+
+def q_to_octaves(q):
+    return 2.0 / math.log(2.0) * math.asinh(1.0 / (2.0 * float(q)))
+
+
+def biquad(band, sr):
+    """
+    Coeficientes (sección SOS: b0, b1, b2, 1, a1, a2) de una banda.
+
+    `band` es un dict con type, freq_hz, gain_db y bandwidth_oct (o q).
+    """
+    kind = band.get("type", "peak")
+    if kind not in BAND_TYPES:
+        raise ValueError(f"Tipo de banda '{kind}' no soportado. Usa uno de: {', '.join(BAND_TYPES)}.")
+    nyquist = sr / 2.0
+    w0 = 2.0 * np.pi * min(max(float(band["freq_hz"]), 1.0), nyquist * 0.999) / sr
+    cos_w0, sin_w0 = np.cos(w0), np.sin(w0)
+    q = band.get("q") or octaves_to_q(band.get("bandwidth_oct") or 1.0)
+    alpha = sin_w0 / (2.0 * q)
+    A = 10.0 ** (float(band.get("gain_db") or 0.0) / 40.0)
+
+    if kind == "peak":
+        b = [1 + alpha * A, -2 * cos_w0, 1 - alpha * A]
+        a = [1 + alpha / A, -2 * cos_w0, 1 - alpha / A]
+    elif kind == "low_shelf":
+        k = 2 * np.sqrt(A) * alpha
+        b = [A * ((A + 1) - (A - 1) * cos_w0 + k), 2 * A * ((A - 1) - (A + 1) * cos_w0),
+             A * ((A + 1) - (A - 1) * cos_w0 - k)]
+        a = [(A + 1) + (A - 1) * cos_w0 + k, -2 * ((A - 1) + (A + 1) * cos_w0), (A + 1) + (A - 1) * cos_w0 - k]
+    elif kind == "high_shelf":
+        k = 2 * np.sqrt(A) * alpha
+        b = [A * ((A + 1) + (A - 1) * cos_w0 + k), -2 * A * ((A - 1) + (A + 1) * cos_w0),
+             A * ((A + 1) + (A - 1) * cos_w0 - k)]
+        a = [(A + 1) - (A - 1) * cos_w0 + k, 2 * ((A - 1) - (A + 1) * cos_w0), (A + 1) - (A - 1) * cos_w0 - k]
+    elif kind == "low_pass":
+        b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "high_pass":
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "notch":
+        b = [1, -2 * cos_w0, 1]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    else:  # band_pass (ganancia 0 dB en el pico)
+        b = [alpha, 0.0, -alpha]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    return np.concatenate([np.asarray(b) / a[0], [1.0], np.asarray(a[1:]) / a[0]])
+
+
+def k_weighting_sos(sr):
+    """
+    Cascada SOS del filtro K a la frecuencia de muestreo `sr`. No usa las
+    fórmulas RBJ de biquad(): con ellas la ganancia difiere de la norma en
+    décimas de dB.
+    """
+    k = math.tan(math.pi * _K_SHELF_HZ / sr)
+    vh = 10.0 ** (_K_SHELF_DB / 20.0)
+    vb = vh ** 0.499666774155
+    a0 = 1.0 + k / _K_SHELF_Q + k * k
+    shelf = [(vh + vb * k / _K_SHELF_Q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / _K_SHELF_Q + k * k) / a0,
+             1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / _K_SHELF_Q + k * k) / a0]
+    k = math.tan(math.pi * _K_HIGHPASS_HZ / sr)
+    a0 = 1.0 + k / _K_HIGHPASS_Q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / _K_HIGHPASS_Q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+def curve_sos(bands, sr):
+    """Cascada SOS de una curva; las bandas de pico/estantería con 0 dB se omiten."""
+    sections = [
+        biquad(band, sr) for band in bands
+        if band.get("type", "peak") not in ("peak", "low_shelf", "high_shelf") or band.get("gain_db")
+    ]
+    return np.vstack(sections) if sections else np.array([[1.0, 0.0, 0.0, 1.0, 0.0, 0.0]])
+
+
+def curve_response(bands, sr, freqs):
+    """Respuesta compleja de la curva en las frecuencias `freqs` (Hz)."""
+    _, h = scipy.signal.sosfreqz(curve_sos(bands, sr), worN=freqs, fs=sr)
+    return h
+
+
+def apply_curve(audio, sr, bands):
+    """Filtra `audio` (muestras, canales) en el tiempo con la curva; valida el modelo en bench_eq_model."""
+    return scipy.signal.sosfilt(curve_sos(bands, sr), audio, axis=0).astype(np.float32)
+
+
+class DryRender:
+    """
+    Render seco de una pista con sus espectros por bloque precalculados.
+
+    `audio` tiene forma (muestras, canales). Se guarda en la caché de renders
+    secos y se reutiliza para evaluar cualquier número de curvas.
+    """
+
+    def __init__(self, audio, sr):
+        audio = np.asarray(audio, dtype=np.float32)
+        self.audio = audio if audio.ndim == 2 else audio[:, np.newaxis]
+        self.sr = int(sr)
+        n = self.audio.shape[0]
+        if n < 2:
+            raise ValueError("El render seco está vacío.")
+        block = int(round(BLOCK_SECONDS * sr))
+        hop = int(round(HOP_SECONDS * sr))
+        if n < block:
+            block, hop = max(n, 2), max(n, 2)
+        block -= block % 2
+        frames = np.lib.stride_tricks.sliding_window_view(self.audio, block, axis=0)[::hop]
+        # (canales, bloques, bins)
+        spectra = np.fft.rfft(np.moveaxis(frames, 1, 0), axis=-1)
+        self.freqs = np.fft.rfftfreq(block, 1.0 / sr)
+        self.power = np.abs(spectra) ** 2
+        self.mono_magnitude = np.abs(spectra.mean(axis=0))
+        # Parseval con rfft: bins interiores cuentan doble; resultado = media cuadrática del bloque
+        self.parseval = np.full(len(self.freqs), 2.0 / block ** 2)
+        self.parseval[0] = 1.0 / block ** 2
+        self.parseval[-1] = 1.0 / block ** 2
+        _, k_response = scipy.signal.sosfreqz(k_weighting_sos(sr), worN=self.freqs, fs=sr)
+        self.k_weighting = np.abs(k_response) ** 2
+
+    def evaluate(self, curves, targets):
+        """
+        Métricas y puntuación de cada curva (lista de listas de bandas).
+
+        Devuelve, por curva, {"values": [...], "errors": [...], "score": float}
+        con un valor y un error por objetivo.
+
+        Cada objetivo es un dict con metric ('centroid' en Hz, 'band_energy' en
+        dB respecto a la energía total entre low_hz y high_hz, o 'lufs'), value
+        y weight. El error de cada objetivo se mide en unidades comparables
+        (semitonos para el centroide, dB/LU para el resto) y la puntuación es
+        la suma ponderada: menor es mejor.
+        """
+        gains = np.stack([np.abs(curve_response(bands, self.sr, self.freqs)) for bands in curves])
+        power_gains = gains ** 2
+        results = [{"values": [], "errors": [], "score": 0.0} for _ in curves]
+
+        for target in targets:
+            metric = target["metric"]
+            if metric == "centroid":
+                weighted = self.mono_magnitude @ (gains * self.freqs).T
+                total = self.mono_magnitude @ gains.T
+                valid = total > 1e-12
+                values = np.where(valid, weighted / np.where(valid, total, 1.0), 0.0).mean(axis=0)
+                errors = 12.0 * np.abs(np.log2(np.maximum(values, 1e-3) / max(target["value"], 1e-3)))
+            elif metric == "band_energy":
+                low, high = target.get("low_hz") or 0.0, target.get("high_hz") or self.sr / 2.0
+                in_band = ((self.freqs >= low) & (self.freqs <= high)).astype(np.float64)
+                total = np.einsum("cbk,nk->n", self.power, power_gains)
+                band = np.einsum("cbk,nk->n", self.power, power_gains * in_band)
+                values = 10.0 * np.log10(np.maximum(band, 1e-20) / np.maximum(total, 1e-20))
+                errors = np.abs(values - target["value"])
+            elif metric == "lufs":
+                values = self._integrated_loudness(power_gains)
+                errors = np.abs(values - target["value"])
+            else:
+                raise ValueError(f"Métrica '{metric}' no soportada. Usa una de: {', '.join(METRICS)}.")
+            weight = float(target.get("weight", 1.0))
+            for i, result in enumerate(results):
+                result["values"].append(float(values[i]))
+                result["errors"].append(float(errors[i]))
+                result["score"] += weight * float(errors[i])
+        return results
+
+    def _integrated_loudness(self, power_gains):
+        """Loudness integrado (LUFS) por curva, con las puertas absoluta y relativa de BS.1770."""
+        # Media cuadrática ponderada K por bloque, sumada entre canales: (curvas, bloques)
+        z = np.einsum("cbk,nk->nb", self.power, power_gains * self.k_weighting * self.parseval)
+        loudness = -0.691 + 10.0 * np.log10(np.maximum(z, 1e-20))
+        gated = loudness > _ABSOLUTE_GATE_LUFS
+        counts = np.maximum(gated.sum(axis=1), 1)
+        relative = -0.691 + 10.0 * np.log10(np.maximum((z * gated).sum(axis=1) / counts, 1e-20)) + _RELATIVE_GATE_LU
+        gated &= loudness > relative[:, np.newaxis]
+        counts = gated.sum(axis=1)
+        mean = (z * gated).sum(axis=1) / np.maximum(counts, 1)
+        return np.where(counts > 0, -0.691 + 10.0 * np.log10(np.maximum(mean, 1e-20)), -np.inf)
@@ -0,0 +1,387 @@
+import math
+import numpy as np
+import librosa
+import scipy.fft
+import scipy.signal
+import soundfile as sf
+
+# Parámetros por defecto, idénticos a los de las funciones de librosa.feature
+DEFAULT_N_FFT = 2048
+DEFAULT_HOP_LENGTH = 512
+DEFAULT_N_MELS = 128
+
+
+def _framewise_rms(y, frame_length, hop_length):
+    """RMS por ventana equivalente a librosa.feature.rms(center=True, pad_mode='constant')."""
+    half = frame_length // 2
+    padded = np.pad(y.astype(np.float64), (half, half), mode="constant")
+    n_frames = 1 + (len(padded) - frame_length) // hop_length
+    starts = np.arange(n_frames) * hop_length
+    energy = np.concatenate(([0.0], np.cumsum(padded * padded)))
+    power = (energy[starts + frame_length] - energy[starts]) / frame_length
+    return np.sqrt(np.maximum(power, 0.0))
+
+
+def _framewise_zcr(y, frame_length, hop_length, threshold=1e-10):
+    """Tasa de cruces por cero equivalente a librosa.feature.zero_crossing_rate(center=True)."""
+    half = frame_length // 2
+    padded = np.pad(y, (half, half), mode="edge")
+    signs = np.signbit(np.where(np.abs(padded) <= threshold, 0.0, padded))
+    crossings = np.concatenate(([False], signs[1:] != signs[:-1]))
+    counts = np.concatenate(([0], np.cumsum(crossings)))
+    n_frames = 1 + (len(padded) - frame_length) // hop_length
+    starts = np.arange(n_frames) * hop_length
+    # Como en librosa (pad=False), la primera muestra de cada ventana no cuenta
+    return (counts[starts + frame_length] - counts[starts + 1]) / frame_length
+
+
+def _spectral_shape(S, freqs):
+    """Centroide, ancho de banda y rolloff (85%) por ventana de un espectrograma de magnitud."""
+    column_sum = S.sum(axis=0)
+    column_sum = np.where(column_sum > np.finfo(S.dtype).tiny, column_sum, 1.0)
+    S_norm = S / column_sum
+    centroid = np.sum(freqs * S_norm, axis=0)
+    bandwidth = np.sqrt(np.sum(S_norm * (freqs - centroid) ** 2, axis=0))
+
+    cumulative = np.cumsum(S, axis=0)
+    below = cumulative < 0.85 * cumulative[-1]
+    rolloff = np.nanmin(np.where(below, np.nan, freqs), axis=0)
+    return centroid, bandwidth, rolloff
+
+
+# Histograma por banda mel del modo por bloques: recorte top_db con el máximo global
+_TOP_DB = 80.0
+_MEL_DB_MIN = -100.0   # 10 * log10(amin=1e-10)
+_MEL_DB_MAX = 100.0
+_MEL_DB_STEP = 0.1
+
+
+# Grupos de características que puede pedir un perfil de análisis
+FEATURE_GROUPS = ("spectral", "rms", "zcr", "mfcc", "tempo")
+# Claves del resultado de cada grupo
+_GROUP_KEYS = {
+    "spectral": ("spectral_centroid", "spectral_rolloff", "spectral_bandwidth"),
+    "rms": ("rms",),
+    "zcr": ("zero_crossing_rate",),
+    "mfcc": ("mfcc_means",),
+    "tempo": ("tempo",),
+}
+
+
+def compute_features(y, sr, n_fft=DEFAULT_N_FFT, hop_length=DEFAULT_HOP_LENGTH,
+                     n_mels=DEFAULT_N_MELS, n_mfcc=13, n_mfcc_kept=5, features=FEATURE_GROUPS):
+    """
+    Calcula todas las características a partir de un único STFT de magnitud,
+    una única proyección mel y una única envolvente de onsets.
+
+    Devuelve el mismo diccionario que las llamadas individuales a librosa.feature.
+    Con `features` se calcula sólo un subconjunto de FEATURE_GROUPS; las claves
+    de los grupos omitidos no aparecen en el resultado (sin MFCC ni tempo no
+    se calcula el mel).
+    """
+    result = {}
+    # --- Representaciones compartidas ---
+    S = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length))
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=n_fft)[:, np.newaxis]
+    mel_db = None
+    if "mfcc" in features or "tempo" in features:
+        mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+        mel_db = librosa.power_to_db(mel_basis @ (S * S))
+
+    # --- Características espectrales (centroide, ancho de banda, rolloff) ---
+    if "spectral" in features:
+        centroid, bandwidth, rolloff = _spectral_shape(S, freqs)
+        result["spectral_centroid"] = float(np.mean(centroid))
+
+    # --- Características temporales ---
+    if "zcr" in features:
+        result["zero_crossing_rate"] = float(np.mean(_framewise_zcr(y, n_fft, hop_length)))
+
+    # --- Envolvente de onsets (flujo espectral mel) y tempo ---
+    if "tempo" in features:
+        flux = np.maximum(0.0, mel_db[:, 1:] - mel_db[:, :-1]).mean(axis=0)
+        onset_env = np.pad(flux, (1 + n_fft // (2 * hop_length), 0))[: mel_db.shape[1]]
+        tempo = librosa.feature.tempo(onset_envelope=onset_env, sr=sr, hop_length=hop_length)
+        result["tempo"] = float(np.mean(tempo))
+
+    if "rms" in features:
+        result["rms"] = float(np.mean(_framewise_rms(y, n_fft, hop_length)))
+
+    if "spectral" in features:
+        result["spectral_rolloff"] = float(np.mean(rolloff))
+        result["spectral_bandwidth"] = float(np.mean(bandwidth))
+
+    # --- MFCC a partir del mismo mel en dB ---
+    if "mfcc" in features:
+        mfccs = scipy.fft.dct(mel_db, axis=0, type=2, norm="ortho")[:n_mfcc]
+        result["mfcc_means"] = [float(v) for v in mfccs.mean(axis=1)[:n_mfcc_kept]]
+
+    return result
+
+
+def merge_features(results, weights):
+    """
+    Combina las características de varios fragmentos (extractos o canales).
+
+    Medias ponderadas por `weights` (p. ej. número de muestras), salvo el tempo,
+    que se toma como la mediana de los fragmentos.
+    """
+    if len(results) == 1:
+        return results[0]
+    weights = np.asarray(weights, dtype=np.float64)
+    weights = weights / weights.sum()
+    merged = {}
+    for key in results[0]:
+        values = [r[key] for r in results]
+        if key == "tempo":
+            merged[key] = float(np.median(values))
+        elif key == "mfcc_means":
+            merged[key] = [float(v) for v in np.average(np.asarray(values), axis=0, weights=weights)]
+        else:
+            merged[key] = float(np.average(values, weights=weights))
+    return merged
+
+
+def _tempo_from_autocovariance(acov, onset_rate, start_bpm=120.0, std_bpm=1.0, max_tempo=320.0):
+    """Tempo (BPM) a partir de la autocovarianza de la envolvente de onsets, con el prior log-normal de librosa."""
+    if acov[0] <= 0:
+        return 0.0
+    lags = np.arange(1, len(acov))
+    strength = np.maximum(acov[1:] / acov[0], 0.0)
+    bpms = 60.0 * onset_rate / lags
+    logprior = -0.5 * ((np.log2(bpms) - np.log2(start_bpm)) / std_bpm) ** 2
+    score = np.log1p(1e6 * strength) + logprior
+    score[bpms > max_tempo] = -np.inf
+    return float(bpms[int(np.argmax(score))])
+
+
+class StreamingFeatureAnalyzer:
+    """
+    Analizador por bloques con memoria acotada, independiente de la duración del archivo.
+
+    Recibe bloques con `push(block)` y mantiene estadísticas acumuladas de
+    centroide, rolloff, ancho de banda, RMS, ZCR y MFCC. Entre bloques conserva
+    las últimas n_fft - hop muestras para que el enventanado sea idéntico al de
+    librosa (center=True). El tempo se estima con la autocovarianza acumulada de
+    una envolvente de onsets diezmada a ~43 Hz, con una ventana de retardos fija.
+
+    Tolerancias frente a compute_features (archivos de más de 10 s):
+    - Centroide, rolloff, ancho de banda y RMS: < 0.5 % relativo.
+    - ZCR: < 1 % relativo (sólo difiere el relleno de las ventanas extremas).
+    - Medias de MFCC: < 0.5 dB. El recorte top_db usa el máximo global, como
+      en memoria: cada banda mel acumula un histograma de 0.1 dB (recuento y
+      suma exacta por cubeta) y el recorte se aplica al finalizar; sólo la
+      cubeta que contiene el umbral se aproxima.
+    - Tempo: ±4 BPM en material con pulso estable; puede diferir en una
+      octava en material ambiguo, porque el estimador no es el de librosa.
+    """
+
+    def __init__(self, sr, n_fft=DEFAULT_N_FFT, hop_length=DEFAULT_HOP_LENGTH, n_mels=DEFAULT_N_MELS,
+                 n_mfcc=13, n_mfcc_kept=5, onset_rate=43.0, max_lag_seconds=4.0):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mfcc = n_mfcc
+        self.n_mfcc_kept = n_mfcc_kept
+        self._window = librosa.filters.get_window("hann", n_fft, fftbins=True).astype(np.float32)
+        self._freqs = librosa.fft_frequencies(sr=sr, n_fft=n_fft)[:, np.newaxis]
+        self._mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+        # Relleno inicial equivalente a center=True
+        self._carry = np.zeros(n_fft // 2, dtype=np.float32)
+        self._frames = 0
+        self._sums = {"centroid": 0.0, "bandwidth": 0.0, "rolloff": 0.0, "rms": 0.0, "zcr": 0.0}
+        self._n_mels = n_mels
+        self._db_bins = int(round((_MEL_DB_MAX - _MEL_DB_MIN) / _MEL_DB_STEP))
+        self._db_counts = np.zeros(n_mels * self._db_bins)
+        self._db_sums = np.zeros(n_mels * self._db_bins)
+        self._db_max = -np.inf
+        self._prev_mel_db = None
+        # Envolvente de onsets diezmada y autocorrelación acumulada
+        frame_rate = sr / hop_length
+        self._decimation = max(1, int(round(frame_rate / onset_rate)))
+        self.onset_rate = frame_rate / self._decimation
+        self._max_lag = max(2, int(round(max_lag_seconds * self.onset_rate)))
+        self._onset_pending = np.zeros(0)
+        self._onset_history = np.zeros(self._max_lag)
+        self._onset_count = 0
+        self._onset_sum = 0.0
+        self._acf = np.zeros(self._max_lag + 1)
+        self._finalized = False
+
+    def push(self, block):
+        """Añade un bloque de audio (mono, o multicanal con forma (muestras, canales))."""
+        if self._finalized:
+            raise RuntimeError("El analizador ya fue finalizado.")
+        block = np.asarray(block, dtype=np.float32)
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        buf = np.concatenate((self._carry, block))
+        n_frames = 0 if len(buf) < self.n_fft else 1 + (len(buf) - self.n_fft) // self.hop_length
+        if n_frames:
+            used = (n_frames - 1) * self.hop_length + self.n_fft
+            frames = librosa.util.frame(buf[:used], frame_length=self.n_fft, hop_length=self.hop_length)
+            self._process(frames)
+        self._carry = buf[n_frames * self.hop_length:].copy()
+
+    def _process(self, frames):
+        S = np.abs(np.fft.rfft(frames * self._window[:, np.newaxis], axis=0))
+        centroid, bandwidth, rolloff = _spectral_shape(S, self._freqs)
+
+        mel_db = 10.0 * np.log10(np.maximum(1e-10, self._mel_basis @ (S * S)))
+        self._db_max = max(self._db_max, float(mel_db.max()))
+        self._accumulate_mel_db(mel_db)
+        # El flujo de onsets usa el recorte con el máximo acumulado hasta ahora
+        mel_db = np.maximum(mel_db, self._db_max - _TOP_DB)
+
+        rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=0))
+        signs = np.signbit(np.where(np.abs(frames) <= 1e-10, 0.0, frames))
+        zcr = np.count_nonzero(signs[1:] != signs[:-1], axis=0) / self.n_fft
+
+        self._frames += frames.shape[1]
+        self._sums["centroid"] += float(centroid.sum())
+        self._sums["bandwidth"] += float(bandwidth.sum())
+        self._sums["rolloff"] += float(rolloff.sum())
+        self._sums["rms"] += float(rms.sum())
+        self._sums["zcr"] += float(zcr.sum())
+
+        stacked = mel_db if self._prev_mel_db is None else np.hstack((self._prev_mel_db, mel_db))
+        flux = np.maximum(0.0, stacked[:, 1:] - stacked[:, :-1]).mean(axis=0)
+        self._prev_mel_db = mel_db[:, -1:]
+        self._push_onsets(flux)
+
+    def _accumulate_mel_db(self, mel_db):
+        """Suma los valores sin recortar al histograma (banda mel, cubeta de 0.1 dB)."""
+        bins = np.clip(((mel_db - _MEL_DB_MIN) / _MEL_DB_STEP).astype(np.int64), 0, self._db_bins - 1)
+        flat = (bins + (np.arange(self._n_mels) * self._db_bins)[:, np.newaxis]).ravel()
+        size = len(self._db_counts)
+        self._db_counts += np.bincount(flat, minlength=size)
+        self._db_sums += np.bincount(flat, weights=mel_db.ravel(), minlength=size)
+
+    def _mean_clipped_mel_db(self):
+        """Media por banda mel de max(mel_db, máximo global - top_db)."""
+        floor = self._db_max - _TOP_DB
+        counts = self._db_counts.reshape(self._n_mels, self._db_bins)
+        sums = self._db_sums.reshape(self._n_mels, self._db_bins)
+        edges = _MEL_DB_MIN + _MEL_DB_STEP * np.arange(self._db_bins)
+        above = edges >= floor
+        below = edges + _MEL_DB_STEP <= floor
+        # Cubeta que contiene el umbral: se usa su media recortada
+        straddle = ~(above | below)
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), floor)
+        total = (sums[:, above].sum(axis=1) + floor * counts[:, below].sum(axis=1)
+                 + (np.maximum(means, floor) * counts)[:, straddle].sum(axis=1))
+        return total / self._frames
+
+    def _push_onsets(self, flux):
+        pending = np.concatenate((self._onset_pending, flux))
+        usable = len(pending) // self._decimation * self._decimation
+        self._onset_pending = pending[usable:]
+        if not usable:
+            return
+        onsets = pending[:usable].reshape(-1, self._decimation).mean(axis=1)
+        L = self._max_lag
+        z = np.concatenate((self._onset_history, onsets))
+        m = len(onsets)
+        for lag in range(L + 1):
+            self._acf[lag] += np.dot(z[L:], z[L - lag: L - lag + m])
+        self._onset_history = z[-L:]
+        self._onset_count += m
+        self._onset_sum += float(onsets.sum())
+
+    def finalize(self):
+        """Procesa el relleno final y devuelve el mismo diccionario que compute_features."""
+        if not self._finalized:
+            self.push(np.zeros(self.n_fft // 2, dtype=np.float32))
+            self._finalized = True
+        if not self._frames:
+            return {
+                "spectral_centroid": 0.0, "zero_crossing_rate": 0.0, "tempo": 0.0, "rms": 0.0,
+                "spectral_rolloff": 0.0, "spectral_bandwidth": 0.0, "mfcc_means": [0.0] * self.n_mfcc_kept,
+            }
+        tempo = 0.0
+        if self._onset_count > self._max_lag:
+            mean = self._onset_sum / self._onset_count
+            acov = self._acf / self._onset_count - mean * mean
+            tempo = _tempo_from_autocovariance(acov, self.onset_rate)
+        n = self._frames
+        mfccs = scipy.fft.dct(self._mean_clipped_mel_db(), type=2, norm="ortho")[: self.n_mfcc]
+        return {
+            "spectral_centroid": self._sums["centroid"] / n,
+            "zero_crossing_rate": self._sums["zcr"] / n,
+            "tempo": tempo,
+            "rms": self._sums["rms"] / n,
+            "spectral_rolloff": self._sums["rolloff"] / n,
+            "spectral_bandwidth": self._sums["bandwidth"] / n,
+            "mfcc_means": [float(v) for v in mfccs[: self.n_mfcc_kept]],
+        }
+
+
+class BlockResampler:
+    """
+    scipy.signal.resample_poly por bloques: la salida concatenada es la misma
+    que la de resample_poly sobre la señal entera.
+
+    Cada bloque se procesa con `context` muestras de la señal a cada lado
+    (al menos media longitud del filtro) y se descartan las salidas de los
+    bordes. Los tramos empiezan en múltiplos de `down` para que la fase del
+    diezmado coincida con la de la señal entera.
+    """
+
+    def __init__(self, orig_sr, target_sr):
+        g = math.gcd(int(orig_sr), int(target_sr))
+        self.up, self.down = int(target_sr) // g, int(orig_sr) // g
+        # Semilongitud del filtro que usa resample_poly, en muestras de entrada
+        half_len = 10 * max(self.up, self.down) / self.up
+        self.context = math.ceil((half_len + 2) / self.down) * self.down
+        self._history = np.zeros(self.context, dtype=np.float32)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._total_in = 0
+        self._total_out = 0
+
+    def _resample(self, data, n_out):
+        y = scipy.signal.resample_poly(np.concatenate((self._history, data)), self.up, self.down)
+        start = self.context * self.up // self.down
+        return y[start:start + n_out].astype(np.float32)
+
+    def push(self, x):
+        """Añade muestras (mono) y devuelve las remuestreadas que ya no dependen de las siguientes."""
+        self._total_in += len(x)
+        data = np.concatenate((self._pending, x))
+        usable = (len(data) - self.context) // self.down * self.down
+        if usable <= 0:
+            self._pending = data
+            return np.zeros(0, dtype=np.float32)
+        n_out = usable * self.up // self.down
+        out = self._resample(data[:usable + self.context], n_out)
+        self._history = np.concatenate((self._history, data[:usable]))[-self.context:]
+        self._pending = data[usable:]
+        self._total_out += n_out
+        return out
+
+    def flush(self):
+        """Devuelve las últimas muestras (la señal termina en ceros, como en resample_poly)."""
+        n_out = -(-self._total_in * self.up // self.down) - self._total_out
+        out = self._resample(np.concatenate((self._pending, np.zeros(self.context, dtype=np.float32))), n_out)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._total_out += n_out
+        return out
+
+
+def compute_features_streaming(audio_path, block_frames=1 << 17, sr=None, features=FEATURE_GROUPS, **params):
+    """
+    Lee el archivo en bloques de tamaño fijo con soundfile y lo analiza con memoria acotada.
+
+    Con `sr` el audio (mezclado a mono) se remuestrea por bloques con BlockResampler
+    (resample_poly; el análisis en memoria de librosa.load usa soxr, que difiere
+    sólo cerca de Nyquist). Como compute_features, sólo devuelve las claves de `features`.
+    """
+    info = sf.info(audio_path)
+    resampler = BlockResampler(info.samplerate, sr) if sr and sr != info.samplerate else None
+    analyzer = StreamingFeatureAnalyzer(sr if resampler else info.samplerate, **params)
+    for block in sf.blocks(audio_path, blocksize=block_frames, dtype="float32", always_2d=True):
+        analyzer.push(resampler.push(block.mean(axis=1)) if resampler else block)
+    if resampler:
+        analyzer.push(resampler.flush())
+    result = analyzer.finalize()
+    keys = {key for group in features for key in _GROUP_KEYS[group]}
+    return {key: value for key, value in result.items() if key in keys}
@@ -0,0 +1,421 @@
+"""
+Instrumentación de rendimiento por herramienta y por turno.
+
+- tool_span(nombre) envuelve la ejecución de una herramienta (lo hace
+  concurrent_tool) y mide tiempo total, peticiones a Reaper, bytes de audio
+  leídos y aciertos/fallos de la caché de características. Dentro, phase("reaper" | "reaper_wait" | "render_wait" | "dsp")
+  reparte ese tiempo; las fases anidadas se descuentan de la que las contiene,
+  así que la suma de fases nunca supera el total.
+- TurnRecorder acumula un turno del chat: los pasos del LLM (latencia,
+  primer token y tokens, vía callback de LangChain) y las herramientas que se
+  ejecutaron con su metadata en la configuración del grafo. Al terminar
+  escribe una línea en la traza JSONL rotativa.
+- metrics guarda contadores acumulados que start_metrics_server expone en
+  formato de texto de Prometheus.
+"""
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import TRACE_PATH, TRACE_MAX_BYTES, TRACE_BACKUPS
+from core.rpc import rpc_counter
+
+PHASES = ("reaper_wait", "reaper", "render_wait", "dsp")
+
+# Clave de metadata de LangChain con la que las herramientas encuentran su turno
+TURN_METADATA_KEY = "eqnity_turn"
+
+_local = threading.local()
+
+
+class MetricsRegistry:
+    """Contadores con etiquetas, seguros entre hilos, con salida en texto de Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._values = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> str:
+        """Todas las métricas en el formato de exposición de texto de Prometheus."""
+        values = self.snapshot()
+        lines = []
+        for name in sorted({name for name, _ in values}):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(values.items()):
+                if metric != name:
+                    continue
+                label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value!r}" if label_text else f"{name} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+metrics = MetricsRegistry()
+for _name, _help in {
+    "eqnity_tool_calls_total": "Llamadas a herramientas por herramienta y estado.",
+    "eqnity_tool_seconds_total": "Tiempo total de pared de las herramientas.",
+    "eqnity_tool_phase_seconds_total": "Tiempo de las herramientas por fase (reaper, reaper_wait, render_wait, dsp).",
+    "eqnity_tool_rpc_calls_total": "Peticiones a Reaper hechas por las herramientas.",
+    "eqnity_tool_bytes_read_total": "Bytes de audio leídos por las herramientas.",
+    "eqnity_feature_cache_lookups_total": "Consultas a la caché de características por herramienta y resultado.",
+    "eqnity_llm_calls_total": "Llamadas al LLM por modelo y estado.",
+    "eqnity_llm_seconds_total": "Latencia total de las llamadas al LLM.",
+    "eqnity_llm_first_token_seconds_total": "Tiempo total hasta el primer token de las llamadas al LLM.",
+    "eqnity_llm_tokens_total": "Tokens del LLM por modelo y tipo (input, output).",
+    "eqnity_turns_total": "Turnos de chat por estado.",
+    "eqnity_turn_seconds_total": "Tiempo total de los turnos de chat.",
+}.items():
+    metrics.describe(_name, _help)
+
+
+# --- Herramientas: spans y fases ---
+
+def _current_turn():
+    """Turno al que pertenece la herramienta en curso, según la configuración de LangChain del hilo."""
+    if not _turns:
+        return None
+    try:
+        from langchain_core.runnables.config import ensure_config
+    except ImportError:
+        return None
+    metadata = ensure_config().get("metadata") or {}
+    with _turns_lock:
+        return _turns.get(metadata.get(TURN_METADATA_KEY))
+
+
+@contextmanager
+def tool_span(name):
+    """Mide una ejecución de herramienta en el hilo actual y la registra al salir."""
+    span = {"tool": name, "seconds": 0.0, "phases": {}, "rpc_calls": 0, "bytes_read": 0,
+            "cache_hits": 0, "cache_misses": 0, "error": False}
+    previous = getattr(_local, "span", None), getattr(_local, "phase_stack", [])
+    _local.span = span
+    _local.phase_stack = []
+    start = time.perf_counter()
+    rpc = {"calls": 0}
+    try:
+        with rpc_counter.measure() as rpc:
+            yield span
+    except BaseException:
+        span["error"] = True
+        raise
+    finally:
+        span["seconds"] = time.perf_counter() - start
+        span["rpc_calls"] = rpc["calls"]
+        _local.span, _local.phase_stack = previous
+        _record_tool(span)
+
+
+@contextmanager
+def phase(name):
+    """Atribuye el tiempo del bloque a una fase del span en curso (sin span no hace nada)."""
+    span = getattr(_local, "span", None)
+    if span is None:
+        yield
+        return
+    stack = _local.phase_stack
+    entry = [time.perf_counter(), 0.0]
+    stack.append(entry)
+    try:
+        yield
+    finally:
+        stack.pop()
+        elapsed = time.perf_counter() - entry[0]
+        span["phases"][name] = span["phases"].get(name, 0.0) + elapsed - entry[1]
+        if stack:
+            stack[-1][1] += elapsed
+
+
+def add_phase_time(name, seconds):
+    """Suma a una fase un tiempo medido fuera de phase() (p. ej. la espera por un lock)."""
+    span = getattr(_local, "span", None)
+    if span is not None:
+        span["phases"][name] = span["phases"].get(name, 0.0) + seconds
+        if _local.phase_stack:
+            _local.phase_stack[-1][1] += seconds
+
+
+def record_bytes_read(n):
+    span = getattr(_local, "span", None)
+    if span is not None:
+        span["bytes_read"] += int(n)
+
+
+def record_file_read(path):
+    """Cuenta el tamaño de un archivo que se va a leer entero (ignora rutas inexistentes)."""
+    try:
+        record_bytes_read(os.path.getsize(path))
+    except OSError:
+        pass
+
+
+def record_cache_lookup(hit):
+    """
+    Cuenta una consulta a la caché de características. La consulta ocurre en el
+    proceso DSP, así que el resultado viaja con la extracción y se anota aquí;
+    hit=None (caché no consultada) no cuenta.
+    """
+    span = getattr(_local, "span", None)
+    if span is not None and hit is not None:
+        span["cache_hits" if hit else "cache_misses"] += 1
+
+
+def _record_tool(span):
+    tool = span["tool"]
+    metrics.inc("eqnity_tool_calls_total", tool=tool, status="error" if span["error"] else "ok")
+    metrics.inc("eqnity_tool_seconds_total", span["seconds"], tool=tool)
+    for name, seconds in span["phases"].items():
+        metrics.inc("eqnity_tool_phase_seconds_total", seconds, tool=tool, phase=name)
+    metrics.inc("eqnity_tool_rpc_calls_total", span["rpc_calls"], tool=tool)
+    metrics.inc("eqnity_tool_bytes_read_total", span["bytes_read"], tool=tool)
+    metrics.inc("eqnity_feature_cache_lookups_total", span["cache_hits"], tool=tool, result="hit")
+    metrics.inc("eqnity_feature_cache_lookups_total", span["cache_misses"], tool=tool, result="miss")
+    turn = _current_turn()
+    if turn is not None:
+        turn.add_tool(span)
+
+
+# --- Turnos del chat ---
+
+_turns = {}
+_turns_lock = threading.Lock()
+
+
+class TurnRecorder:
+    """
+    Registro de un turno del chat. Se pasa al grafo con config(): sus
+    callbacks miden cada paso del LLM y la metadata permite a las herramientas
+    encontrarlo. finish() cierra el turno, lo escribe en la traza y devuelve
+    el resumen.
+    """
+
+    def __init__(self, session=None):
+        self.id = uuid.uuid4().hex
+        self.session = session
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._pending_llm = {}
+        self.llm_steps = []
+        self.tools = []
+        self.first_token_seconds = None
+        with _turns_lock:
+            _turns[self.id] = self
+
+    def config(self, **config):
+        """Configuración de LangChain para el turno, con los callbacks y la metadata añadidos."""
+        return {
+            **config,
+            "callbacks": [*(config.get("callbacks") or []), _make_callback_handler(self)],
+            "metadata": {**(config.get("metadata") or {}), TURN_METADATA_KEY: self.id},
+        }
+
+    def add_tool(self, span):
+        with self._lock:
+            self.tools.append(span)
+
+    def _llm_start(self, run_id, model, step):
+        with self._lock:
+            self._pending_llm[run_id] = {"model": model, "step": step, "start": time.perf_counter(), "first_token": None}
+
+    def _llm_token(self, run_id):
+        pending = self._pending_llm.get(run_id)
+        if pending is not None and pending["first_token"] is None:
+            pending["first_token"] = time.perf_counter() - pending["start"]
+
+    def _llm_end(self, run_id, input_tokens=0, output_tokens=0, error=False):
+        with self._lock:
+            pending = self._pending_llm.pop(run_id, None)
+        if pending is None:
+            return
+        step = {
+            "model": pending["model"],
+            "step": pending["step"],
+            "seconds": time.perf_counter() - pending["start"],
+            "first_token_seconds": pending["first_token"],
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "error": error,
+        }
+        with self._lock:
+            self.llm_steps.append(step)
+        model = step["model"]
+        metrics.inc("eqnity_llm_calls_total", model=model, status="error" if error else "ok")
+        metrics.inc("eqnity_llm_seconds_total", step["seconds"], model=model)
+        if step["first_token_seconds"] is not None:
+            metrics.inc("eqnity_llm_first_token_seconds_total", step["first_token_seconds"], model=model)
+        metrics.inc("eqnity_llm_tokens_total", input_tokens, model=model, kind="input")
+        metrics.inc("eqnity_llm_tokens_total", output_tokens, model=model, kind="output")
+
+    def summary(self, status="ok") -> dict:
+        with self._lock:
+            llm_steps, tools = list(self.llm_steps), list(self.tools)
+        phases = {}
+        for span in tools:
+            for name, seconds in span["phases"].items():
+                phases[name] = phases.get(name, 0.0) + seconds
+        return {
+            "ts": self.started,
+            "turn": self.id,
+            "session": self.session,
+            "status": status,
+            "seconds": time.perf_counter() - self._start,
+            "first_token_seconds": self.first_token_seconds,
+            "llm": llm_steps,
+            "tools": tools,
+            "totals": {
+                "llm_seconds": sum(s["seconds"] for s in llm_steps),
+                "input_tokens": sum(s["input_tokens"] for s in llm_steps),
+                "output_tokens": sum(s["output_tokens"] for s in llm_steps),
+                "tool_seconds": sum(s["seconds"] for s in tools),
+                "rpc_calls": sum(s["rpc_calls"] for s in tools),
+                "bytes_read": sum(s["bytes_read"] for s in tools),
+                "cache_hits": sum(s["cache_hits"] for s in tools),
+                "cache_misses": sum(s["cache_misses"] for s in tools),
+                "phases": phases,
+            },
+        }
+
+    def finish(self, status="ok") -> dict:
+        with _turns_lock:
+            _turns.pop(self.id, None)
+        summary = self.summary(status)
+        metrics.inc("eqnity_turns_total", status=status)
+        metrics.inc("eqnity_turn_seconds_total", summary["seconds"])
+        write_trace(summary)
+        return summary
+
+
+def _usage(response):
+    """(input, output) tokens de un LLMResult: usage_metadata del mensaje o token_usage del proveedor."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+
+_handler_class = None
+
+
+def _make_callback_handler(turn):
+    """Callback de LangChain que mide los pasos del LLM (importación diferida de langchain_core)."""
+    global _handler_class
+    if _handler_class is None:
+        from langchain_core.callbacks import BaseCallbackHandler
+
+        class TurnCallbackHandler(BaseCallbackHandler):
+            # Sólo anota tiempos: se ejecuta en línea para no falsear la latencia
+            run_inline = True
+
+            def __init__(self, turn):
+                self.turn = turn
+
+            def _start(self, run_id, metadata, invocation_params):
+                metadata = metadata or {}
+                model = metadata.get("ls_model_name") or (invocation_params or {}).get("model") or "llm"
+                self.turn._llm_start(run_id, model, metadata.get("langgraph_step"))
+
+            def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+                self._start(run_id, metadata, kwargs.get("invocation_params"))
+
+            def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+                self._start(run_id, metadata, kwargs.get("invocation_params"))
+
+            def on_llm_new_token(self, token, *, run_id, **kwargs):
+                self.turn._llm_token(run_id)
+
+            def on_llm_end(self, response, *, run_id, **kwargs):
+                self.turn._llm_end(run_id, *_usage(response))
+
+            def on_llm_error(self, error, *, run_id, **kwargs):
+                self.turn._llm_end(run_id, error=True)
+
+        _handler_class = TurnCallbackHandler
+    return _handler_class(turn)
+
+
+# --- Traza JSONL ---
+
+_trace_logger = None
+_trace_lock = threading.Lock()
+
+
+def _get_trace_logger():
+    global _trace_logger
+    with _trace_lock:
+        if _trace_logger is None:
+            logger = logging.getLogger("eqnity.trace")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            os.makedirs(os.path.dirname(os.path.abspath(TRACE_PATH)), exist_ok=True)
+            handler = RotatingFileHandler(TRACE_PATH, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _trace_logger = logger
+    return _trace_logger
+
+
+def write_trace(record):
+    """Añade un registro a la traza JSONL (una línea); sin TRACE_PATH no hace nada."""
+    if not TRACE_PATH:
+        return
+    try:
+        _get_trace_logger().info(json.dumps(record, ensure_ascii=False, default=str))
+    except OSError as e:
+        print(f"Aviso: no se pudo escribir la traza de rendimiento: {e}")
+
+
+# --- Endpoint de Prometheus ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Sirve las métricas en http://host:port/metrics desde un hilo daemon. Devuelve el servidor o None."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Aviso: no se pudo abrir el endpoint de métricas en {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="eqnity-metrics", daemon=True).start()
+    return server
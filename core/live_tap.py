@@ -0,0 +1,158 @@
+"""
+Escucha en directo de una pista a través de un buffer circular en memoria compartida.
+
+En Reaper, el JSFX `reaper/eqnity_tap.jsfx` copia la salida de la pista en
+gmem y el script `reaper/eqnity_tap_bridge.lua` vuelca esas muestras en un
+archivo mapeado en memoria (en /dev/shm cuando existe). Este módulo define el
+formato del archivo, un escritor (el que usa el simulador) y un lector que
+expone el audio como arrays NumPy sobre el propio mapa, sin copiarlo.
+
+Formato (little-endian): cabecera de HEADER_SIZE bytes seguida de
+`capacity * channels` muestras float32 entrelazadas.
+
+    magic       8s   b"EQTAP001"
+    version     u32
+    sample_rate u32
+    channels    u32
+    capacity    u32  frames del anillo
+    write_pos   i64  frames escritos desde el inicio (monótono)
+    updated     f64  hora Unix de la última escritura
+
+El escritor copia primero las muestras y después actualiza write_pos, así que
+todo lo anterior a write_pos es válido mientras no lo alcance la siguiente
+vuelta del anillo.
+"""
+import os
+import mmap
+import time
+import struct
+import numpy as np
+
+MAGIC = b"EQTAP001"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIIqd")
+HEADER_SIZE = 64
+_WRITE_POS_OFFSET = 24
+_WRITE_POS = struct.Struct("<qd")
+
+
+def default_tap_path():
+    """Ruta por defecto del anillo; debe coincidir con la de eqnity_tap_bridge.lua."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    if directory is None:
+        import tempfile
+        directory = tempfile.gettempdir()
+    return os.path.join(directory, "eqnity_tap.f32")
+
+
+class RingBufferWriter:
+    """Crea el archivo del anillo y escribe bloques de audio (frames, canales)."""
+
+    def __init__(self, path, sample_rate, channels=2, capacity_seconds=30.0):
+        self.path = path
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self.capacity = int(capacity_seconds * sample_rate)
+        self.write_pos = 0
+        size = HEADER_SIZE + self.capacity * self.channels * 4
+        with open(path, "wb") as f:
+            f.truncate(size)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._data = np.frombuffer(self._map, dtype=np.float32, offset=HEADER_SIZE).reshape(self.capacity, self.channels)
+        self._map[:HEADER.size] = HEADER.pack(MAGIC, VERSION, self.sample_rate, self.channels, self.capacity, 0, time.time())
+
+    def write(self, block):
+        block = np.asarray(block, dtype=np.float32).reshape(-1, self.channels)[-self.capacity:]
+        start = self.write_pos % self.capacity
+        head = min(len(block), self.capacity - start)
+        self._data[start:start + head] = block[:head]
+        self._data[:len(block) - head] = block[head:]
+        self.write_pos += len(block)
+        self._map[_WRITE_POS_OFFSET:_WRITE_POS_OFFSET + _WRITE_POS.size] = _WRITE_POS.pack(self.write_pos, time.time())
+
+    def close(self):
+        self._data = None
+        self._map.close()
+        self._file.close()
+
+
+class TapSnapshot:
+    """Últimos frames del anillo: `audio` (frames, canales), su posición absoluta y la frecuencia de muestreo."""
+
+    def __init__(self, audio, start, sample_rate):
+        self.audio = audio
+        self.start = start
+        self.sample_rate = sample_rate
+
+    @property
+    def seconds(self):
+        return len(self.audio) / self.sample_rate if self.sample_rate else 0.0
+
+
+class LiveTapReader:
+    """
+    Lector del anillo. El audio se expone como vistas NumPy sobre el mapa de
+    memoria: leer los últimos N segundos no copia nada salvo cuando el tramo
+    cruza el final del anillo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.sample_rate, self.channels, self.capacity, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"'{path}' no es un buffer de escucha de EQnity compatible.")
+        self._data = np.frombuffer(
+            self._map, dtype=np.float32, offset=HEADER_SIZE, count=self.capacity * self.channels
+        ).reshape(self.capacity, self.channels)
+        # Frames que el escritor puede tener a medio escribir delante de write_pos
+        self.margin = min(self.capacity // 4, self.sample_rate)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def position(self):
+        """(frames escritos, hora Unix de la última escritura)."""
+        return _WRITE_POS.unpack_from(self._map, _WRITE_POS_OFFSET)
+
+    def age(self):
+        """Segundos desde la última escritura: crece cuando la reproducción está parada."""
+        return time.time() - self.position()[1]
+
+    def snapshot(self, seconds, copy=False):
+        """
+        Últimos `seconds` segundos disponibles. Con copy=False el audio es una vista
+        sobre el anillo siempre que el tramo sea contiguo; compruébala con is_valid()
+        después de usarla, porque el escritor la sobrescribirá al dar la vuelta.
+        """
+        write_pos, _ = self.position()
+        frames = min(int(seconds * self.sample_rate), write_pos, self.capacity - self.margin)
+        start = write_pos - frames
+        first = start % self.capacity
+        if first + frames <= self.capacity:
+            audio = self._data[first:first + frames]
+            if copy:
+                audio = audio.copy()
+        else:
+            audio = np.concatenate([self._data[first:], self._data[:first + frames - self.capacity]])
+        return TapSnapshot(audio, start, self.sample_rate)
+
+    def is_valid(self, snapshot):
+        """Indica si el escritor aún no ha sobrescrito ninguna muestra de la instantánea."""
+        return self.position()[0] - snapshot.start <= self.capacity - self.margin
+
+    def close(self):
+        self._data = None
+        try:
+            self._map.close()
+        except BufferError:
+            # Aún hay instantáneas que apuntan al mapa: se libera cuando desaparezcan
+            pass
+        self._file.close()
@@ -0,0 +1,214 @@
+"""
+Medidor de loudness EBU R128 (ITU-R BS.1770-4, EBU Tech 3341/3342) incremental.
+
+LoudnessMeter recibe el audio con `push(block)` y conserva entre llamadas el
+estado de los filtros de ponderación K, la energía de los tramos de 100 ms y
+el estado del interpolador de true peak. Cada push cuesta O(len(block)) y las
+lecturas se pueden pedir en cualquier momento:
+
+- momentary(): ventana de 400 ms.
+- short_term(): ventana de 3 s.
+- integrated(): bloques de 400 ms con solape del 75 % y puertas absoluta
+  (-70 LUFS) y relativa (-10 LU).
+- loudness_range(): LRA de EBU Tech 3342 (bloques de 3 s cada segundo,
+  puertas -70 LUFS y -20 LU, percentiles 10 y 95).
+- true_peak(): pico de la señal sobremuestreada (4x por debajo de 96 kHz).
+
+Momentary y short-term se actualizan cada 100 ms y, hasta llenar la ventana,
+cuentan como silencio lo que aún no ha llegado. El loudness integrado guarda
+un valor por bloque (diez por segundo de audio), así que leerlo recorre el
+historial; el resto de lecturas son O(1).
+
+El filtro K y el troceado en bloques son los de pyloudnorm con
+filter_class="DeMan" (los coeficientes exactos de la norma a 48 kHz), de modo
+que integrated() coincide con `pyln.Meter(sr, filter_class="DeMan").integrated_loudness`
+salvo error de redondeo. Ver benchmarks/bench_loudness.py.
+"""
+import numpy as np
+import scipy.signal
+import soundfile as sf
+from core.eq_model import k_weighting_sos, _ABSOLUTE_GATE_LUFS, _RELATIVE_GATE_LU
+
+HOP_SECONDS = 0.1
+MOMENTARY_HOPS = 4       # 400 ms
+SHORT_TERM_HOPS = 30     # 3 s
+LRA_HOP_HOPS = 10        # un bloque de 3 s por segundo (solape de 2/3)
+LRA_RELATIVE_GATE_LU = -20.0
+LRA_PERCENTILES = (10.0, 95.0)
+
+# Ponderación por canal de BS.1770 (L, R, C, Ls, Rs)
+CHANNEL_WEIGHTS = (1.0, 1.0, 1.0, 1.41, 1.41)
+
+# Interpolador de true peak: 12 coeficientes por fase, como el del anexo 2 de BS.1770
+_TRUE_PEAK_TAPS_PER_PHASE = 12
+
+
+def _to_lufs(energy):
+    """Loudness (LUFS) de una media cuadrática ponderada; -inf para silencio."""
+    energy = np.asarray(energy, dtype=np.float64)
+    return np.where(energy > 0, -0.691 + 10.0 * np.log10(np.maximum(energy, 1e-300)), -np.inf)
+
+
+def _oversampling_factor(sr):
+    return 4 if sr < 96000 else 2 if sr < 192000 else 1
+
+
+def gated_loudness(energies, relative_gate=_RELATIVE_GATE_LU):
+    """Loudness de un conjunto de bloques con la puerta absoluta y una relativa (BS.1770)."""
+    energies = np.asarray(energies, dtype=np.float64)
+    loudness = _to_lufs(energies)
+    energies = energies[loudness >= _ABSOLUTE_GATE_LUFS]
+    if not len(energies):
+        return float("-inf")
+    threshold = float(_to_lufs(energies.mean())) + relative_gate
+    energies = energies[(_to_lufs(energies) > threshold)]
+    return float(_to_lufs(energies.mean())) if len(energies) else float("-inf")
+
+
+class LoudnessMeter:
+    """
+    Medidor EBU R128 con estado. `push` acepta bloques (muestras,) o
+    (muestras, canales) de cualquier tamaño; todos con el mismo número de
+    canales (hasta 5, con la ponderación de BS.1770).
+    """
+
+    def __init__(self, sr):
+        self.sr = int(sr)
+        self.hop = max(1, int(round(HOP_SECONDS * self.sr)))
+        self.channels = None
+        self._sos = k_weighting_sos(self.sr)
+        # Energía de los últimos SHORT_TERM_HOPS tramos completos (anillo) y del tramo en curso
+        self._hops = np.zeros(SHORT_TERM_HOPS)
+        self._hop_count = 0
+        self._partial = 0.0
+        self._partial_samples = 0
+        # Historial para las lecturas con puerta: un valor por bloque de 400 ms y por bloque de 3 s
+        self._blocks = []
+        self._short_blocks = []
+        self._peak = 0.0
+        self._oversampling = _oversampling_factor(self.sr)
+        if self._oversampling > 1:
+            taps = scipy.signal.firwin(_TRUE_PEAK_TAPS_PER_PHASE * self._oversampling, 1.0 / self._oversampling)
+            self._phases = [taps[p::self._oversampling] * self._oversampling for p in range(self._oversampling)]
+
+    def _setup(self, channels):
+        if channels > len(CHANNEL_WEIGHTS):
+            raise ValueError(f"El medidor de loudness admite hasta {len(CHANNEL_WEIGHTS)} canales (recibidos {channels}).")
+        self.channels = channels
+        self._weights = np.asarray(CHANNEL_WEIGHTS[:channels])
+        self._zi = np.zeros((self._sos.shape[0], 2, channels))
+        if self._oversampling > 1:
+            self._tp_zi = [np.zeros((_TRUE_PEAK_TAPS_PER_PHASE - 1, channels)) for _ in self._phases]
+
+    def push(self, block):
+        """Añade un bloque de audio y actualiza todas las lecturas."""
+        x = np.asarray(block, dtype=np.float64)
+        if x.ndim == 1:
+            x = x[:, np.newaxis]
+        if self.channels is None:
+            self._setup(x.shape[1])
+        elif x.shape[1] != self.channels:
+            raise ValueError(f"El bloque tiene {x.shape[1]} canales y el medidor {self.channels}.")
+        if not len(x):
+            return
+
+        self._update_peak(x)
+        y, self._zi = scipy.signal.sosfilt(self._sos, x, axis=0, zi=self._zi)
+        power = (y * y) @ self._weights
+
+        # Completar el tramo en curso, cerrar los tramos enteros y guardar el resto
+        take = min(self.hop - self._partial_samples, len(power))
+        self._partial += float(power[:take].sum())
+        self._partial_samples += take
+        if self._partial_samples == self.hop:
+            self._close_hop(self._partial)
+            self._partial, self._partial_samples = 0.0, 0
+        full = (len(power) - take) // self.hop
+        for energy in power[take:take + full * self.hop].reshape(full, self.hop).sum(axis=1):
+            self._close_hop(float(energy))
+        rest = power[take + full * self.hop:]
+        if len(rest):
+            self._partial = float(rest.sum())
+            self._partial_samples = len(rest)
+
+    def _update_peak(self, x):
+        peak = float(np.abs(x).max())
+        if self._oversampling > 1:
+            for p, taps in enumerate(self._phases):
+                phase, self._tp_zi[p] = scipy.signal.lfilter(taps, 1.0, x, axis=0, zi=self._tp_zi[p])
+                peak = max(peak, float(np.abs(phase).max()))
+        self._peak = max(self._peak, peak)
+
+    def _close_hop(self, energy):
+        self._hops[self._hop_count % SHORT_TERM_HOPS] = energy
+        self._hop_count += 1
+        if self._hop_count >= MOMENTARY_HOPS:
+            self._blocks.append(self._window(MOMENTARY_HOPS))
+        if self._hop_count >= SHORT_TERM_HOPS and (self._hop_count - SHORT_TERM_HOPS) % LRA_HOP_HOPS == 0:
+            self._short_blocks.append(self._window(SHORT_TERM_HOPS))
+
+    def _window(self, hops):
+        """Media cuadrática ponderada de los últimos `hops` tramos completos."""
+        last = (self._hop_count - 1 - np.arange(hops)) % SHORT_TERM_HOPS
+        return float(self._hops[last].sum()) / (hops * self.hop)
+
+    def momentary(self):
+        """Loudness momentáneo (LUFS) de los últimos 400 ms."""
+        return float(_to_lufs(self._window(MOMENTARY_HOPS)))
+
+    def short_term(self):
+        """Loudness a corto plazo (LUFS) de los últimos 3 s."""
+        return float(_to_lufs(self._window(SHORT_TERM_HOPS)))
+
+    def integrated(self):
+        """Loudness integrado (LUFS) desde el primer push; -inf si aún no hay un bloque por encima de las puertas."""
+        blocks = self._blocks
+        # Como pyloudnorm, un final de al menos medio tramo cuenta como un bloque más (incompleto)
+        if blocks and self._partial_samples * 2 >= self.hop:
+            tail = self._window(MOMENTARY_HOPS - 1) * (MOMENTARY_HOPS - 1) / MOMENTARY_HOPS
+            blocks = blocks + [tail + self._partial / (MOMENTARY_HOPS * self.hop)]
+        return gated_loudness(blocks)
+
+    def loudness_range(self):
+        """Rango de loudness (LU) según EBU Tech 3342; 0 con menos de dos bloques válidos."""
+        energies = np.asarray(self._short_blocks, dtype=np.float64)
+        loudness = _to_lufs(energies)
+        gated = loudness >= _ABSOLUTE_GATE_LUFS
+        if not gated.any():
+            return 0.0
+        threshold = float(_to_lufs(energies[gated].mean())) + LRA_RELATIVE_GATE_LU
+        loudness = loudness[gated & (loudness >= threshold)]
+        if len(loudness) < 2:
+            return 0.0
+        low, high = np.percentile(loudness, LRA_PERCENTILES)
+        return float(high - low)
+
+    def true_peak(self):
+        """True peak (dBTP) desde el primer push."""
+        return float(20.0 * np.log10(max(self._peak, 1e-10)))
+
+    def summary(self):
+        """Todas las lecturas en un dict: integrated, momentary, short_term, loudness_range, true_peak."""
+        return {
+            "integrated": self.integrated(),
+            "momentary": self.momentary(),
+            "short_term": self.short_term(),
+            "loudness_range": self.loudness_range(),
+            "true_peak": self.true_peak(),
+        }
+
+
+def measure_loudness(audio, sr):
+    """Lecturas de LoudnessMeter.summary() para un array completo (muestras[, canales])."""
+    meter = LoudnessMeter(sr)
+    meter.push(audio)
+    return meter.summary()
+
+
+def measure_file_loudness(audio_path, block_frames=1 << 16):
+    """Mide un archivo leyéndolo por bloques con soundfile, con memoria acotada."""
+    info = sf.info(audio_path)
+    meter = LoudnessMeter(info.samplerate)
+    for block in sf.blocks(audio_path, blocksize=block_frames, dtype="float32", always_2d=True):
+        meter.push(block)
+    return meter.summary()
@@ -0,0 +1,207 @@
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from collections import Counter
+
+
+def _text(content):
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content or []
+    )
+
+
+# Marca de un resultado de herramienta ya recortado (no se vuelve a recortar)
+_COMPACTED_MARK = "… [resultado compactado: "
+
+# Clave del estado del agente con el resumen acumulado de los mensajes eliminados
+SUMMARY_KEY = "summary"
+
+
+def compact_tool_results(messages, keep_recent=4, max_chars=400):
+    """
+    Recorta los resultados de herramientas salvo los `keep_recent` más recientes.
+
+    Devuelve una lista nueva; los mensajes recortados son copias con el mismo id,
+    así que devueltos al estado sustituyen al original.
+    """
+    tool_positions = [i for i, m in enumerate(messages) if m.type == "tool"]
+    old = set(tool_positions[:-keep_recent] if keep_recent else tool_positions)
+    compacted = []
+    for i, msg in enumerate(messages):
+        content = _text(msg.content)
+        if i in old and len(content) > max_chars and _COMPACTED_MARK not in content:
+            msg = msg.model_copy(update={
+                "content": f"{content[:max_chars]}{_COMPACTED_MARK}{len(content)} caracteres]"
+            })
+        compacted.append(msg)
+    return compacted
+
+
+def summarize_messages(messages, previous=None, max_requests=10):
+    """
+    Resumen determinista (sin llamar al modelo) de los mensajes que salen del
+    historial, acumulado sobre el resumen `previous` de los que salieron antes.
+    Es un dict serializable: se guarda en el estado del agente.
+    """
+    summary = previous or {"messages": 0, "requests": [], "tools": {}, "tracks": []}
+    requests = list(summary["requests"]) + [_text(m.content).strip()[:160] for m in messages if m.type == "human"]
+    tool_calls = Counter(summary["tools"])
+    tracks = list(summary["tracks"])
+    for msg in messages:
+        for call in getattr(msg, "tool_calls", None) or []:
+            tool_calls[call.get("name", "?")] += 1
+            track = (call.get("args") or {}).get("track_name")
+            if track and track not in tracks:
+                tracks.append(track)
+    return {
+        "messages": summary["messages"] + len(messages),
+        "requests": requests[-max_requests:],
+        "tools": dict(tool_calls),
+        "tracks": tracks,
+    }
+
+
+def format_summary(summary):
+    """Texto del resumen para el prompt de sistema."""
+    lines = [f"Resumen de la conversación anterior ({summary['messages']} mensajes omitidos por longitud):"]
+    if summary["requests"]:
+        lines.append("Peticiones del usuario:")
+        lines += [f"- {r}" for r in summary["requests"]]
+    if summary["tools"]:
+        lines.append("Herramientas usadas: " + ", ".join(
+            f"{name} ×{n}" for name, n in Counter(summary["tools"]).most_common()))
+    if summary["tracks"]:
+        lines.append("Pistas tratadas: " + ", ".join(summary["tracks"]))
+    return "\n".join(lines)
+
+
+def make_prompt(system_prompt):
+    """
+    Prompt de create_react_agent: un único mensaje de sistema con el prompt del
+    agente y, si lo hay, el resumen de la conversación anterior (varios
+    proveedores de OpenRouter rechazan o ignoran un segundo mensaje de sistema).
+    """
+    from langchain_core.messages import SystemMessage
+
+    def prompt(state):
+        summary = state.get(SUMMARY_KEY)
+        content = f"{system_prompt}\n\n{format_summary(summary)}" if summary else system_prompt
+        return [SystemMessage(content=content)] + list(state["messages"])
+
+    return prompt
+
+
+def make_pre_model_hook(max_tokens=6000, keep_tool_results=4, tool_result_chars=400):
+    """
+    Hook previo al modelo para create_react_agent que acota el historial.
+
+    Compacta los resultados de herramientas antiguos, conserva los turnos más
+    recientes que quepan en `max_tokens` (empezando siempre en un mensaje del
+    usuario) y sustituye el resto por un resumen. Los cambios se aplican al
+    estado guardado en el checkpointer (RemoveMessage para los mensajes que
+    salen, copias con el mismo id para los compactados y el resumen en
+    SUMMARY_KEY), así que el estado que se carga y se reescribe en cada turno
+    queda acotado igual que lo que recibe el modelo. El agente necesita
+    make_prompt y un state_schema con SUMMARY_KEY.
+    """
+    from langchain_core.messages import RemoveMessage, trim_messages
+    from langchain_core.messages.utils import count_tokens_approximately
+
+    def pre_model_hook(state):
+        original = state["messages"]
+        messages = compact_tool_results(original, keep_tool_results, tool_result_chars)
+        kept = trim_messages(
+            messages,
+            max_tokens=max_tokens,
+            token_counter=count_tokens_approximately,
+            strategy="last",
+            start_on="human",
+            allow_partial=False,
+        )
+        if not kept:
+            # El turno actual por sí solo supera el presupuesto: se envía completo
+            last_human = max((i for i, m in enumerate(messages) if m.type == "human"), default=0)
+            kept = messages[last_human:]
+        n_dropped = len(messages) - len(kept)
+        update = {"llm_input_messages": kept}
+        changes = [RemoveMessage(id=m.id) for m in original[:n_dropped]]
+        changes += [new for old, new in zip(original[n_dropped:], messages[n_dropped:]) if new is not old]
+        if changes:
+            update["messages"] = changes
+        if n_dropped:
+            update[SUMMARY_KEY] = summarize_messages(messages[:n_dropped], state.get(SUMMARY_KEY))
+        return update
+
+    return pre_model_hook
+
+
+class SessionStore:
+    """
+    Mapa persistente sesión de la UI -> thread_id del checkpointer, en SQLite.
+
+    Registra el último acceso de cada sesión para poder expirar las inactivas.
+    """
+
+    def __init__(self, db_path, ttl_seconds, sweep_interval=300.0):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS eqnity_sessions ("
+                "session_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL, last_seen REAL NOT NULL)"
+            )
+
+    def lookup(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT thread_id FROM eqnity_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_or_create(self, session_id):
+        """Devuelve el thread_id de la sesión (creándolo si no existe) y renueva su último acceso."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT thread_id FROM eqnity_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            thread_id = row[0] if row else str(uuid.uuid4())
+            self._conn.execute(
+                "INSERT INTO eqnity_sessions (session_id, thread_id, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (session_id, thread_id, now),
+            )
+        return thread_id
+
+    def reset(self, session_id):
+        """Olvida la sesión. Devuelve el thread_id que tenía, o None."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT thread_id FROM eqnity_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            self._conn.execute("DELETE FROM eqnity_sessions WHERE session_id = ?", (session_id,))
+        return row[0] if row else None
+
+    def sweep_due(self):
+        return time.time() - self._last_sweep >= self.sweep_interval
+
+    def pop_expired(self):
+        """Elimina las sesiones inactivas más de `ttl_seconds` y devuelve sus thread_id."""
+        now = time.time()
+        self._last_sweep = now
+        cutoff = now - self.ttl_seconds
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT thread_id FROM eqnity_sessions WHERE last_seen < ?", (cutoff,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM eqnity_sessions WHERE last_seen < ?", (cutoff,))
+        return [r[0] for r in rows]
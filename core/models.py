@@ -1,6 +1,24 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 class ParameterChange(BaseModel):
     parameter_name: str = Field(description="El nombre exacto del parámetro a cambiar.")
     value: float = Field(description="El nuevo valor normalizado para el parámetro, entre 0.0 y 1.0.")
+
+class EQBand(BaseModel):
+    band: int = Field(description="Número de banda de ReaEQ, empezando en 1 (en el orden de sus parámetros).")
+    type: Optional[str] = Field(default=None, description="peak, low_shelf, high_shelf, low_pass, high_pass, notch o band_pass. Por defecto, el de la banda en ReaEQ.")
+    freq_hz: Optional[float] = Field(default=None, description="Frecuencia en Hz. Si se omite, se mantiene la actual.")
+    gain_db: Optional[float] = Field(default=None, description="Ganancia en dB. Si se omite, se mantiene la actual.")
+    bandwidth_oct: Optional[float] = Field(default=None, description="Ancho de banda en octavas. Si se omite, se mantiene el actual.")
+
+class EQCandidate(BaseModel):
+    name: Optional[str] = Field(default=None, description="Etiqueta opcional del candidato.")
+    bands: List[EQBand] = Field(description="Bandas que cambian respecto al estado actual del EQ.")
+
+class EQTarget(BaseModel):
+    metric: str = Field(description="'centroid' (Hz), 'band_energy' (dB respecto a la energía total) o 'lufs'.")
+    value: float = Field(description="Valor objetivo de la métrica.")
+    low_hz: Optional[float] = Field(default=None, description="Límite inferior de la banda para 'band_energy'.")
+    high_hz: Optional[float] = Field(default=None, description="Límite superior de la banda para 'band_energy'.")
+    weight: float = Field(default=1.0, description="Peso del objetivo en la puntuación.")
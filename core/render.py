@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from core.instrumentation import phase
+
+# Eventos de inotify relevantes para detectar escritura/cierre de archivos
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+
+def wav_header_finalized(path: str) -> bool:
+    """
+    Indica si la cabecera RIFF/RF64 del WAV ya refleja el tamaño real del archivo.
+
+    Reaper escribe una cabecera provisional al empezar el render y la corrige al
+    cerrar el archivo, así que una cabecera coherente significa render terminado.
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            header = f.read(36)
+    except OSError:
+        return False
+    if len(header) < 12 or header[8:12] != b"WAVE":
+        return False
+    if header[:4] == b"RIFF":
+        riff_size = struct.unpack("<I", header[4:8])[0]
+        return riff_size > 4 and riff_size + 8 == size
+    if header[:4] == b"RF64" and len(header) >= 28 and header[12:16] == b"ds64":
+        riff_size = struct.unpack("<Q", header[20:28])[0]
+        return riff_size > 4 and riff_size + 8 == size
+    return False
+
+
+def _has_riff_header(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) in (b"RIFF", b"RF64")
+    except OSError:
+        return False
+
+
+class _InotifyWatch:
+    """Vigilancia mínima de un directorio con inotify (sólo Linux), vía ctypes."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, os.strerror(err))
+
+    def wait(self, timeout: float) -> bool:
+        """Bloquea hasta que haya eventos o venza el timeout. Descarta los eventos leídos."""
+        readable, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class RenderWatcher:
+    """
+    Detecta cuándo Reaper termina de escribir un archivo de render.
+
+    Debe crearse antes de lanzar el render. En Linux usa inotify sobre el
+    directorio de salida; en otros sistemas, o si inotify falla, sondea el
+    archivo. El render se da por terminado cuando la cabecera WAV está
+    finalizada, o, para formatos sin cabecera RIFF, cuando el tamaño se
+    mantiene estable durante `stable_polls` sondeos.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.05, stable_polls: int = 3):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.stable_polls = stable_polls
+        self._watch = None
+
+    def __enter__(self):
+        if sys.platform.startswith("linux"):
+            try:
+                self._watch = _InotifyWatch(os.path.dirname(self.path) or ".")
+            except (OSError, AttributeError):
+                self._watch = None
+        return self
+
+    def __exit__(self, *exc):
+        if self._watch is not None:
+            self._watch.close()
+            self._watch = None
+        return False
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._watch is not None else "polling"
+
+    def wait(self, timeout: float) -> float:
+        """Espera a que el archivo esté completo y devuelve los segundos esperados."""
+        with phase("render_wait"):
+            return self._wait(timeout)
+
+    def _wait(self, timeout: float) -> float:
+        start = time.perf_counter()
+        deadline = start + timeout
+        last_size, stable = None, 0
+        while True:
+            if wav_header_finalized(self.path):
+                return time.perf_counter() - start
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = None
+            if size and size == last_size and not _has_riff_header(self.path):
+                stable += 1
+                if stable >= self.stable_polls:
+                    return time.perf_counter() - start
+            else:
+                stable = 0
+            last_size = size
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError(f"El render no terminó en {timeout:.1f} s: {self.path}")
+            if self._watch is not None and stable == 0:
+                # Sin eventos se vuelve a comprobar igualmente cada 0.5 s; la
+                # comprobación de tamaño estable necesita sondeo periódico
+                self._watch.wait(min(remaining, 0.5))
+            else:
+                time.sleep(min(remaining, self.poll_interval))
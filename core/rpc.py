@@ -0,0 +1,62 @@
+import threading
+from contextlib import contextmanager
+
+
+class RPCCounter:
+    """Cuenta las peticiones enviadas a Reaper, en total y por hilo."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def increment(self, n: int = 1) -> None:
+        self._local.count = getattr(self._local, "count", 0) + n
+        with self._lock:
+            self.total += n
+
+    @property
+    def thread_count(self) -> int:
+        return getattr(self._local, "count", 0)
+
+    @contextmanager
+    def measure(self):
+        """Mide las peticiones hechas por el hilo actual dentro del bloque."""
+        result = {"calls": 0}
+        start = self.thread_count
+        try:
+            yield result
+        finally:
+            result["calls"] = self.thread_count - start
+
+
+rpc_counter = RPCCounter()
+
+# El cliente de reapy comparte un único socket: cada petición/respuesta va entera bajo este lock
+_request_lock = threading.RLock()
+
+
+def install_rpc_counter() -> bool:
+    """
+    Envuelve Client.request de reapy para contar cada round-trip a Reaper y
+    serializarlos, de modo que varios hilos puedan usar reapy a la vez.
+
+    Devuelve False si la versión de reapy no expone el cliente esperado; en ese
+    caso los contadores quedan a cero pero todo lo demás funciona igual.
+    """
+    try:
+        from reapy.tools.network.client import Client
+    except ImportError:
+        return False
+    if getattr(Client.request, "_counted", False):
+        return True
+    original_request = Client.request
+
+    def request(self, *args, **kwargs):
+        rpc_counter.increment()
+        with _request_lock:
+            return original_request(self, *args, **kwargs)
+
+    request._counted = True
+    Client.request = request
+    return True
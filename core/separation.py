@@ -0,0 +1,228 @@
+"""
+Separación de stems en CPU por bloques con reconstrucción overlap-add.
+
+El archivo se divide en bloques solapados que se procesan en un pool de
+procesos; cada proceso lee su propio bloque del disco, de modo que la memoria
+depende del tamaño de bloque y no de la duración. Los resultados se escriben
+en orden, fundiendo cada solape con rampas complementarias (suman 1), en un
+WAV por stem.
+
+Modos:
+- "dsp": máscaras espectrales sin modelo. HPSS separa armónico/percusivo; el
+  bajo es la parte armónica por debajo de ~200 Hz; la voz es la parte armónica
+  de banda media no repetitiva (filtro de vecinos más cercanos) y, en estéreo,
+  centrada. "other" recibe el resto, así que los stems suman la mezcla.
+- "onnx": un modelo ONNX que recibe la forma de onda [1, canales, muestras] y
+  devuelve [1, stems, canales, muestras]. Los metadatos opcionales del modelo
+  `stems` (nombres separados por comas), `sample_rate` y `channels` indican
+  su formato; el audio se adapta antes y después de la inferencia.
+"""
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+STEM_NAMES = ("vocals", "drums", "bass", "other")
+
+DSP_N_FFT = 2048
+DSP_HOP_LENGTH = 512
+BASS_CUTOFF_HZ = 200.0
+VOCAL_HIGH_HZ = 6000.0
+# Ventana (s) del filtro de vecinos más cercanos que estima el acompañamiento repetitivo
+REPETITION_WINDOW_SECONDS = 2.0
+
+
+def plan_chunks(n_frames, sr, chunk_seconds=30.0, overlap_seconds=2.0):
+    """Bloques (inicio, fin) en muestras; bloques consecutivos se solapan `overlap` muestras."""
+    overlap = int(round(overlap_seconds * sr))
+    chunk = max(int(round(chunk_seconds * sr)), 3 * overlap, 1)
+    if n_frames <= chunk:
+        return [(0, n_frames)], 0
+    step = chunk - overlap
+    n_chunks = -(-(n_frames - overlap) // step)
+    chunks = [(k * step, min(k * step + chunk, n_frames)) for k in range(n_chunks)]
+    return chunks, overlap
+
+
+def _lowpass_curve(freqs, cutoff, order=4):
+    return 1.0 / (1.0 + (freqs / cutoff) ** order)
+
+
+def _dsp_masks(X, sr):
+    """Máscaras suaves (vocals, drums, bass, other) para el STFT complejo X de forma (canales, F, T)."""
+    import librosa
+
+    S = np.abs(X).mean(axis=0)
+    harmonic, percussive = librosa.decompose.hpss(S, mask=True, kernel_size=31)
+
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=DSP_N_FFT)[:, np.newaxis]
+    bass_band = _lowpass_curve(freqs, BASS_CUTOFF_HZ)
+    vocal_band = (1.0 - bass_band) * _lowpass_curve(freqs, VOCAL_HIGH_HZ)
+
+    # Primer plano no repetitivo: la mezcla menos su estimación por vecinos similares
+    n_frames = S.shape[1]
+    width = min(int(REPETITION_WINDOW_SECONDS * sr / DSP_HOP_LENGTH), (n_frames - 1) // 2 - 1)
+    if width >= 1:
+        repeating = np.minimum(S, librosa.decompose.nn_filter(
+            S, aggregate=np.median, metric="cosine", width=width
+        ))
+        foreground = librosa.util.softmask(S - repeating, repeating, power=2)
+    else:
+        foreground = np.ones_like(S)
+
+    if X.shape[0] == 2:
+        # Las voces suelen estar centradas: |L+R| / (|L|+|R|) vale 1 para contenido idéntico en ambos canales
+        center = np.abs(X[0] + X[1]) / (np.abs(X[0]) + np.abs(X[1]) + 1e-10)
+        foreground = foreground * center ** 2
+
+    vocals = harmonic * vocal_band * foreground
+    bass = harmonic * bass_band
+    drums = percussive
+    other = np.clip(1.0 - vocals - bass - drums, 0.0, 1.0)
+    return {"vocals": vocals, "drums": drums, "bass": bass, "other": other}
+
+
+def _separate_dsp(x, sr):
+    import librosa
+
+    y = x.T  # (canales, muestras)
+    X = librosa.stft(y, n_fft=DSP_N_FFT, hop_length=DSP_HOP_LENGTH)
+    masks = _dsp_masks(X, sr)
+    return {
+        name: librosa.istft(X * mask, hop_length=DSP_HOP_LENGTH, length=y.shape[-1]).T.astype(np.float32)
+        for name, mask in masks.items()
+    }
+
+
+_onnx_sessions = {}
+
+
+def _onnx_session(model_path):
+    """Sesión ONNX por proceso, con un hilo de inferencia (el paralelismo lo da el pool)."""
+    session = _onnx_sessions.get(model_path)
+    if session is None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        _onnx_sessions[model_path] = session
+    return session
+
+
+def _fit_channels(y, channels):
+    if y.shape[0] == channels:
+        return y
+    if channels == 1:
+        return y.mean(axis=0, keepdims=True)
+    return np.repeat(y.mean(axis=0, keepdims=True), channels, axis=0)
+
+
+def _fit_length(y, length):
+    if y.shape[-1] >= length:
+        return y[..., :length]
+    return np.pad(y, [(0, 0)] * (y.ndim - 1) + [(0, length - y.shape[-1])])
+
+
+def _separate_onnx(x, sr, model_path):
+    session = _onnx_session(model_path)
+    meta = session.get_modelmeta().custom_metadata_map or {}
+    names = [n.strip() for n in meta.get("stems", ",".join(STEM_NAMES)).split(",") if n.strip()]
+    model_sr = int(meta.get("sample_rate", sr))
+    channels = x.shape[1]
+
+    y = _fit_channels(x.T, int(meta.get("channels", channels)))
+    if model_sr != sr:
+        import librosa
+        y = librosa.resample(y, orig_sr=sr, target_sr=model_sr)
+    output = session.run(None, {session.get_inputs()[0].name: y[np.newaxis].astype(np.float32)})[0][0]
+
+    stems = {}
+    for name, stem in zip(names, output):
+        if model_sr != sr:
+            import librosa
+            stem = librosa.resample(stem, orig_sr=model_sr, target_sr=sr)
+        stems[name] = _fit_length(_fit_channels(stem, channels), x.shape[0]).T.astype(np.float32)
+    return stems
+
+
+def _separate_chunk(audio_path, start, stop, mode, model_path):
+    """Lee y separa un bloque en un proceso del pool. Devuelve {stem: array (muestras, canales)}."""
+    import soundfile as sf
+
+    x, sr = sf.read(audio_path, start=start, stop=stop, dtype="float32", always_2d=True)
+    if mode == "onnx":
+        return _separate_onnx(x, sr, model_path)
+    return _separate_dsp(x, sr)
+
+
+def separate_file(audio_path, output_dir, mode="dsp", model_path=None, chunk_seconds=30.0,
+                  overlap_seconds=2.0, workers=None, executor=None, progress=None):
+    """
+    Separa `audio_path` en stems WAV dentro de `output_dir`.
+
+    Con `executor` se reutiliza un pool existente, que debe tener `workers`
+    procesos; si no, se crea uno con `workers` procesos. `progress(bloques_hechos, bloques_totales)` se llama
+    tras escribir cada bloque. Devuelve un dict con las rutas de los stems,
+    la duración del audio, los segundos empleados, el número de bloques y los
+    bytes de audio decodificado leídos (los solapes se leen dos veces).
+    """
+    import soundfile as sf
+
+    if mode == "onnx" and not (model_path and os.path.exists(model_path)):
+        raise FileNotFoundError(f"No se encontró el modelo ONNX de separación: '{model_path}'")
+    info = sf.info(audio_path)
+    sr, channels = info.samplerate, info.channels
+    chunks, overlap = plan_chunks(info.frames, sr, chunk_seconds, overlap_seconds)
+    fade_in = (0.5 - 0.5 * np.cos(np.pi * np.arange(overlap) / max(overlap, 1)))[:, np.newaxis].astype(np.float32)
+    fade_out = 1.0 - fade_in
+
+    workers = max(1, min(len(chunks), workers or os.cpu_count() or 1))
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    max_in_flight = workers + 2
+
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(audio_path))[0]
+    start_time = time.perf_counter()
+    writers, paths, tails, pending = {}, {}, {}, {}
+    next_submit = 0
+    try:
+        for k in range(len(chunks)):
+            # Como mucho max_in_flight bloques en memoria a la vez
+            while next_submit < len(chunks) and len(pending) < max_in_flight:
+                start, stop = chunks[next_submit]
+                pending[next_submit] = executor.submit(_separate_chunk, audio_path, start, stop, mode, model_path)
+                next_submit += 1
+            stems = pending.pop(k).result()
+
+            last = k == len(chunks) - 1
+            for name, audio in stems.items():
+                if name not in writers:
+                    paths[name] = os.path.join(output_dir, f"{base}_{name}.wav")
+                    writers[name] = sf.SoundFile(paths[name], "w", samplerate=sr, channels=channels, subtype="FLOAT")
+                if overlap and k > 0:
+                    audio[:overlap] = audio[:overlap] * fade_in + tails[name]
+                if overlap and not last:
+                    tails[name] = audio[-overlap:] * fade_out
+                    audio = audio[:-overlap]
+                writers[name].write(audio)
+            if progress is not None:
+                progress(k + 1, len(chunks))
+    finally:
+        for future in pending.values():
+            future.cancel()
+        for writer in writers.values():
+            writer.close()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return {
+        "stems": paths,
+        "duration": info.frames / sr,
+        "seconds": time.perf_counter() - start_time,
+        "chunks": len(chunks),
+        "mode": mode,
+        "bytes_read": sum(stop - start for start, stop in chunks) * channels * 4,
+    }
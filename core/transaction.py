@@ -0,0 +1,107 @@
+"""
+Transacciones sobre el proyecto de Reaper para las herramientas que lo modifican.
+
+reaper_transaction agrupa todas las escrituras de una llamada:
+- en una sola sesión remota (reapy.inside_reaper), así que viajan en lote;
+- con el refresco de la interfaz suspendido (reapy.prevent_ui_refresh), así
+  que Reaper redibuja una vez al final y no tras cada cambio;
+- en un único bloque de deshacer (reapy.undo_block) con la descripción de la
+  herramienta: una entrada en el historial por llamada.
+
+Cada herramienta anota, antes de cada cambio, la acción que lo deshace (valor
+anterior de los parámetros, índice del FX añadido...). Si el bloque lanza una
+excepción se ejecutan en orden inverso y la excepción se propaga: los cambios
+se aplican todos o ninguno, sin recargar la pista ni reinstanciar sus plugins.
+Para cambios sin acción inversa, `protect` guarda el state chunk entero de la
+pista. Los cambios temporales que se deshacen antes de salir (mutes y
+selección durante un render) usan description=None y no abren bloque de
+deshacer.
+"""
+import reapy
+from contextlib import ExitStack, contextmanager
+from core.utils import RPR
+
+# Tamaño máximo del state chunk que se guarda con Transaction.protect
+_CHUNK_MAX_BYTES = 16 * 1024 * 1024
+
+
+def _restore_params(track_id, fx_index, values):
+    for i, value in values.items():
+        RPR.TrackFX_SetParamNormalized(track_id, fx_index, i, value)
+
+
+class Transaction:
+    """Estado de una transacción abierta: las acciones que deshacen lo aplicado hasta ahora."""
+
+    def __init__(self, description=None):
+        self.description = description
+        self._undo = []
+        self.rolled_back = False
+
+    def on_rollback(self, fn, *args):
+        """Registra la acción que deshace un cambio; al revertir se ejecutan en orden inverso."""
+        self._undo.append((fn, args))
+
+    def record_params(self, track_id, fx_index, indices):
+        """Guarda el valor normalizado actual de los parámetros `indices` antes de escribirlos."""
+        with reapy.inside_reaper():
+            previous = {i: RPR.TrackFX_GetParamNormalized(track_id, fx_index, i) for i in indices}
+        self.on_rollback(_restore_params, track_id, fx_index, previous)
+
+    def record_added_fx(self, track_id, fx_index):
+        """Anota un FX recién añadido para eliminarlo al revertir."""
+        self.on_rollback(RPR.TrackFX_Delete, track_id, fx_index)
+
+    def protect(self, track_id):
+        """
+        Respaldo para cambios sin acción inversa: guarda el state chunk de la pista
+        (hasta 16 MB con el estado de los plugins) y lo recarga al revertir, lo que
+        reinstancia todos sus plugins.
+        """
+        chunk = RPR.GetTrackStateChunk(track_id, "", _CHUNK_MAX_BYTES, False)[2]
+        self.on_rollback(RPR.SetTrackStateChunk, track_id, chunk, False)
+
+    def rollback(self):
+        """Deshace lo anotado hasta ahora (también sirve para abortar sin excepción)."""
+        if self.rolled_back:
+            return
+        self.rolled_back = True
+        with reapy.inside_reaper():
+            while self._undo:
+                fn, args = self._undo.pop()
+                fn(*args)
+
+
+@contextmanager
+def reaper_transaction(description=None, protect=()):
+    """
+    Abre una transacción y devuelve la Transaction en la que anotar cómo deshacer
+    cada cambio. `protect` son las pistas (o sus ids) cuyo state chunk se guarda
+    desde el principio; sólo para cambios que no tienen acción inversa.
+    """
+    tx = Transaction(description)
+    with ExitStack() as stack:
+        stack.enter_context(reapy.inside_reaper())
+        for track in protect:
+            tx.protect(getattr(track, "id", track))
+        stack.enter_context(reapy.prevent_ui_refresh())
+        if description:
+            stack.enter_context(reapy.undo_block(f"EQnity: {description}"))
+        try:
+            yield tx
+        except BaseException:
+            tx.rollback()
+            raise
+
+
+def get_track_info(track_ids, key):
+    """Lee un valor numérico de varias pistas (B_MUTE, I_SELECTED...): {id: valor}."""
+    with reapy.inside_reaper():
+        return {track_id: RPR.GetMediaTrackInfo_Value(track_id, key) for track_id in track_ids}
+
+
+def set_track_info(values, key):
+    """Escribe un valor numérico en varias pistas ({id: valor}) en una sola sesión remota."""
+    with reapy.inside_reaper():
+        for track_id, value in values.items():
+            RPR.SetMediaTrackInfo_Value(track_id, key, value)
@@ -1,14 +1,328 @@
+import re
+import difflib
+import hashlib
+import threading
+from collections import OrderedDict
+import reapy
+from core.rpc import install_rpc_counter
+
+install_rpc_counter()
+
+RPR = reapy.reascript_api
+
+# Sinónimos habituales -> forma usada por los plugins de Reaper
+PARAM_ALIASES = {
+    "frequency": "freq",
+    "threshold": "thresh",
+    "bandwidth": "bw",
+    "mix": "wet",
+}
+
+
+def _clean_fx_name(fx_name):
+    return fx_name.split(': ')[-1]
+
+
+class _ProjectIndex:
+    """
+    Índice local de pistas y FX de un proyecto: nombre en minúsculas -> ID, GUID e índice.
+
+    Se construye en una única sesión `reapy.inside_reaper()` y es válido
+    mientras no cambie el contador de cambios de estado del proyecto.
+    """
+
+    def __init__(self, project_id, change_count, tracks):
+        self.project_id = project_id
+        self.change_count = change_count
+        self.tracks = tracks
+        self.by_name = {}
+        self.by_id = {}
+        for entry in tracks:
+            # Como en la búsqueda lineal original, gana la primera pista con ese nombre
+            self.by_name.setdefault(entry["name"].lower(), entry)
+            self.by_id[entry["id"]] = entry
+            entry["fx_by_name"] = {}
+            for fx in entry["fxs"]:
+                entry["fx_by_name"].setdefault(fx["name"].lower(), fx)
+                entry["fx_by_name"].setdefault(fx["clean_name"].lower(), fx)
+
+
+_index_cache = {}
+_index_lock = threading.Lock()
+
+
+def _project_change_count(project):
+    return RPR.GetProjectStateChangeCount(project.id)
+
+
+def _build_project_index(project):
+    with reapy.inside_reaper():
+        change_count = _project_change_count(project)
+        tracks = []
+        for i, track in enumerate(project.tracks):
+            fxs = []
+            for j, fx in enumerate(track.fxs):
+                name = fx.name
+                fxs.append({"index": j, "name": name, "clean_name": _clean_fx_name(name)})
+            tracks.append({
+                "index": i,
+                "id": track.id,
+                "guid": track.GUID,
+                "name": track.name,
+                "depth": RPR.GetTrackDepth(track.id),
+                "fxs": fxs,
+            })
+    return _ProjectIndex(project.id, change_count, tracks)
+
+
+def get_project_index(project):
+    """Devuelve el índice del proyecto, reconstruyéndolo sólo si el proyecto cambió."""
+    change_count = _project_change_count(project)
+    with _index_lock:
+        index = _index_cache.get(project.id)
+        if index is not None and index.change_count == change_count:
+            return index
+    index = _build_project_index(project)
+    with _index_lock:
+        _index_cache[project.id] = index
+    return index
+
+
+def invalidate_project_index(project=None):
+    with _index_lock:
+        if project is None:
+            _index_cache.clear()
+        else:
+            _index_cache.pop(project.id, None)
+
+
+def _index_for_track(track):
+    with _index_lock:
+        for index in _index_cache.values():
+            entry = index.by_id.get(track.id)
+            if entry is not None:
+                return index, entry
+    return None, None
+
+
+# Líneas del chunk que cambian sin afectar al audio renderizado
+_VOLATILE_CHUNK_PREFIXES = ("SEL ", "MUTESOLO ")
+
+
+def _without_fx_section(lines, fx_index):
+    """
+    Quita del state chunk la sección del FX `fx_index` de la cadena de FX de la pista
+    (desde su línea BYPASS hasta la siguiente), incluidos sus parámetros.
+    """
+    kept = []
+    depth, chain_depth, fx = 0, None, -1
+    for line in lines:
+        s = line.strip()
+        if chain_depth is not None and depth == chain_depth and s.startswith("BYPASS"):
+            fx += 1
+        in_chain = chain_depth is not None and depth >= chain_depth
+        closes_chain = s == ">" and depth == chain_depth
+        if not (in_chain and fx == fx_index and not closes_chain):
+            kept.append(line)
+        if s.startswith("<"):
+            if chain_depth is None and s.split()[0] == "<FXCHAIN":
+                chain_depth = depth + 1
+            depth += 1
+        elif s == ">":
+            depth -= 1
+            if chain_depth is not None and depth < chain_depth:
+                chain_depth, fx = None, -1
+    return kept
+
+
+def _track_fingerprint(track, skip_fx=None):
+    """
+    Huella del estado de la pista (cadena de FX, ítems, volumen, envíos...) a partir
+    de su state chunk, ignorando selección y mute/solo.
+
+    Con `skip_fx` (índice de FX) se ignora además ese FX, para que la huella de un
+    render sin él no cambie al ajustar sus parámetros.
+    """
+    chunk = RPR.GetTrackStateChunk(track.id, "", 16 * 1024 * 1024, False)[2]
+    lines = chunk.splitlines()
+    if skip_fx is not None:
+        lines = _without_fx_section(lines, skip_fx)
+    h = hashlib.blake2b(digest_size=16)
+    for line in lines:
+        if not line.lstrip().startswith(_VOLATILE_CHUNK_PREFIXES):
+            h.update(line.encode("utf-8", "surrogatepass"))
+            h.update(b"\n")
+    return h.hexdigest()
+
+
 def _find_track(project, track_name):
-    for track in project.tracks:
-        if track.name.lower() == track_name.lower():
-            return track, None
+    index = get_project_index(project)
+    entry = index.by_name.get(track_name.lower())
+    if entry is not None:
+        return reapy.Track(entry["id"]), None
     return None, f"Error: No se encontró la pista '{track_name}'."
 
 
 def _find_fx(track, vst_name):
+    # El índice ya fue validado por _find_track en la misma llamada a la herramienta
+    _, entry = _index_for_track(track)
+    if entry is not None:
+        fx = entry["fx_by_name"].get(vst_name.lower())
+        if fx is not None:
+            return reapy.FX(parent_id=track.id, index=fx["index"]), None
+    # Pista no indexada o FX añadido después: recorrer los FX directamente
     for fx in track.fxs:
-        clean_fx_name = fx.name.split(': ')[-1]
-        if (fx.name.lower() == vst_name.lower() or 
+        clean_fx_name = _clean_fx_name(fx.name)
+        if (fx.name.lower() == vst_name.lower() or
             clean_fx_name.lower() == vst_name.lower()):
             return fx, None
     return None, f"Error: No se encontró el VST '{vst_name}' en la pista '{track.name}'."
+
+
+def _normalize_param_name(name):
+    """Minúsculas, sin puntuación y con sinónimos resueltos: 'Frequency Band 1' -> 'freqband1'."""
+    tokens = re.findall(r"[a-z]+|\d+", name.lower())
+    return "".join(PARAM_ALIASES.get(token, token) for token in tokens)
+
+
+def _param_numbers(name):
+    """Números del nombre, en orden y sin ceros a la izquierda: 'Gain-Band 04' -> (4,)."""
+    return tuple(int(n) for n in re.findall(r"\d+", name))
+
+
+# Categorías de parámetros por palabra clave, en orden de prioridad
+PARAM_CATEGORIES = [
+    ("eq", {"freq", "band", "bw", "q", "shelf", "hpf", "lpf", "hipass", "lowpass", "highpass", "lowcut", "highcut", "eq"}),
+    ("dynamics", {"thresh", "ratio", "attack", "release", "knee", "makeup", "gate", "comp", "limit",
+                  "limiter", "lookahead", "hold", "sidechain", "precomp", "rms"}),
+    ("time", {"delay", "predelay", "reverb", "room", "decay", "damp", "dampening", "size", "feedback",
+              "time", "tail", "early", "diffusion"}),
+    ("modulation", {"lfo", "rate", "depth", "mod", "chorus", "phaser", "flanger", "speed", "sync"}),
+    ("synth", {"osc", "wave", "pitch", "tune", "detune", "voice", "voices", "env", "cutoff", "reso",
+               "resonance", "glide", "portamento", "unison", "sustain", "decay"}),
+    ("mix", {"wet", "dry", "gain", "volume", "vol", "pan", "width", "output", "input", "trim", "level"}),
+]
+
+
+def _param_category(name):
+    tokens = set(re.findall(r"[a-z]+", name.lower()))
+    tokens |= {PARAM_ALIASES.get(token, token) for token in tokens}
+    for category, keywords in PARAM_CATEGORIES:
+        if tokens & keywords:
+            return category
+    return "other"
+
+
+class _ParamIndex:
+    """Nombres de los parámetros de un FX con búsqueda exacta, por alias y difusa."""
+
+    def __init__(self, names, fx_guid=None):
+        self.names = names
+        self.fx_guid = fx_guid
+        self.by_name = {}
+        self.by_normalized = {}
+        self.normalized = []
+        self.numbers = []
+        self.categories = []
+        # Rangos formateados (mínimo, máximo), leídos bajo demanda
+        self.ranges = {}
+        # Tablas valor normalizado -> valor formateado numérico, leídas bajo demanda
+        self.value_tables = {}
+        for i, name in enumerate(names):
+            normalized = _normalize_param_name(name)
+            self.by_name.setdefault(name.lower(), i)
+            self.by_normalized.setdefault(normalized, i)
+            self.normalized.append(normalized)
+            self.numbers.append(_param_numbers(name))
+            self.categories.append(_param_category(name))
+
+    def match(self, name, fuzzy=True):
+        """Devuelve el índice del parámetro o None. Orden: exacto, alias, difuso (ver `closest`)."""
+        index = self.by_name.get(name.lower())
+        if index is not None:
+            return index
+        index = self.by_normalized.get(_normalize_param_name(name))
+        if index is not None or not fuzzy:
+            return index
+        return self.closest(name)
+
+    def closest(self, name):
+        """
+        Parámetro de nombre parecido a `name` o None. Sólo se comparan los que llevan
+        los mismos números: 'Gain Band 7' nunca se confunde con 'Gain-Band 4'.
+        """
+        numbers = _param_numbers(name)
+        candidates = {
+            normalized: i for normalized, i in self.by_normalized.items() if self.numbers[i] == numbers
+        }
+        close = difflib.get_close_matches(_normalize_param_name(name), list(candidates), n=1, cutoff=0.85)
+        return candidates[close[0]] if close else None
+
+    def search(self, query=None, category=None, fuzzy_cutoff=0.6):
+        """
+        Índices de los parámetros que coinciden con `query` y `category`, ordenados por relevancia:
+        nombre exacto, prefijo, subcadena (también tras normalizar) y, si nada coincide así,
+        similitud difusa.
+        Sin `query` se devuelven en el orden del plugin.
+        """
+        candidates = [
+            i for i in range(len(self.names))
+            if category is None or self.categories[i] == category
+        ]
+        if not query:
+            return candidates
+        q = query.lower().strip()
+        nq = _normalize_param_name(query)
+        ranked = []
+        for i in candidates:
+            name = self.names[i].lower()
+            normalized = self.normalized[i]
+            if name == q or (nq and normalized == nq):
+                rank = 0.0
+            elif name.startswith(q) or (nq and normalized.startswith(nq)):
+                rank = 1.0
+            elif q in name or (nq and nq in normalized):
+                rank = 2.0
+            else:
+                ratio = difflib.SequenceMatcher(None, nq, normalized).ratio() if nq else 0.0
+                if ratio < fuzzy_cutoff:
+                    continue
+                rank = 3.0 + (1.0 - ratio)
+            ranked.append((rank, i))
+        ranked.sort()
+        # Las coincidencias difusas sólo se usan si no hay ninguna literal
+        if ranked and ranked[0][0] < 3.0:
+            ranked = [(rank, i) for rank, i in ranked if rank < 3.0]
+        return [i for _, i in ranked]
+
+
+_param_index_cache = OrderedDict()
+_PARAM_INDEX_CACHE_SIZE = 256
+
+
+def _get_param_index(track, fx):
+    """
+    Índice nombre -> posición de los parámetros del FX.
+
+    Los nombres se leen una sola vez por instancia de FX (clave: GUID del FX,
+    nombre y número de parámetros) dentro de una sesión inside_reaper.
+    """
+    with reapy.inside_reaper():
+        fx_guid = RPR.TrackFX_GetFXGUID(track.id, fx.index)
+        n_params = RPR.TrackFX_GetNumParams(track.id, fx.index)
+        key = (fx_guid, n_params)
+        with _index_lock:
+            index = _param_index_cache.get(key)
+            if index is not None:
+                _param_index_cache.move_to_end(key)
+                return index
+        names = [
+            RPR.TrackFX_GetParamName(track.id, fx.index, i, "", 256)[4]
+            for i in range(n_params)
+        ]
+    index = _ParamIndex(names, fx_guid)
+    with _index_lock:
+        _param_index_cache[key] = index
+        while len(_param_index_cache) > _PARAM_INDEX_CACHE_SIZE:
+            _param_index_cache.popitem(last=False)
+    return index
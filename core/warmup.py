@@ -0,0 +1,82 @@
+import os
+import time
+import importlib
+import threading
+
+# Módulos que la UI no necesita para mostrarse pero sí la primera respuesta. librosa
+# y el motor de características sólo se usan en el pool DSP: los precalienta init_dsp_worker
+WARMUP_MODULES = (
+    "agent.main",
+    "tools.ml_tools",
+    "tools.audio_tools",
+    "core.loudness",
+    "soundfile",
+)
+
+
+def _warm_dsp():
+    """Ejecuta el motor de características sobre un segundo de ruido para compilar lo que librosa compile con numba."""
+    import numpy as np
+    from core.features import compute_features
+
+    sr = 22050
+    compute_features(np.random.default_rng(0).standard_normal(sr).astype(np.float32) * 0.1, sr)
+
+
+def init_dsp_worker():
+    """
+    Inicializador de los procesos del pool DSP (get_dsp_pool): cada proceso
+    importa librosa y compila sus funciones numba al arrancar, antes de su
+    primera tarea. Un fallo sólo se avisa: si el inicializador lanzara, el pool
+    quedaría roto.
+    """
+    try:
+        _warm_dsp()
+    except Exception as e:
+        print(f"Aviso: no se pudo precalentar el proceso DSP {os.getpid()}: {e}")
+
+
+def _dsp_worker_ready():
+    return os.getpid()
+
+
+def _warm_dsp_pool():
+    """Arranca los procesos del pool DSP compartido y espera a que terminen de precalentarse."""
+    from core.concurrency import get_dsp_pool, dsp_pool_workers
+
+    pool = get_dsp_pool()
+    # Una tarea por proceso: con arranque bajo demanda cada envío sin proceso libre lanza uno nuevo
+    futures = [pool.submit(_dsp_worker_ready) for _ in range(dsp_pool_workers())]
+    return len({future.result() for future in futures})
+
+
+def warm_up(modules=WARMUP_MODULES):
+    """Importa el stack pesado y arranca el pool DSP precalentado. Devuelve {paso: segundos}; no propaga fallos."""
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Aviso: no se pudo precargar '{name}': {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    start = time.perf_counter()
+    try:
+        _warm_dsp_pool()
+        timings["dsp_pool"] = time.perf_counter() - start
+    except Exception as e:
+        print(f"Aviso: no se pudo precalentar el pool DSP: {e}")
+    return timings
+
+
+def start_warmup_thread(modules=WARMUP_MODULES):
+    """Lanza warm_up en un hilo daemon (después de mostrar la UI) y lo devuelve."""
+    def run():
+        start = time.perf_counter()
+        warm_up(modules)
+        print(f"Precarga en segundo plano completada en {time.perf_counter() - start:.1f} s.")
+
+    thread = threading.Thread(target=run, name="eqnity-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -48,11 +48,21 @@ translations = {
         # Tool calls
         "tool_call": "🔧 Llamada a herramienta",
         "tool_result": "✅ Resultado de herramienta",
+        "first_token_time": "primer token",
+        "total_time": "total",
+        "perf_breakdown": "⏱️ Desglose del turno",
+        "llm_step": "LLM paso",
+        "phase_reaper_wait": "cola de Reaper",
+        "phase_reaper": "Reaper",
+        "phase_render_wait": "espera de render",
+        "phase_dsp": "DSP",
+        "feature_cache": "caché",
         
         # File analysis
         "analyze_audio": "Analiza el audio",
         "suggest_processing_for": "Sugiere procesamiento para",
         "separate_instruments_from": "Separa instrumentos de",
+        "separating": "Separando stems",
     },
     
     "en": {
@@ -100,11 +110,21 @@ translations = {
         # Tool calls
         "tool_call": "🔧 Tool call",
         "tool_result": "✅ Tool result",
+        "first_token_time": "first token",
+        "total_time": "total",
+        "perf_breakdown": "⏱️ Turn breakdown",
+        "llm_step": "LLM step",
+        "phase_reaper_wait": "Reaper queue",
+        "phase_reaper": "Reaper",
+        "phase_render_wait": "render wait",
+        "phase_dsp": "DSP",
+        "feature_cache": "cache",
         
         # File analysis
         "analyze_audio": "Analyze audio",
         "suggest_processing_for": "Suggest processing for",
         "separate_instruments_from": "Separate instruments from",
+        "separating": "Separating stems",
     }
 }
 
@@ -17,9 +17,9 @@ class I18nManager:
         if lang in ["es", "en"]:
             self.current_lang = lang
     
-    def get(self, key: str) -> str:
-        """Obtiene una traducción para el idioma actual"""
-        return get_translation(key, self.current_lang)
+    def get(self, key: str, lang: str = None) -> str:
+        """Obtiene una traducción para el idioma indicado (por defecto, el actual)"""
+        return get_translation(key, lang or self.current_lang)
     
     def get_all(self) -> Dict[str, Any]:
         """Obtiene todas las traducciones para el idioma actual"""
@@ -28,9 +28,9 @@ class I18nManager:
 # Instancia global del manager
 i18n = I18nManager()
 
-def t(key: str) -> str:
-    """Función de conveniencia para obtener traducciones"""
-    return i18n.get(key)
+def t(key: str, lang: str = None) -> str:
+    """Función de conveniencia para obtener traducciones; `lang` es el idioma de la sesión"""
+    return i18n.get(key, lang)
 
 def update_language(lang: str):
     """Actualiza el idioma y retorna las nuevas traducciones"""
@@ -1,4 +1,7 @@
 from ui import build_ui
+from config import CHAT_CONCURRENCY_LIMIT, WARMUP_ON_START, METRICS_HOST, METRICS_PORT
+from core.warmup import start_warmup_thread
+from core.instrumentation import start_metrics_server
 
 def main():
     print("--- Bienvenido a EQnity AI v2.1 ---")
@@ -11,7 +14,13 @@ def main():
         exit()
 
     demo = build_ui()
-    demo.queue().launch()
+    demo.queue(default_concurrency_limit=CHAT_CONCURRENCY_LIMIT).launch(prevent_thread_lock=True)
+    if METRICS_PORT and start_metrics_server(METRICS_PORT, METRICS_HOST):
+        print(f"📈 Métricas en http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    # La UI ya está disponible: cargar el agente y el stack DSP sin bloquearla
+    if WARMUP_ON_START:
+        start_warmup_thread()
+    demo.block_thread()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,93 @@
+-- EQnity live tap bridge
+--
+-- Vuelca las muestras que eqnity_tap.jsfx deja en gmem["EQnityTap"] al
+-- archivo mapeado en memoria que lee core/live_tap.py (mismo formato de
+-- cabecera y anillo). Ejecútalo una vez como acción de Reaper; sigue activo
+-- en segundo plano (reaper.defer) hasta que se detenga la acción.
+--
+-- La ruta se toma de EQNITY_LIVE_TAP_PATH o, si no está definida, de
+-- /dev/shm/eqnity_tap.f32 (o del directorio temporal del sistema).
+
+local HEADER = 16            -- celdas de cabecera en gmem
+local HEADER_SIZE = 64       -- bytes de cabecera en el archivo
+local CHANNELS = 2
+local CAPACITY_SECONDS = 30
+local MAX_FRAMES_PER_TICK = 8192
+
+local function default_path()
+  local env = os.getenv("EQNITY_LIVE_TAP_PATH")
+  if env and env ~= "" then return env end
+  local shm = io.open("/dev/shm/.eqnity_probe", "w")
+  if shm then
+    shm:close()
+    os.remove("/dev/shm/.eqnity_probe")
+    return "/dev/shm/eqnity_tap.f32"
+  end
+  local tmp = os.getenv("TMPDIR") or os.getenv("TEMP") or os.getenv("TMP") or "/tmp"
+  return tmp .. "/eqnity_tap.f32"
+end
+
+reaper.gmem_attach("EQnityTap")
+
+local path = default_path()
+local file, capacity, sample_rate
+local written = 0            -- frames escritos en el archivo
+local read_pos = nil         -- posición de gmem ya volcada
+
+local function open_ring(sr)
+  if file then file:close() end
+  sample_rate = sr
+  capacity = math.floor(CAPACITY_SECONDS * sr)
+  file = assert(io.open(path, "w+b"))
+  file:write(string.pack("<c8I4I4I4I4i8d", "EQTAP001", 1, sr, CHANNELS, capacity, 0, os.time()))
+  file:write(string.rep("\0", HEADER_SIZE - 40))
+  -- Reservar el anillo completo para que el lector pueda mapearlo desde el principio
+  file:seek("set", HEADER_SIZE + capacity * CHANNELS * 4 - 1)
+  file:write("\0")
+  file:flush()
+  written = 0
+end
+
+local function write_frames(first, count, gmem_capacity)
+  local values = {}
+  for k = 0, count - 1 do
+    local idx = HEADER + 2 * ((first + k) % gmem_capacity)
+    values[#values + 1] = reaper.gmem_read(idx)
+    values[#values + 1] = reaper.gmem_read(idx + 1)
+  end
+  -- Escribir en el anillo del archivo, partiendo el bloque si cruza el final
+  local offset = 0
+  while offset < count do
+    local slot = (written + offset) % capacity
+    local n = math.min(count - offset, capacity - slot, 512)
+    file:seek("set", HEADER_SIZE + slot * CHANNELS * 4)
+    file:write(string.pack("<" .. string.rep("f", n * CHANNELS),
+      table.unpack(values, offset * CHANNELS + 1, (offset + n) * CHANNELS)))
+    offset = offset + n
+  end
+  written = written + count
+  file:seek("set", 24)
+  file:write(string.pack("<i8d", written, os.time()))
+  file:flush()
+end
+
+local function tick()
+  local sr = math.floor(reaper.gmem_read(1))
+  local gmem_capacity = math.floor(reaper.gmem_read(2))
+  local wpos = math.floor(reaper.gmem_read(0))
+  if sr > 0 and gmem_capacity > 0 then
+    if sr ~= sample_rate then open_ring(sr) end
+    if read_pos == nil or wpos < read_pos or wpos - read_pos > gmem_capacity then
+      read_pos = wpos
+    end
+    local count = math.min(wpos - read_pos, MAX_FRAMES_PER_TICK)
+    if count > 0 then
+      write_frames(read_pos, count, gmem_capacity)
+      read_pos = read_pos + count
+    end
+  end
+  reaper.defer(tick)
+end
+
+reaper.atexit(function() if file then file:close() end end)
+tick()
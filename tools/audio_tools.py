@@ -1,117 +1,552 @@
 import os
+import re
+import shutil
 import tempfile
 import time
-import numpy as np
-import soundfile as sf
-import pyloudnorm as pyln
-import librosa
 import reapy
+from typing import List
 from langchain.tools import tool
-from core.utils import _find_track
+from config import (
+    RENDER_TIMEOUT_SECONDS, RENDER_CACHE_MAX_ENTRIES, LIVE_TAP_PATH, LIVE_TAP_FX_NAME, LIVE_TAP_MAX_AGE_SECONDS
+)
+from core.cache import MemoryLRUCache
+from core.utils import _find_track, _track_fingerprint, get_project_index, RPR
+from core.render import RenderWatcher
+from core.concurrency import run_on_reaper, run_dsp, map_dsp
+from core.instrumentation import phase, record_bytes_read, record_file_read
+from core.transaction import reaper_transaction, get_track_info, set_track_info
 
-@tool
-def analyze_track_audio(track_name: str, duration: int = 10) -> str:
+# Resultados de análisis por (GUID de pista, inicio, duración, huella del estado de la pista)
+render_cache = MemoryLRUCache(RENDER_CACHE_MAX_ENTRIES)
+
+RENDER_SETTING_KEYS = {
+    "RENDER_FILE": str,
+    "RENDER_PATTERN": str,
+    "RENDER_BOUNDSFLAG": float,
+    "RENDER_STARTPOS": float,
+    "RENDER_ENDPOS": float,
+    "RENDER_SETTINGS": float,
+}
+
+def _analyze_buffer(audio, sr):
     """
-    Renderiza un clip de la pista usando el contexto de Reaper y analiza el audio resultante.
+    Calcula loudness EBU R128 (integrado, momentáneo, corto plazo, LRA y true peak),
+    centroide espectral, pico y RMS de un array (muestras[, canales]).
     """
-    original_mutes = {}
-    project = reapy.Project()
+    # Importación diferida: el stack DSP sólo se carga al analizar
+    import numpy as np
+    import librosa
+    from core.loudness import measure_loudness
+
+    # El loudness suma los canales como indica BS.1770; el resto se mide sobre la mezcla mono
+    loudness = measure_loudness(audio, sr)
+    if audio.ndim > 1:
+        audio = np.mean(audio, axis=1)
+    peak = float(np.max(np.abs(audio))) if audio.size else 0.0
+    rms = float(np.sqrt(np.mean(audio ** 2))) if audio.size else 0.0
+    return {
+        "loudness": loudness["integrated"],
+        "momentary": loudness["momentary"],
+        "short_term": loudness["short_term"],
+        "loudness_range": loudness["loudness_range"],
+        "true_peak_db": loudness["true_peak"],
+        "spectral_centroid": float(np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr))),
+        "peak_db": float(20 * np.log10(max(peak, 1e-10))),
+        "rms_db": float(20 * np.log10(max(rms, 1e-10))),
+    }
+
+def _analyze_rendered_file(audio_path):
+    """Lee un archivo renderizado y lo analiza con _analyze_buffer."""
+    import soundfile as sf
+
+    audio, sr = sf.read(audio_path)
+    return _analyze_buffer(audio, sr)
+
+def _analyze_live_tap(path, seconds):
+    """Analiza los últimos `seconds` segundos del tap en directo sin copiar el audio del anillo."""
+    from core.live_tap import LiveTapReader
+
+    with LiveTapReader(path) as reader:
+        snapshot = reader.snapshot(seconds)
+        analysis = _analyze_buffer(snapshot.audio, snapshot.sample_rate)
+        if not reader.is_valid(snapshot):
+            # El escritor dio la vuelta al anillo durante el análisis: repetir sobre una copia
+            snapshot = reader.snapshot(seconds, copy=True)
+            analysis = _analyze_buffer(snapshot.audio, snapshot.sample_rate)
+        analysis["seconds"] = snapshot.seconds
+        analysis["bytes_read"] = snapshot.audio.nbytes
+    return analysis
+
+def _brightness_description(spectral_centroid):
+    return (
+        "oscuro/mate (bajo brillo)" if spectral_centroid < 1000 else
+        "balance medio de brillo" if spectral_centroid < 2500 else
+        "brillante/agudo"
+    )
+
+def _render_cache_key(track, start_time, duration):
+    return (track.GUID, round(float(start_time), 3), float(duration), _track_fingerprint(track))
+
+def _cache_note(hit):
+    stats = render_cache.stats()
+    return (
+        f"- Caché de render: {'acierto (pista sin cambios, no se volvió a renderizar)' if hit else 'fallo'} "
+        f"[{stats['hits']} aciertos / {stats['misses']} fallos].\n"
+    )
+
+def _format_track_report(track_name, analysis):
+    spectral_centroid = analysis["spectral_centroid"]
+    brillo = (
+        "- El audio es oscuro/mate (bajo brillo).\n" if spectral_centroid < 1000 else
+        "- El audio tiene un balance medio de brillo.\n" if spectral_centroid < 2500 else
+        "- El audio es brillante/agudo.\n"
+    )
+    return (
+        f"Reporte de Análisis de Audio para '{track_name}':\n"
+        f"- Loudness: {analysis['loudness']:.2f} LUFS | rango (LRA) {analysis['loudness_range']:.1f} LU "
+        f"| true peak {analysis['true_peak_db']:.1f} dBTP.\n"
+        f"{brillo}"
+    )
+
+def _save_render_settings(project):
+    settings = {}
+    for key, kind in RENDER_SETTING_KEYS.items():
+        if kind is str:
+            settings[key] = project.get_info_string(key)
+        else:
+            settings[key] = project.get_info_value(key)
+    return settings
+
+def _restore_render_settings(project, settings):
+    for key, value in settings.items():
+        if isinstance(value, str):
+            project.set_info_string(key, value)
+        else:
+            project.set_info_value(key, value)
+
+def _apply_track_states(states, previous):
+    """
+    Aplica {clave: {id de pista: valor}} (B_MUTE, I_SELECTED) leyendo en lote y
+    escribiendo sólo los valores que cambian. Anota en `previous` el valor anterior
+    de cada escritura antes de hacerla, así que sirve para restaurar aunque falle a medias.
+    """
+    for key, values in states.items():
+        current = get_track_info(values, key)
+        changed = {track_id: value for track_id, value in values.items() if current[track_id] != value}
+        previous.setdefault(key, {}).update({track_id: current[track_id] for track_id in changed})
+        set_track_info(changed, key)
+
+def _render_solo(project, track, start_time, duration, render_dir):
+    """
+    Renderiza `duration` segundos de la pista en solitario en `render_dir` y espera
+    a que el WAV quede cerrado. Lanza TimeoutError si el render no termina.
+
+    Los mutes, la selección y la configuración de render se restauran antes de volver.
+    Son cambios temporales: se aplican en lote, sin refresco de la interfaz y sin
+    entrada en el historial de deshacer.
+    """
+    original_states = {}
+    prev_settings = {}
+    render_path = os.path.join(render_dir, f"{project.name.split('.')[0]}.wav")
+    try:
+        with project.make_current_project():
+            track_ids = [entry["id"] for entry in get_project_index(project).tracks]
+            with reaper_transaction():
+                # Mutear las otras pistas y seleccionar sólo la deseada
+                _apply_track_states({
+                    "B_MUTE": {track_id: float(track_id != track.id) for track_id in track_ids},
+                    "I_SELECTED": {track_id: float(track_id == track.id) for track_id in track_ids},
+                }, original_states)
+
+                # Guardar y ajustar configuración de render
+                prev_settings = _save_render_settings(project)
+                project.set_info_string("RENDER_FILE", render_dir)
+                project.set_info_string("RENDER_PATTERN", "")
+                project.set_info_value("RENDER_BOUNDSFLAG", 0)
+                project.set_info_value("RENDER_STARTPOS", start_time)
+                project.set_info_value("RENDER_ENDPOS", start_time + duration)
+                project.set_info_value("RENDER_SETTINGS", 2)
+
+            # Renderizar (guardar como archivo) y esperar a que la cabecera WAV quede cerrada
+            with RenderWatcher(render_path) as watcher:
+                render_start = time.perf_counter()
+                # Pon en primer plano reaper para evitar problemas de pistas offline
+                project.perform_action(41824)
+                project.perform_action(40078)  # Render to file
+                render_time = time.perf_counter() - render_start
+                wait_time = watcher.wait(RENDER_TIMEOUT_SECONDS)
+        return {
+            "render_path": render_path,
+            "render_time": render_time,
+            "wait_time": wait_time,
+            "wait_mode": watcher.mode,
+        }
+    finally:
+        # Restaurar configuración de render, mutes y selección
+        with reaper_transaction():
+            _restore_render_settings(project, prev_settings)
+            _apply_track_states(original_states, {})
+
+# Stems de _render_track_stems (patrón eqnity_$tracknumber). Reaper puede rellenar el
+# número con ceros, así que se buscan por número de pista y no por nombre exacto
+_STEM_NAME = re.compile(r"^eqnity_(\d+)\.wav$", re.IGNORECASE)
+
+def _find_stems(render_dir):
+    """{número de pista: ruta} de los stems que ya existen en render_dir."""
+    try:
+        names = os.listdir(render_dir)
+    except OSError:
+        return {}
+    stems = {}
+    for name in names:
+        match = _STEM_NAME.match(name)
+        if match:
+            stems[int(match.group(1))] = os.path.join(render_dir, name)
+    return stems
+
+def _wait_for_stem(render_dir, number, timeout, poll_interval=0.05):
+    """Ruta del stem de la pista `number` en cuanto Reaper lo crea; TimeoutError si no aparece."""
+    deadline = time.perf_counter() + timeout
+    with phase("render_wait"):
+        while True:
+            path = _find_stems(render_dir).get(number)
+            if path:
+                return path
+            if time.perf_counter() >= deadline:
+                raise TimeoutError(f"No apareció el stem de la pista {number} en {render_dir}")
+            time.sleep(poll_interval)
+
+def _make_render_dir(project):
     temp_dir = os.path.join(project.path, "temp_audio")
     os.makedirs(temp_dir, exist_ok=True)
-    temp_file = tempfile.mktemp(dir=temp_dir)
-    file_name = f"\\{project.name.split('.')[0]}.wav"
+    return tempfile.mkdtemp(dir=temp_dir)
+
+def _render_track_clip(track_name, duration):
+    """
+    Fase de E/S con Reaper de analyze_track_audio; se ejecuta en el hilo de Reaper.
+
+    Devuelve {"error": ...}, {"analysis": ...} si la caché acierta, o la ruta del
+    render listo para analizar. El proyecto queda restaurado antes de volver.
+    """
+    render_dir = None
+    project = reapy.Project()
 
     try:
         track, error = _find_track(project, track_name)
         if error or not track:
-            return error or f"Error: No se encontró la pista '{track_name}'."
+            return {"error": error or f"Error: No se encontró la pista '{track_name}'."}
+
+        start_time = project.cursor_position
+        cache_key = _render_cache_key(track, start_time, duration)
+        analysis = render_cache.get(cache_key)
+        if analysis is not None:
+            return {"analysis": analysis}
+
+        render_dir = _make_render_dir(project)
+        try:
+            clip = _render_solo(project, track, start_time, duration, render_dir)
+        except TimeoutError:
+            shutil.rmtree(render_dir, ignore_errors=True)
+            return {"error": "Error: Timeout esperando el renderizado."}
+        return {"cache_key": cache_key, "render_dir": render_dir, **clip}
+
+    except Exception:
+        if render_dir:
+            shutil.rmtree(render_dir, ignore_errors=True)
+        raise
+
+@tool
+def analyze_track_audio(track_name: str, duration: int = 10) -> str:
+    """
+    Renderiza un clip de la pista usando el contexto de Reaper y analiza el audio resultante.
+    Si la pista no cambió desde el último análisis del mismo tramo, devuelve el resultado en caché.
+    """
+    try:
+        clip = run_on_reaper(_render_track_clip, track_name, duration)
+        if "error" in clip:
+            return clip["error"]
+        if "analysis" in clip:
+            return _format_track_report(track_name, clip["analysis"]) + _cache_note(hit=True)
+
+        # El análisis corre en el pool DSP; el hilo de Reaper queda libre para otras herramientas
+        try:
+            analysis_start = time.perf_counter()
+            record_file_read(clip["render_path"])
+            analysis = run_dsp(_analyze_rendered_file, clip["render_path"])
+            analysis_time = time.perf_counter() - analysis_start
+        finally:
+            shutil.rmtree(clip["render_dir"], ignore_errors=True)
+        render_cache.put(clip["cache_key"], analysis)
+
+        return (
+            _format_track_report(track_name, analysis)
+            + f"- Tiempos: render {clip['render_time']:.2f} s | espera {clip['wait_time']:.2f} s "
+            f"({clip['wait_mode']}) | análisis {analysis_time:.2f} s.\n"
+            + _cache_note(hit=False)
+        )
+
+    except Exception as e:
+        return f"Error durante el análisis de audio: {e}"
+
+def _render_track_stems(track_names, duration):
+    """
+    Fase de E/S con Reaper de analyze_tracks_audio; se ejecuta en el hilo de Reaper.
+
+    Resuelve las pistas, toma de la caché las que no cambiaron y renderiza el resto
+    como stems en una sola pasada. El proyecto queda restaurado antes de volver.
+    """
+    original_states = {}
+    prev_settings = {}
+    render_dir = None
+    project = reapy.Project()
+
+    try:
+        tracks, errors = [], []
+        for name in track_names:
+            track, error = _find_track(project, name)
+            if error or not track:
+                errors.append(error or f"Error: No se encontró la pista '{name}'.")
+            elif all(t["id"] != track.id for t in tracks):
+                tracks.append({"id": track.id, "name": track.name, "track": track})
+        if not tracks:
+            return {"error": "\n".join(errors) or "Error: No se indicó ninguna pista."}
+
+        start_time = project.cursor_position
+        for entry in tracks:
+            entry["cache_key"] = _render_cache_key(entry.pop("track"), start_time, duration)
+            entry["analysis"] = render_cache.get(entry["cache_key"])
+        to_render = [entry for entry in tracks if entry["analysis"] is None]
+        result = {"tracks": tracks, "errors": errors, "render_dir": None, "render_time": 0.0, "wait_time": 0.0}
+        if not to_render:
+            return result
+
+        render_dir = _make_render_dir(project)
+        # Un stem por pista seleccionada: eqnity_<número de pista>.wav (ver _find_stems)
+        for entry in to_render:
+            entry["number"] = reapy.Track(entry["id"]).index + 1
+        stem_ids = {entry["id"] for entry in to_render}
 
         with project.make_current_project():
-            # Guardar estado de mute y mutear otras pistas
-            for t in project.tracks:
-                original_mutes[t.id] = t.is_muted
-                if t.id != track.id:
-                    t.mute()
-            track.unmute()
-    
-            # Guardar y ajustar configuración de render
-            prev_settings = {
-                "RENDER_FILE": project.get_info_string("RENDER_FILE"),
-                "RENDER_PATTERN": project.get_info_string("RENDER_PATTERN"),
-                "RENDER_BOUNDSFLAG": project.get_info_value("RENDER_BOUNDSFLAG"),
-                "RENDER_STARTPOS": project.get_info_value("RENDER_STARTPOS"),
-                "RENDER_ENDPOS": project.get_info_value("RENDER_ENDPOS"),
-                "RENDER_SETTINGS": project.get_info_value("RENDER_SETTINGS"),
-            }
-            project.set_info_string("RENDER_FILE", temp_file)
-            project.set_info_string("RENDER_PATTERN", "")
-            project.set_info_value("RENDER_BOUNDSFLAG", 0)
-            start_time = project.cursor_position
-            end_time = start_time + duration
-            project.set_info_value("RENDER_STARTPOS", start_time)
-            project.set_info_value("RENDER_ENDPOS", end_time)
-            project.set_info_value("RENDER_SETTINGS", 2)
-    
-            # Seleccionar solo la pista deseada
-            for t in project.tracks:
-                t.unselect()
-            track.select()
-    
-            # Renderizar (guardar como archivo)
-            # Pon en primer plano reaper para evitar problemas de pistas offline
+            track_ids = [entry["id"] for entry in get_project_index(project).tracks]
+            with reaper_transaction():
+                # Las pistas muteadas renderizan silencio: desmutear temporalmente las
+                # seleccionadas; RENDER_SETTINGS 2 renderiza sólo las pistas seleccionadas
+                _apply_track_states({
+                    "B_MUTE": {track_id: 0.0 for track_id in stem_ids},
+                    "I_SELECTED": {track_id: float(track_id in stem_ids) for track_id in track_ids},
+                }, original_states)
+
+                prev_settings = _save_render_settings(project)
+                project.set_info_string("RENDER_FILE", render_dir)
+                project.set_info_string("RENDER_PATTERN", "eqnity_$tracknumber")
+                project.set_info_value("RENDER_BOUNDSFLAG", 0)
+                project.set_info_value("RENDER_STARTPOS", start_time)
+                project.set_info_value("RENDER_ENDPOS", start_time + duration)
+                project.set_info_value("RENDER_SETTINGS", 2)  # Sólo stems de las pistas seleccionadas
+
+            render_start = time.perf_counter()
             project.perform_action(41824)
             project.perform_action(40078)  # Render to file
-    
-            # Esperar a que el archivo se genere
-            for _ in range(300):
-                print(temp_file, file_name, os.path.exists(temp_file), os.path.getsize(temp_file + file_name))
-                if os.path.exists(temp_file) and os.path.getsize(temp_file + file_name) > 0:
-                    with open(temp_file + file_name, "rb") as f:
-                        f.read(1)
-                    time.sleep(0.5)
-                    break
-                time.sleep(0.1)
-            else:
-                return "Error: Timeout esperando el renderizado."
-    
-            # Restaurar configuración de render
-            for key, value in prev_settings.items():
-                if isinstance(value, str):
-                    project.set_info_string(key, value)
-                else:
-                    project.set_info_value(key, value)
-    
-            # Leer y analizar el audio
-            time.sleep(2)  # Retraso adicional antes de leer
-            audio, sr = sf.read(temp_file + file_name)
-            if audio.ndim > 1:
-                audio = np.mean(audio, axis=1)
-                
-            meter = pyln.Meter(sr)
-            loudness = meter.integrated_loudness(audio)
-            spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr))
-    
-            brillo = (
-                "- El audio es oscuro/mate (bajo brillo).\n" if spectral_centroid < 1000 else
-                "- El audio tiene un balance medio de brillo.\n" if spectral_centroid < 2500 else
-                "- El audio es brillante/agudo.\n"
-            )
-            return (
-                f"Reporte de Análisis de Audio para '{track_name}':\n"
-                f"- Loudness: {loudness:.2f} LUFS.\n"
-                f"{brillo}"
-            )
+            result["render_time"] = time.perf_counter() - render_start
 
-    except Exception as e:
-        return f"Error durante el análisis de audio: {e}"
+        # Esperar a que todos los stems tengan la cabecera cerrada
+        wait_start = time.perf_counter()
+        for entry in to_render:
+            remaining = RENDER_TIMEOUT_SECONDS - (time.perf_counter() - wait_start)
+            try:
+                entry["stem_path"] = _wait_for_stem(render_dir, entry["number"], max(0.0, remaining))
+                remaining = RENDER_TIMEOUT_SECONDS - (time.perf_counter() - wait_start)
+                with RenderWatcher(entry["stem_path"]) as watcher:
+                    watcher.wait(max(0.0, remaining))
+            except TimeoutError:
+                shutil.rmtree(render_dir, ignore_errors=True)
+                return {"error": f"Error: Timeout esperando el stem de la pista '{entry['name']}'."}
+        result["wait_time"] = time.perf_counter() - wait_start
+        result["render_dir"] = render_dir
+        return result
+
+    except Exception:
+        if render_dir:
+            shutil.rmtree(render_dir, ignore_errors=True)
+        raise
     finally:
-        # Restaurar estado de mute
-        for t in project.tracks:
-            if t.id in original_mutes:
-                t.mute() if original_mutes[t.id] else t.unmute()
-        # Eliminar archivo temporal
-        if os.path.exists(temp_file):
+        with reaper_transaction():
+            _restore_render_settings(project, prev_settings)
+            _apply_track_states(original_states, {})
+
+@tool
+def analyze_tracks_audio(track_names: List[str], duration: int = 10) -> str:
+    """
+    Renderiza VARIAS pistas como stems en una sola pasada de render de Reaper y las analiza
+    en paralelo. Úsala en lugar de llamar a `analyze_track_audio` una vez por pista
+    cuando necesites diagnosticar la mezcla completa o varias pistas a la vez.
+    Las pistas sin cambios desde su último análisis se toman de la caché sin renderizar.
+    """
+    try:
+        stems = run_on_reaper(_render_track_stems, track_names, duration)
+        if "error" in stems:
+            return stems["error"]
+        tracks = stems["tracks"]
+        to_render = [entry for entry in tracks if entry["analysis"] is None]
+
+        # Analizar todos los stems a la vez en el pool de procesos compartido
+        analysis_time = 0.0
+        if to_render:
             try:
-                os.remove(temp_file)
-            except Exception:
-                pass
+                analysis_start = time.perf_counter()
+                paths = [entry["stem_path"] for entry in to_render]
+                for path in paths:
+                    record_file_read(path)
+                analyses = map_dsp(_analyze_rendered_file, paths)
+                for entry, analysis in zip(to_render, analyses):
+                    entry["analysis"] = analysis
+                    render_cache.put(entry["cache_key"], analysis)
+                analysis_time = time.perf_counter() - analysis_start
+            finally:
+                shutil.rmtree(stems["render_dir"], ignore_errors=True)
+
+        cached = len(tracks) - len(to_render)
+        lines = [
+            f"Reporte de Análisis de {len(tracks)} pistas "
+            f"({len(to_render)} renderizadas en un solo render, {cached} desde la caché):",
+            "| Pista | Loudness (LUFS) | LRA (LU) | True peak (dBTP) | Pico (dBFS) | RMS (dBFS) | Centroide (Hz) | Brillo |",
+            "|---|---|---|---|---|---|---|---|",
+        ]
+        for entry in tracks:
+            analysis = entry["analysis"]
+            lines.append(
+                f"| {entry['name']} | {analysis['loudness']:.2f} | {analysis['loudness_range']:.1f} | "
+                f"{analysis['true_peak_db']:.1f} | {analysis['peak_db']:.1f} | "
+                f"{analysis['rms_db']:.1f} | {analysis['spectral_centroid']:.0f} | "
+                f"{_brightness_description(analysis['spectral_centroid'])} |"
+            )
+        lines += stems["errors"]
+        lines.append(
+            f"- Tiempos: render {stems['render_time']:.2f} s | espera {stems['wait_time']:.2f} s "
+            f"| análisis {analysis_time:.2f} s."
+        )
+        stats = render_cache.stats()
+        lines.append(f"- Caché de render: {cached} aciertos en esta llamada "
+                     f"[{stats['hits']} aciertos / {stats['misses']} fallos en total].")
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"Error durante el análisis de audio por lotes: {e}"
+
+# Nombre del archivo del JSFX, para añadirlo a una pista que no lo tenga
+LIVE_TAP_JSFX = "eqnity_tap"
+
+def _live_tap_installed():
+    """Busca el JSFX del tap en la carpeta Effects de Reaper, sin tocar el proyecto."""
+    effects = os.path.join(RPR.GetResourcePath(), "Effects")
+    target = f"{LIVE_TAP_JSFX}.jsfx"
+    if os.path.isfile(os.path.join(effects, target)):
+        return True
+    return any(target in files for _, _, files in os.walk(effects))
+
+def _activate_live_tap(track_name):
+    """
+    Activa el tap en directo de la pista (añadiéndolo al final de su cadena si falta)
+    y desactiva los de las demás pistas. No toca mutes, selección ni render.
+    """
+    project = reapy.Project()
+    track, error = _find_track(project, track_name)
+    if error or not track:
+        return {"error": error or f"Error: No se encontró la pista '{track_name}'."}
+    if not RPR.GetPlayState() & 1:
+        return {"error": "Error: Reaper no está reproduciendo; el análisis en directo necesita reproducción "
+                         "(usa `analyze_track_audio` para renderizar)."}
+
+    tap_name = LIVE_TAP_FX_NAME.lower()
+    tap_index, was_active, active_elsewhere = None, False, []
+    with reapy.inside_reaper():
+        for entry in get_project_index(project).tracks:
+            for fx in entry["fxs"]:
+                if tap_name not in fx["name"].lower():
+                    continue
+                value = RPR.TrackFX_GetParamNormalized(entry["id"], fx["index"], 0)
+                if entry["id"] == track.id:
+                    tap_index, was_active = fx["index"], value >= 0.5
+                elif value >= 0.5:
+                    active_elsewhere.append((entry["id"], fx["index"], value))
+    # Comprobarlo antes de abrir la transacción: un fallo no deja entrada en el historial
+    if tap_index is None and not _live_tap_installed():
+        return {"error": f"Error: No se encontró el JSFX '{LIVE_TAP_JSFX}'. Copia reaper/eqnity_tap.jsfx "
+                         f"a la carpeta Effects de Reaper y ejecuta reaper/eqnity_tap_bridge.lua."}
+
+    with reaper_transaction(f"Escucha en directo de '{track.name}'") as tx:
+        for track_id, fx_index, value in active_elsewhere:
+            tx.on_rollback(RPR.TrackFX_SetParamNormalized, track_id, fx_index, 0, value)
+            RPR.TrackFX_SetParamNormalized(track_id, fx_index, 0, 0.0)
+        if tap_index is None:
+            tap_index = track.add_fx(LIVE_TAP_JSFX).index
+            tx.record_added_fx(track.id, tap_index)
+        # El tap debe ser el último FX para escuchar la pista ya procesada
+        last = RPR.TrackFX_GetCount(track.id) - 1
+        if tap_index != last:
+            RPR.TrackFX_CopyToTrack(track.id, tap_index, track.id, last, True)
+            tx.on_rollback(RPR.TrackFX_CopyToTrack, track.id, last, track.id, tap_index, True)
+            tap_index = last
+            was_active = False
+        tx.record_params(track.id, tap_index, [0])
+        RPR.TrackFX_SetParamNormalized(track.id, tap_index, 0, 1.0)
+    return {"switched": not was_active}
+
+def _wait_for_live_audio(path, seconds, switched):
+    """Espera a tener `seconds` segundos de audio de la pista recién activada. Devuelve un error o None."""
+    from core.live_tap import LiveTapReader
+
+    try:
+        reader = LiveTapReader(path)
+    except (OSError, ValueError):
+        return (f"Error: No hay tap en directo en '{path}'. Ejecuta reaper/eqnity_tap_bridge.lua "
+                f"en Reaper (Acciones > Cargar ReaScript).")
+    with reader:
+        if not switched:
+            if reader.age() > LIVE_TAP_MAX_AGE_SECONDS:
+                return "Error: El tap en directo no recibe audio; comprueba que eqnity_tap_bridge.lua sigue activo."
+            return None
+        # Recién activado: el anillo aún contiene audio de otra pista
+        start = reader.position()[0]
+        needed = int(seconds * reader.sample_rate)
+        deadline = time.perf_counter() + seconds + LIVE_TAP_MAX_AGE_SECONDS
+        while reader.position()[0] - start < needed:
+            if time.perf_counter() > deadline:
+                return "Error: El tap en directo no recibe audio; comprueba que eqnity_tap_bridge.lua sigue activo."
+            time.sleep(0.05)
+    return None
+
+@tool
+def analyze_track_live(track_name: str, seconds: float = 5.0) -> str:
+    """
+    Analiza en directo los últimos segundos de una pista MIENTRAS Reaper reproduce, sin renderizar:
+    no escribe archivos ni cambia mutes o la configuración de render. Si el tap ya escuchaba esta
+    pista responde al instante; al cambiar de pista espera `seconds` segundos de reproducción.
+    Requiere reaper/eqnity_tap.jsfx y reaper/eqnity_tap_bridge.lua; si no, usa `analyze_track_audio`.
+    """
+    try:
+        from core.live_tap import default_tap_path
+
+        path = LIVE_TAP_PATH or default_tap_path()
+        start = time.perf_counter()
+        tap = run_on_reaper(_activate_live_tap, track_name)
+        if "error" in tap:
+            return tap["error"]
+        error = _wait_for_live_audio(path, seconds, tap["switched"])
+        if error:
+            return error
+        wait_time = time.perf_counter() - start
+
+        analysis_start = time.perf_counter()
+        analysis = run_dsp(_analyze_live_tap, path, seconds)
+        record_bytes_read(analysis["bytes_read"])
+        analysis_time = time.perf_counter() - analysis_start
+        return (
+            _format_track_report(track_name, analysis)
+            + f"- Ahora: momentáneo {analysis['momentary']:.1f} LUFS | corto plazo {analysis['short_term']:.1f} LUFS.\n"
+            + f"- Pico: {analysis['peak_db']:.1f} dBFS | RMS: {analysis['rms_db']:.1f} dBFS.\n"
+            + f"- Escucha en directo: últimos {analysis['seconds']:.1f} s sin render "
+            f"(espera {wait_time:.2f} s | análisis {analysis_time:.2f} s).\n"
+        )
+    except Exception as e:
+        return f"Error durante el análisis en directo: {e}"
@@ -0,0 +1,238 @@
+import os
+import io
+import csv
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Optional
+from langchain.tools import tool
+from tools.ml_tools import _extract_features, analyze_audio_characteristics, get_analysis_profile, DEFAULT_PROFILE
+from core.concurrency import get_dsp_pool, replace_broken_dsp_pool
+from core.instrumentation import phase, record_bytes_read, record_cache_lookup
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".aif", ".aiff", ".ogg", ".mp3"}
+
+FEATURE_COLUMNS = [
+    ("spectral_centroid", "Centroide (Hz)", "{:.1f}"),
+    ("spectral_rolloff", "Rolloff (Hz)", "{:.1f}"),
+    ("spectral_bandwidth", "Ancho de banda (Hz)", "{:.1f}"),
+    ("rms", "RMS", "{:.4f}"),
+    ("zero_crossing_rate", "ZCR", "{:.4f}"),
+    ("tempo", "Tempo (BPM)", "{:.1f}"),
+]
+
+
+def resolve_audio_paths(target: str, recursive: bool = False) -> List[str]:
+    """Devuelve los archivos de audio de una carpeta o de un patrón glob, ordenados."""
+    if os.path.isdir(target):
+        pattern = os.path.join(target, "**", "*") if recursive else os.path.join(target, "*")
+        candidates = glob.glob(pattern, recursive=recursive)
+    else:
+        candidates = glob.glob(target, recursive=True)
+    return sorted(
+        p for p in candidates
+        if os.path.isfile(p) and os.path.splitext(p)[1].lower() in AUDIO_EXTENSIONS
+    )
+
+
+def _analyze_file(audio_path: str, profile: str = "accurate") -> dict:
+    """
+    Analiza un archivo en un proceso del pool. Nunca lanza: los errores van en el resultado.
+    `bytes_read` son los bytes de audio decodificado que se leyeron (0 si acertó la
+    caché) y `cache_hit` si acertó la caché de características.
+    """
+    start = time.perf_counter()
+    try:
+        features, bytes_read, cache_hit = _extract_features(audio_path, profile=profile)
+        return {
+            "file": audio_path,
+            "ok": True,
+            "features": features,
+            "recommendations": analyze_audio_characteristics(features),
+            "seconds": time.perf_counter() - start,
+            "bytes_read": bytes_read,
+            "cache_hit": cache_hit,
+        }
+    except Exception as e:
+        return {"file": audio_path, "ok": False, "error": str(e), "seconds": time.perf_counter() - start}
+
+
+def _analyze_round(executor, paths, profile, lost):
+    """Un intento sobre `paths`: produce sus resultados y anota en `lost` los que se perdieron con el pool roto."""
+    futures = {}
+    for p in paths:
+        try:
+            futures[executor.submit(_analyze_file, p, profile)] = p
+        except (BrokenProcessPool, RuntimeError):
+            # Pool ya roto o retirado por otra llamada
+            lost.append(p)
+    for future in as_completed(futures):
+        try:
+            yield future.result()
+        except BrokenProcessPool:
+            lost.append(futures[future])
+        except Exception as e:
+            yield {"file": futures[future], "ok": False, "error": f"El proceso de análisis falló: {e}", "seconds": 0.0}
+
+
+def iter_batch_analysis(paths: Iterable[str], max_workers: Optional[int] = None, executor=None,
+                        profile: str = "accurate") -> Iterator[dict]:
+    """
+    Analiza archivos en un pool de procesos y produce cada resultado en cuanto termina.
+
+    Con `executor` se reutiliza el pool DSP compartido del agente (get_dsp_pool);
+    si no, se crea uno propio para este lote. Un archivo que falla produce un
+    resultado con ok=False y no detiene el resto del lote.
+
+    Si muere un proceso (BrokenProcessPool), el pool queda inservible y se pierden
+    todos los archivos pendientes: se sustituye el pool y se reintentan, primero
+    juntos y, si vuelve a romperse, de uno en uno. Sólo el archivo que rompe el
+    pool analizado en solitario se da por fallido.
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    if executor is None:
+        workers = max(1, min(len(paths), max_workers or os.cpu_count() or 1))
+        pools = [ProcessPoolExecutor(max_workers=workers)]
+
+        def replace_pool(broken):
+            broken.shutdown(wait=False, cancel_futures=True)
+            pools.append(ProcessPoolExecutor(max_workers=workers))
+            return pools[-1]
+
+        try:
+            yield from _iter_with_retries(paths, pools[0], replace_pool, profile)
+        finally:
+            pools[-1].shutdown()
+        return
+    yield from _iter_with_retries(paths, executor, replace_broken_dsp_pool, profile)
+
+
+def _iter_with_retries(paths, executor, replace_pool, profile):
+    remaining = paths
+    for isolate in (False, False, True):
+        broken = []
+        for group in ([p] for p in remaining) if isolate else [remaining]:
+            lost = []
+            yield from _analyze_round(executor, group, profile, lost)
+            if lost:
+                executor = replace_pool(executor)
+                broken += lost
+        remaining = broken
+        if not remaining:
+            return
+    for p in remaining:
+        yield {"file": p, "ok": False, "error": "El proceso de análisis murió al analizar este archivo.", "seconds": 0.0}
+
+
+def analyze_batch(paths: Iterable[str], max_workers: Optional[int] = None, executor=None,
+                  profile: str = "accurate") -> List[dict]:
+    """Versión bloqueante de iter_batch_analysis; devuelve los resultados en el orden de entrada."""
+    paths = list(paths)
+    order = {p: i for i, p in enumerate(paths)}
+    results = iter_batch_analysis(paths, max_workers, executor, profile)
+    return sorted(results, key=lambda r: order.get(r["file"], len(order)))
+
+
+def format_batch_results(results: List[dict], output_format: str = "table") -> str:
+    """Formatea los resultados como tabla Markdown, CSV o JSON."""
+    output_format = output_format.lower()
+    if output_format == "json":
+        return json.dumps(results, ensure_ascii=False, indent=2)
+
+    headers = ["Archivo"] + [label for _, label, _ in FEATURE_COLUMNS] + ["Recomendaciones"]
+    rows = []
+    for r in results:
+        name = os.path.basename(r["file"])
+        if r["ok"]:
+            values = [fmt.format(r["features"][key]) if key in r["features"] else "-"
+                      for key, _, fmt in FEATURE_COLUMNS]
+            notes = "; ".join(r["recommendations"]) or "-"
+        else:
+            values = [""] * len(FEATURE_COLUMNS)
+            notes = f"ERROR: {r['error']}"
+        rows.append([name] + values + [notes])
+
+    if output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(headers)
+        writer.writerows(rows)
+        return buffer.getvalue()
+
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    lines += ["| " + " | ".join(cell.replace("|", "/") for cell in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+@tool
+def analyze_audio_folder(folder_or_glob: str, output_format: str = "table", output_path: Optional[str] = None,
+                         profile: str = DEFAULT_PROFILE) -> str:
+    """
+    Analiza en paralelo todos los archivos de audio de una carpeta (o patrón glob, ej: 'stems/*.wav')
+    y devuelve una tabla compacta de características y recomendaciones por archivo.
+
+    Args:
+        folder_or_glob: Carpeta de la sesión o patrón glob de archivos de audio
+        output_format: 'table' (Markdown), 'csv' o 'json'
+        output_path: Ruta opcional donde guardar el resultado completo
+        profile: 'fast' (por defecto), 'standard' o 'accurate'
+    """
+    try:
+        if output_format.lower() not in ("table", "csv", "json"):
+            return f"Error: Formato '{output_format}' no soportado. Usa 'table', 'csv' o 'json'."
+        get_analysis_profile(profile)
+        paths = resolve_audio_paths(folder_or_glob)
+        if not paths:
+            return f"Error: No se encontraron archivos de audio en '{folder_or_glob}'."
+
+        start = time.perf_counter()
+        with phase("dsp"):
+            results = analyze_batch(paths, executor=get_dsp_pool(), profile=profile)
+        record_bytes_read(sum(r.get("bytes_read", 0) for r in results))
+        for r in results:
+            record_cache_lookup(r.get("cache_hit"))
+        elapsed = time.perf_counter() - start
+        failed = sum(1 for r in results if not r["ok"])
+        cached = sum(1 for r in results if r.get("cache_hit"))
+        formatted = format_batch_results(results, output_format)
+        summary = (
+            f"📁 **Análisis por lotes** (perfil {profile.lower()}): {len(results)} archivos en {elapsed:.1f} s"
+            + (f" ({failed} con error)" if failed else "")
+            + (f", {cached} desde la caché" if cached else "")
+        )
+        if output_path:
+            with open(output_path, "w", encoding="utf-8", newline="") as f:
+                f.write(formatted)
+            return f"{summary}\nResultados guardados en '{output_path}'."
+        return f"{summary}\n\n{formatted}"
+    except Exception as e:
+        return f"Error en el análisis por lotes: {str(e)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análisis por lotes de una carpeta de stems.")
+    parser.add_argument("target", help="Carpeta o patrón glob")
+    parser.add_argument("--format", default="table", choices=["table", "csv", "json"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--profile", default="accurate", choices=["fast", "standard", "accurate"])
+    args = parser.parse_args()
+
+    paths = resolve_audio_paths(args.target, recursive=args.recursive)
+    results = []
+    for i, result in enumerate(iter_batch_analysis(paths, args.workers, profile=args.profile), start=1):
+        status = "ok" if result["ok"] else f"ERROR: {result['error']}"
+        print(f"[{i}/{len(paths)}] {os.path.basename(result['file'])} ({result['seconds']:.1f} s) {status}", flush=True)
+        results.append(result)
+    order = {p: i for i, p in enumerate(paths)}
+    results.sort(key=lambda r: order[r["file"]])
+    print(format_batch_results(results, args.format))
+
+
+if __name__ == "__main__":
+    main()
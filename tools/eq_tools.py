@@ -0,0 +1,361 @@
+import re
+import shutil
+import reapy
+from typing import List
+from langchain.tools import tool
+from config import DRY_RENDER_CACHE_MAX_ENTRIES, EQ_MAX_CANDIDATES
+from core.cache import MemoryLRUCache
+from core.utils import _find_track, _find_fx, _get_param_index, _track_fingerprint, RPR
+from core.models import EQCandidate, EQTarget, ParameterChange
+from core.concurrency import run_on_reaper
+from core.instrumentation import phase, record_file_read
+from core.transaction import reaper_transaction
+from tools.audio_tools import _render_solo, _make_render_dir
+from tools.vst_tools import _apply_parameter_changes, _read_formatted_values
+
+# numpy/scipy (core.eq_model) y soundfile se importan al evaluar, no al arrancar la UI.
+
+# Renders secos por (GUID de pista, inicio, duración, huella de la pista sin el EQ evaluado)
+dry_render_cache = MemoryLRUCache(DRY_RENDER_CACHE_MAX_ENTRIES)
+
+# Parámetros por banda de ReaEQ: 'Freq-Band 1', 'Gain-Low Shelf', 'BW-Band 2', 'Q-Band 3'...
+_BAND_PARAM = re.compile(r"^\s*(freq|frequency|gain|bw|bandwidth|q)\b\W*(.+?)\s*$", re.IGNORECASE)
+_NUMBER = re.compile(r"([-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?)\s*(k)?", re.IGNORECASE)
+# Puntos de la tabla normalizado -> valor físico y pasos de bisección posteriores
+_VALUE_TABLE_POINTS = 65
+_REFINE_STEPS = 10
+_MIN_GAIN_DB = -150.0
+
+_METRIC_LABELS = {"centroid": "Centroide (Hz)", "band_energy": "Energía {low}-{high} Hz (dB)", "lufs": "Loudness (LUFS)"}
+
+
+def _parse_number(text):
+    """Primer número de un valor formateado ('1.5k' -> 1500, '-inf' -> -inf); None si no hay."""
+    if text is None:
+        return None
+    text = text.strip().lower()
+    if text.startswith("-inf"):
+        return float("-inf")
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    value = float(match.group(1))
+    return value * 1000.0 if match.group(2) else value
+
+
+def _eq_bands(param_index):
+    """Bandas del EQ por número (1, 2, ...) con los índices de sus parámetros de frecuencia, ganancia y ancho."""
+    found = {}
+    for i, name in enumerate(param_index.names):
+        match = _BAND_PARAM.match(name)
+        if not match:
+            continue
+        kind, label = match.group(1).lower(), match.group(2)
+        band = found.setdefault(label.lower(), {"label": label})
+        if kind.startswith("freq"):
+            band["freq"] = i
+        elif kind == "gain":
+            band["gain"] = i
+        else:
+            band["width"] = i
+            band["width_kind"] = "q" if kind == "q" else "bw"
+    complete = [band for band in found.values() if "freq" in band]
+    return {n: band for n, band in enumerate(complete, start=1)}
+
+
+def _default_band_type(label, number, count):
+    """Tipo de filtro de la banda según su nombre o, si no lo indica, la disposición por defecto de ReaEQ."""
+    label = label.lower()
+    for words, kind in (
+        (("low shelf", "lowshelf"), "low_shelf"),
+        (("high shelf", "highshelf", "hi shelf"), "high_shelf"),
+        (("high pass", "highpass", "hipass", "low cut"), "high_pass"),
+        (("low pass", "lowpass", "high cut"), "low_pass"),
+        (("notch",), "notch"),
+        (("band pass", "bandpass"), "band_pass"),
+    ):
+        if any(word in label for word in words):
+            return kind
+    # ReaEQ por defecto: estantería grave, bandas de pico y estantería aguda
+    if count > 2 and number == 1:
+        return "low_shelf"
+    if count > 2 and number == count:
+        return "high_shelf"
+    return "peak"
+
+
+def _read_band_settings(track, fx, bands):
+    """Ajustes actuales de cada banda en unidades físicas, a partir de los valores formateados."""
+    from core.eq_model import q_to_octaves
+
+    indices = [band[key] for band in bands.values() for key in ("freq", "gain", "width") if key in band]
+    formatted = _read_formatted_values(track, fx, indices)
+    settings = {}
+    for n, band in bands.items():
+        freq = _parse_number(formatted[band["freq"]])
+        if freq is None or freq <= 0:
+            continue
+        gain = _parse_number(formatted[band["gain"]]) if "gain" in band else 0.0
+        width = _parse_number(formatted[band["width"]]) if "width" in band else None
+        if width and band.get("width_kind") == "q":
+            width = q_to_octaves(width)
+        settings[n] = {
+            "type": _default_band_type(band["label"], n, len(bands)),
+            "freq_hz": freq,
+            "gain_db": max(gain if gain is not None else 0.0, _MIN_GAIN_DB),
+            "bandwidth_oct": width if width and width > 0 else 1.0,
+        }
+    return settings
+
+
+def _format_normalized(track, fx, i, value):
+    result = RPR.TrackFX_FormatParamValueNormalized(track.id, fx.index, i, value, "", 256)
+    return _parse_number(result[5]) if result[0] else None
+
+
+def _value_table(track, fx, param_index, i):
+    """Tabla (normalizado, valor físico) del parámetro; se memoriza en el índice del FX."""
+    table = param_index.value_tables.get(i)
+    if table is None:
+        points = [k / (_VALUE_TABLE_POINTS - 1) for k in range(_VALUE_TABLE_POINTS)]
+        with reapy.inside_reaper():
+            values = [_format_normalized(track, fx, i, v) for v in points]
+        table = [(v, x) for v, x in zip(points, values) if x is not None]
+        param_index.value_tables[i] = table
+    return table
+
+
+def _normalized_for(track, fx, param_index, i, target):
+    """
+    Valor normalizado cuyo valor formateado es `target` (Hz, dB, octavas...).
+
+    Localiza el tramo en la tabla memorizada y lo refina por bisección con
+    TrackFX_FormatParamValueNormalized. Supone un parámetro monótono; fuera de
+    rango devuelve el extremo más cercano. None si el plugin no formatea valores.
+    """
+    table = _value_table(track, fx, param_index, i)
+    if len(table) < 2:
+        return None
+    increasing = table[-1][1] >= table[0][1]
+    ordered = table if increasing else table[::-1]
+    if target <= ordered[0][1]:
+        return ordered[0][0]
+    if target >= ordered[-1][1]:
+        return ordered[-1][0]
+    k = next(k for k in range(len(table) - 1)
+             if min(table[k][1], table[k + 1][1]) <= target <= max(table[k][1], table[k + 1][1]))
+    low, high = table[k][0], table[k + 1][0]
+    with reapy.inside_reaper():
+        for _ in range(_REFINE_STEPS):
+            mid = (low + high) / 2
+            value = _format_normalized(track, fx, i, mid)
+            if value is None:
+                break
+            if (value < target) == increasing:
+                low = mid
+            else:
+                high = mid
+    return (low + high) / 2
+
+
+def _prepare_eq_session(track_name, vst_name, duration):
+    """
+    Fase de E/S con Reaper de evaluate_eq_candidates; se ejecuta con acceso exclusivo.
+
+    Lee las bandas del EQ y sus ajustes actuales y, si no hay un render seco en
+    caché, renderiza la pista con el EQ desactivado (restaurándolo después).
+    """
+    project = reapy.Project()
+    track, error = _find_track(project, track_name)
+    if error or not track:
+        return {"error": error or f"Error: No se encontró la pista '{track_name}'."}
+    fx, error = _find_fx(track, vst_name)
+    if error or not fx:
+        return {"error": error or f"Error: No se encontró el VST '{vst_name}' en la pista '{track.name}'."}
+    param_index = _get_param_index(track, fx)
+    bands = _eq_bands(param_index)
+    if not bands:
+        return {"error": f"Error: '{fx.name}' no expone bandas con parámetros Freq/Gain/BW; no se puede modelar como EQ."}
+
+    start_time = project.cursor_position
+    cache_key = (track.GUID, round(float(start_time), 3), float(duration), _track_fingerprint(track, skip_fx=fx.index))
+    session = {
+        "fx_name": fx.name,
+        "bands": bands,
+        "current": _read_band_settings(track, fx, bands),
+        "cache_key": cache_key,
+        "dry": dry_render_cache.get(cache_key),
+    }
+    if session["dry"] is not None:
+        return session
+
+    render_dir = _make_render_dir(project)
+    enabled = RPR.TrackFX_GetEnabled(track.id, fx.index)
+    try:
+        RPR.TrackFX_SetEnabled(track.id, fx.index, False)
+        try:
+            clip = _render_solo(project, track, start_time, duration, render_dir)
+        finally:
+            RPR.TrackFX_SetEnabled(track.id, fx.index, enabled)
+    except TimeoutError:
+        shutil.rmtree(render_dir, ignore_errors=True)
+        return {"error": "Error: Timeout esperando el renderizado."}
+    except Exception:
+        shutil.rmtree(render_dir, ignore_errors=True)
+        raise
+    session.update(render_dir=render_dir, **clip)
+    return session
+
+
+def _push_eq_curve(track_name, vst_name, bands, current, curve):
+    """Escribe en el EQ las bandas de `curve` que difieren de `current`, convirtiendo a valores normalizados."""
+    from core.eq_model import octaves_to_q
+
+    project = reapy.Project()
+    track, error = _find_track(project, track_name)
+    if error or not track:
+        return [error or f"Error: No se encontró la pista '{track_name}'."]
+    fx, error = _find_fx(track, vst_name)
+    if error or not fx:
+        return [error or f"Error: No se encontró el VST '{vst_name}' en la pista '{track.name}'."]
+    param_index = _get_param_index(track, fx)
+
+    changes, notes = [], []
+    for n, band in curve.items():
+        params = bands[n]
+        for key, field in (("freq", "freq_hz"), ("gain", "gain_db"), ("width", "bandwidth_oct")):
+            if key not in params or band[field] == current[n][field]:
+                continue
+            target = band[field]
+            if key == "width" and params["width_kind"] == "q":
+                target = octaves_to_q(target)
+            value = _normalized_for(track, fx, param_index, params[key], target)
+            name = param_index.names[params[key]]
+            if value is None:
+                notes.append(f"  - ERROR: '{name}' no admite conversión de {target:g} a valor normalizado.")
+            else:
+                changes.append(ParameterChange(parameter_name=name, value=value))
+    if not changes:
+        return notes
+    with reaper_transaction(f"Aplicar curva de EQ en '{fx.name}'") as tx:
+        results = _apply_parameter_changes(track, fx, param_index, changes, fuzzy=False, tx=tx)
+    return results + notes
+
+
+def _candidate_curve(current, candidate):
+    """Curva completa del candidato: los ajustes actuales con sus bandas sustituidas."""
+    curve = {n: dict(band) for n, band in current.items()}
+    for change in candidate.bands:
+        if change.band not in curve:
+            raise ValueError(f"la banda {change.band} no existe en el EQ (bandas: {', '.join(map(str, curve))})")
+        for field in ("type", "freq_hz", "gain_db", "bandwidth_oct"):
+            value = getattr(change, field)
+            if value is not None:
+                curve[change.band][field] = value
+    return curve
+
+
+def _target_label(target):
+    label = _METRIC_LABELS[target.metric]
+    if target.metric == "band_energy":
+        label = label.format(low=f"{target.low_hz or 0:g}", high=f"{target.high_hz:g}" if target.high_hz else "Nyquist")
+    return f"{label} [obj. {target.value:g}]"
+
+
+@tool
+def evaluate_eq_candidates(track_name: str, vst_name: str, candidates: List[EQCandidate], targets: List[EQTarget],
+                           duration: int = 10, apply_best: bool = True) -> str:
+    """
+    Prueba VARIAS curvas de EQ offline sobre un render seco de la pista (con el EQ desactivado),
+    las puntúa contra objetivos medibles y aplica sólo la mejor. Úsala en lugar de alternar
+    `set_multiple_vst_parameters` y `analyze_track_audio` para buscar un ajuste de EQ: un único
+    render sirve para todos los candidatos, y el render seco queda en caché para probar más.
+
+    Args:
+        track_name: Pista a ecualizar
+        vst_name: EQ de la pista (ReaEQ)
+        candidates: Curvas a probar; cada banda indica sólo lo que cambia respecto al EQ actual.
+            `type` sólo afecta al modelo y debe coincidir con el tipo de la banda en ReaEQ.
+        targets: Objetivos, ej: [{"metric": "centroid", "value": 2500},
+            {"metric": "band_energy", "low_hz": 200, "high_hz": 500, "value": -9}, {"metric": "lufs", "value": -18}]
+        duration: Segundos a renderizar desde el cursor
+        apply_best: Si es True (por defecto), escribe en el EQ los valores del mejor candidato
+    """
+    try:
+        from core.eq_model import METRICS
+
+        if not candidates:
+            return "Error: Indica al menos un candidato."
+        if len(candidates) > EQ_MAX_CANDIDATES:
+            return f"Error: Demasiados candidatos ({len(candidates)}); el máximo es {EQ_MAX_CANDIDATES}."
+        if not targets:
+            return "Error: Indica al menos un objetivo."
+        for target in targets:
+            if target.metric not in METRICS:
+                return f"Error: Métrica '{target.metric}' no soportada. Usa una de: {', '.join(METRICS)}."
+
+        session = run_on_reaper(_prepare_eq_session, track_name, vst_name, duration)
+        if "error" in session:
+            return session["error"]
+
+        dry = session["dry"]
+        if dry is None:
+            import soundfile as sf
+            from core.eq_model import DryRender
+
+            try:
+                record_file_read(session["render_path"])
+                audio, sr = sf.read(session["render_path"], dtype="float32", always_2d=True)
+            finally:
+                shutil.rmtree(session["render_dir"], ignore_errors=True)
+            with phase("dsp"):
+                dry = DryRender(audio, sr)
+            dry_render_cache.put(session["cache_key"], dry)
+            render_note = (f"render seco {session['render_time']:.2f} s + espera {session['wait_time']:.2f} s "
+                           f"({session['wait_mode']})")
+        else:
+            render_note = "render seco desde la caché (sin volver a renderizar)"
+
+        current = session["current"]
+        rows = [("EQ actual", current), ("Sin EQ", {})]
+        errors = []
+        for k, candidate in enumerate(candidates, start=1):
+            label = candidate.name or f"Candidato {k}"
+            try:
+                rows.append((label, _candidate_curve(current, candidate)))
+            except ValueError as e:
+                errors.append(f"- {label}: {e}.")
+        with phase("dsp"):
+            evaluation = dry.evaluate(
+                [list(curve.values()) for _, curve in rows],
+                [target.model_dump() for target in targets],
+            )
+
+        ranked = sorted(range(2, len(rows)), key=lambda i: evaluation[i]["score"])
+        headers = ["Curva", "Puntuación"] + [_target_label(t) for t in targets]
+        lines = [
+            f"Evaluación offline de {len(rows) - 2} curvas en '{session['fx_name']}' de '{track_name}' "
+            f"({render_note}; puntuación menor = mejor):",
+            "| " + " | ".join(headers) + " |",
+            "|" + "---|" * len(headers),
+        ]
+        for i in [0, 1] + ranked:
+            values = " | ".join(f"{v:.1f}" for v in evaluation[i]["values"])
+            lines.append(f"| {rows[i][0]} | {evaluation[i]['score']:.2f} | {values} |")
+        lines += errors
+
+        if not ranked:
+            return "\n".join(lines)
+        best = ranked[0]
+        if not apply_best:
+            lines.append(f"Mejor candidato: '{rows[best][0]}' (no aplicado: apply_best=False).")
+        elif evaluation[best]["score"] >= evaluation[0]["score"]:
+            lines.append("Ningún candidato mejora el EQ actual; no se cambió nada.")
+        else:
+            results = run_on_reaper(_push_eq_curve, track_name, vst_name, session["bands"], current, rows[best][1])
+            lines.append(f"Aplicado '{rows[best][0]}' en un único ajuste:")
+            lines += results
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"Error durante la evaluación offline del EQ: {e}"
@@ -1,42 +1,230 @@
 import os
-import librosa
-import numpy as np
-import tempfile
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from concurrent.futures.process import BrokenProcessPool
 from langchain.tools import tool
 from typing import Optional
+from config import (
+    FEATURE_CACHE_DIR, FEATURE_CACHE_MAX_ENTRIES, FEATURE_CACHE_MAX_BYTES, STREAMING_THRESHOLD_MB,
+    SEPARATION_MODEL_PATH, SEPARATION_OUTPUT_DIR, SEPARATION_CHUNK_SECONDS, SEPARATION_OVERLAP_SECONDS
+)
+from core.cache import FeatureCache
+from core.concurrency import run_dsp, get_dsp_pool, dsp_pool_workers, replace_broken_dsp_pool
+from core.instrumentation import phase, record_bytes_read, record_cache_lookup
 
-def extract_features(audio_path):
-    """Extrae características de audio usando librosa."""
-    y, sr = librosa.load(audio_path, sr=None)
-    
-    # Características básicas
-    spectral_centroid = float(np.mean(librosa.feature.spectral_centroid(y=y, sr=sr)))
-    zero_crossing_rate = float(np.mean(librosa.feature.zero_crossing_rate(y)))
-    tempo = float(librosa.feature.tempo(y=y, sr=sr).mean())
-    rms = float(np.mean(librosa.feature.rms(y=y)))
-    
-    # Características adicionales
-    spectral_rolloff = float(np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr)))
-    spectral_bandwidth = float(np.mean(librosa.feature.spectral_bandwidth(y=y, sr=sr)))
-    
-    # MFCCs (coeficientes cepstrales)
-    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-    mfcc_means = [float(np.mean(mfcc)) for mfcc in mfccs]
-    
-    return {
-        "spectral_centroid": spectral_centroid,
-        "zero_crossing_rate": zero_crossing_rate,
-        "tempo": tempo,
-        "rms": rms,
-        "spectral_rolloff": spectral_rolloff,
-        "spectral_bandwidth": spectral_bandwidth,
-        "mfcc_means": mfcc_means[:5]  # Solo los primeros 5 para simplicidad
-    }
-
-def analyze_audio_characteristics(features):
-    """Analiza las características y genera recomendaciones."""
+# librosa, soundfile, core.features y core.separation se importan en el primer análisis, no al arrancar la UI.
+
+# Incrementar cuando cambie el conjunto o el cálculo de las características:
+# invalida todas las entradas de la caché en disco.
+FEATURES_VERSION = "2"
+
+# Perfiles de análisis: frecuencia de muestreo (None = nativa), tamaños de
+# trama y salto, mezcla a mono, muestreo por extractos (segments=0 analiza el
+# archivo entero) y grupos de características calculados (ver
+# core.features.FEATURE_GROUPS). "accurate" reproduce el análisis completo.
+ANALYSIS_PROFILES = {
+    "fast": {
+        "sr": 22050, "n_fft": 1024, "hop_length": 512, "n_mels": 64,
+        "mono": True, "segments": 3, "segment_seconds": 10.0,
+        "features": ("spectral", "rms", "zcr"),
+    },
+    "standard": {
+        "sr": 22050, "n_fft": 2048, "hop_length": 512, "n_mels": 128,
+        "mono": True, "segments": 0, "segment_seconds": 0.0,
+        "features": ("spectral", "rms", "zcr", "mfcc", "tempo"),
+    },
+    "accurate": {
+        "sr": None, "n_fft": 2048, "hop_length": 512, "n_mels": 128,
+        "mono": True, "segments": 0, "segment_seconds": 0.0,
+        "features": ("spectral", "rms", "zcr", "mfcc", "tempo"),
+    },
+}
+DEFAULT_PROFILE = "fast"
+FEATURE_PARAMS = {
+    "n_mfcc": 13,
+    "n_mfcc_kept": 5,
+}
+
+feature_cache = FeatureCache(
+    FEATURE_CACHE_DIR,
+    version=FEATURES_VERSION,
+    max_entries=FEATURE_CACHE_MAX_ENTRIES,
+    max_bytes=FEATURE_CACHE_MAX_BYTES,
+)
+
+def _should_stream(audio_path):
+    """Indica si el audio decodificado superaría el umbral de memoria configurado."""
+    import soundfile as sf
+
+    try:
+        info = sf.info(audio_path)
+    except Exception:
+        # Formato no soportado por soundfile: sólo librosa puede decodificarlo
+        return False
+    decoded_mb = info.frames * info.channels * 4 / (1024 * 1024)
+    return decoded_mb > STREAMING_THRESHOLD_MB
+
+def get_analysis_profile(profile):
+    """Devuelve los parámetros del perfil de análisis `profile`."""
+    try:
+        return ANALYSIS_PROFILES[profile.lower()]
+    except (KeyError, AttributeError):
+        raise ValueError(
+            f"Perfil de análisis '{profile}' no soportado. Usa {', '.join(repr(p) for p in ANALYSIS_PROFILES)}."
+        ) from None
+
+def extract_features(audio_path, use_cache=True, streaming=None, profile="accurate"):
+    """
+    Extrae características de audio, reutilizando la caché en disco si el mismo
+    contenido ya fue analizado con los mismos parámetros.
+
+    `profile` elige el compromiso entre velocidad y precisión (ver
+    ANALYSIS_PROFILES); las características que el perfil no calcula no
+    aparecen en el resultado. Con streaming=None el modo por bloques se activa
+    automáticamente para archivos grandes (ver STREAMING_THRESHOLD_MB) cuando
+    el perfil analiza el archivo entero.
+    """
+    return _extract_features(audio_path, use_cache, streaming, profile)[0]
+
+def _extract_features(audio_path, use_cache=True, streaming=None, profile="accurate"):
+    """
+    extract_features que devuelve además los bytes de audio decodificado que leyó
+    (0 si acierta la caché) y si acertó la caché (None si no se consultó). Se
+    ejecuta en el pool DSP: quien la llama anota ambos con record_bytes_read y
+    record_cache_lookup.
+    """
+    params = get_analysis_profile(profile)
+    if params["segments"]:
+        streaming = False
+    elif streaming is None:
+        streaming = _should_stream(audio_path)
+
+    key = hit = None
+    if use_cache:
+        try:
+            key = feature_cache.make_key(audio_path, {**FEATURE_PARAMS, **params, "streaming": streaming})
+            cached = feature_cache.get(key)
+            if cached is not None:
+                return cached, 0, True
+            hit = False
+        except OSError:
+            key = None
+
+    compute = _compute_features_streaming if streaming else _compute_features
+    features, bytes_read = compute(audio_path, params)
+    if key is not None:
+        feature_cache.put(key, features)
+    return features, bytes_read, hit
+
+def extract_loudness(audio_path, use_cache=True):
+    """
+    Loudness EBU R128 del archivo completo: integrado, LRA y true peak (más el
+    momentáneo y el de corto plazo del final). No depende del perfil: los
+    extractos del perfil fast no sirven para medir loudness integrado ni LRA.
+    """
+    return _extract_loudness(audio_path, use_cache)[0]
+
+def _extract_loudness(audio_path, use_cache=True):
+    """extract_loudness que devuelve además los bytes leídos y el acierto de caché, como _extract_features."""
+    import soundfile as sf
+    from core.loudness import measure_loudness, measure_file_loudness
+
+    key = hit = None
+    if use_cache:
+        try:
+            key = feature_cache.make_key(audio_path, {"measure": "loudness"})
+            cached = feature_cache.get(key)
+            if cached is not None:
+                return cached, 0, True
+            hit = False
+        except OSError:
+            key = None
+
+    try:
+        # Por bloques con soundfile, con memoria acotada
+        loudness = measure_file_loudness(audio_path)
+        info = sf.info(audio_path)
+        bytes_read = info.frames * info.channels * 4
+    except Exception:
+        # Formato no soportado por soundfile: sólo librosa puede decodificarlo
+        import librosa
+        y, sr = librosa.load(audio_path, sr=None, mono=False)
+        loudness = measure_loudness(y.T, sr)
+        bytes_read = y.nbytes
+    if key is not None:
+        feature_cache.put(key, loudness)
+    return loudness, bytes_read, hit
+
+def _segment_offsets(duration, segments, segment_seconds):
+    """Inicios (s) de `segments` extractos repartidos por el archivo; None si no compensa extraer."""
+    if not segments or duration <= segments * segment_seconds:
+        return None
+    return [max(0.0, (i + 0.5) * duration / segments - segment_seconds / 2) for i in range(segments)]
+
+def _compute_features(audio_path, params=None):
+    """
+    Extrae características de audio con el motor de STFT compartido según el perfil.
+    Devuelve (características, bytes de audio decodificado de los extractos leídos).
+    """
+    import librosa
+    from core.features import compute_features, merge_features
+
+    params = params or ANALYSIS_PROFILES["accurate"]
+    offsets = None
+    if params["segments"]:
+        duration = librosa.get_duration(path=audio_path)
+        offsets = _segment_offsets(duration, params["segments"], params["segment_seconds"])
+
+    if offsets is None:
+        excerpts = [librosa.load(audio_path, sr=params["sr"], mono=params["mono"])]
+    else:
+        excerpts = [
+            librosa.load(audio_path, sr=params["sr"], mono=params["mono"],
+                         offset=offset, duration=params["segment_seconds"])
+            for offset in offsets
+        ]
+
+    results, weights = [], []
+    for y, sr in excerpts:
+        # Sin mezcla a mono cada canal se analiza por separado y se promedia
+        for channel in (y if y.ndim > 1 else [y]):
+            results.append(compute_features(
+                channel, sr,
+                n_fft=params["n_fft"],
+                hop_length=params["hop_length"],
+                n_mels=params["n_mels"],
+                n_mfcc=FEATURE_PARAMS["n_mfcc"],
+                n_mfcc_kept=FEATURE_PARAMS["n_mfcc_kept"],
+                features=params["features"],
+            ))
+            weights.append(len(channel))
+    return merge_features(results, weights), sum(y.nbytes for y, _ in excerpts)
+
+def _compute_features_streaming(audio_path, params=None):
+    """
+    Extrae características leyendo el archivo por bloques, con memoria acotada, según el perfil.
+    Devuelve (características, bytes de audio decodificado: el archivo entero en float32).
+    """
+    import soundfile as sf
+    from core.features import compute_features_streaming
+
+    params = params or ANALYSIS_PROFILES["accurate"]
+    info = sf.info(audio_path)
+    features = compute_features_streaming(
+        audio_path,
+        sr=params["sr"],
+        features=params["features"],
+        n_fft=params["n_fft"],
+        hop_length=params["hop_length"],
+        n_mels=params["n_mels"],
+        n_mfcc=FEATURE_PARAMS["n_mfcc"],
+        n_mfcc_kept=FEATURE_PARAMS["n_mfcc_kept"],
+    )
+    return features, info.frames * info.channels * 4
+
+def _cache_label(hit):
+    return "acierto (sin volver a analizar)" if hit else "fallo" if hit is not None else "no consultada"
+
+def analyze_audio_characteristics(features, loudness=None):
+    """Analiza las características (y, si se pasa, el loudness de extract_loudness) y genera recomendaciones."""
     recommendations = []
     
     # Análisis de brillo
@@ -51,37 +239,53 @@ def analyze_audio_characteristics(features):
     elif features["rms"] > 0.3:
         recommendations.append("⚠️ Nivel alto - Riesgo de distorsión, considera reducir ganancia")
     
-    # Análisis de tempo
-    if features["tempo"] < 80:
-        recommendations.append(f"🐌 Tempo lento ({features['tempo']:.1f} BPM) - Ideal para baladas")
-    elif features["tempo"] > 140:
-        recommendations.append(f"🏃 Tempo rápido ({features['tempo']:.1f} BPM) - Ideal para dance/rock")
+    # Análisis de tempo (el perfil fast no lo calcula)
+    tempo = features.get("tempo")
+    if tempo is not None and tempo < 80:
+        recommendations.append(f"🐌 Tempo lento ({tempo:.1f} BPM) - Ideal para baladas")
+    elif tempo is not None and tempo > 140:
+        recommendations.append(f"🏃 Tempo rápido ({tempo:.1f} BPM) - Ideal para dance/rock")
+
+    # Análisis de loudness EBU R128
+    if loudness is not None:
+        if loudness["true_peak"] > -1.0:
+            recommendations.append("🚨 True peak por encima de -1 dBTP - Riesgo de clipping entre muestras, usa un limitador")
+        if loudness["loudness_range"] > 15.0:
+            recommendations.append(f"🎢 Rango de loudness amplio ({loudness['loudness_range']:.1f} LU) - Considera compresión")
     
     return recommendations
 
 @tool
-def analyze_uploaded_audio(audio_path: str) -> str:
+def analyze_uploaded_audio(audio_path: str, profile: str = DEFAULT_PROFILE) -> str:
     """
     Analiza un archivo de audio subido por el usuario y proporciona características detalladas.
     
     Args:
         audio_path: Ruta al archivo de audio subido
+        profile: 'fast' (por defecto: extractos a 22 kHz, sin tempo ni MFCC), 'standard' o 'accurate'
     """
     try:
         if not os.path.exists(audio_path):
             return f"Error: No se encontró el archivo de audio en {audio_path}"
         
-        features = extract_features(audio_path)
-        recommendations = analyze_audio_characteristics(features)
+        features, features_bytes, features_hit = run_dsp(_extract_features, audio_path, True, None, profile)
+        loudness, loudness_bytes, loudness_hit = run_dsp(_extract_loudness, audio_path)
+        record_bytes_read(features_bytes + loudness_bytes)
+        record_cache_lookup(features_hit)
+        record_cache_lookup(loudness_hit)
+        recommendations = analyze_audio_characteristics(features, loudness)
+        tempo = features.get("tempo")
         
         report = f"""
-📊 **Análisis de Audio Completo**
+📊 **Análisis de Audio Completo** (perfil {profile.lower()})
 
 **Características Técnicas:**
 - Centroide Espectral: {features['spectral_centroid']:.2f} Hz
 - Tasa de Cruces por Cero: {features['zero_crossing_rate']:.4f}
-- Tempo: {features['tempo']:.1f} BPM
+- Tempo: {f'{tempo:.1f} BPM' if tempo is not None else 'n/d'}
 - RMS (Energía): {features['rms']:.4f}
+- Loudness Integrado: {loudness['integrated']:.1f} LUFS (LRA {loudness['loudness_range']:.1f} LU)
+- True Peak: {loudness['true_peak']:.1f} dBTP
 - Rolloff Espectral: {features['spectral_rolloff']:.2f} Hz
 - Ancho de Banda Espectral: {features['spectral_bandwidth']:.2f} Hz
 
@@ -91,7 +295,9 @@ def analyze_uploaded_audio(audio_path: str) -> str:
 **Interpretación:**
 - El audio tiene un carácter {'brillante' if features['spectral_centroid'] > 2000 else 'cálido'}
 - Nivel de energía {'alto' if features['rms'] > 0.1 else 'bajo a medio'}
-- Tempo {'lento' if features['tempo'] < 90 else 'medio' if features['tempo'] < 120 else 'rápido'}
+- Tempo {'n/d (usa el perfil standard o accurate)' if tempo is None else 'lento' if tempo < 90 else 'medio' if tempo < 120 else 'rápido'}
+
+- Caché de análisis: características {_cache_label(features_hit)}; loudness {_cache_label(loudness_hit)}.
         """
         
         return report.strip()
@@ -100,15 +306,18 @@ def analyze_uploaded_audio(audio_path: str) -> str:
         return f"Error al analizar el audio: {str(e)}"
 
 @tool
-def suggest_audio_processing(audio_path: str) -> str:
+def suggest_audio_processing(audio_path: str, profile: str = DEFAULT_PROFILE) -> str:
     """
     Sugiere procesamientos específicos basados en el análisis del audio.
     
     Args:
         audio_path: Ruta al archivo de audio
+        profile: 'fast' (por defecto), 'standard' o 'accurate'
     """
     try:
-        features = extract_features(audio_path)
+        features, bytes_read, hit = run_dsp(_extract_features, audio_path, True, None, profile)
+        record_bytes_read(bytes_read)
+        record_cache_lookup(hit)
         
         suggestions = []
         
@@ -128,32 +337,70 @@ def suggest_audio_processing(audio_path: str) -> str:
         else:
             suggestions.append("🌊 **Reverb**: Hall largo para más ambiente")
             
+        suggestions.append(f"- Caché de análisis: {_cache_label(hit)}.")
         return "**Sugerencias de Procesamiento:**\n" + "\n".join(suggestions)
         
     except Exception as e:
         return f"Error al generar sugerencias: {str(e)}"
 
-def separate_audio_placeholder(audio_path: str, output_dir: str = "output_stems") -> str:
+def separate_audio(audio_path: str, output_dir: Optional[str] = None, mode: str = "auto", progress=None) -> str:
     """
-    Placeholder para separación de instrumentos. 
-    En el futuro se puede integrar con Spleeter o similar.
+    Separa el audio en stems (voces, batería, bajo y resto) y los guarda como WAV.
+
+    mode: 'dsp' (máscaras espectrales, sin modelo), 'onnx' (modelo configurado en
+    EQNITY_SEPARATION_MODEL_PATH) o 'auto' (ONNX si hay modelo, si no DSP).
+    `progress(bloques_hechos, bloques_totales)` informa del avance.
     """
-    # Para implementar Spleeter más adelante:
-    # from spleeter.separator import Separator
-    # separator = Separator('spleeter:4stems')
-    # separator.separate_to_file(audio_path, output_dir)
-    
-    return """
-🎵 **Separación de Instrumentos** (Próximamente)
+    from core.separation import separate_file
 
-Esta función separará el audio en:
-- 🎤 Voces
-- 🥁 Batería  
-- 🎸 Bajo
-- 🎹 Otros instrumentos
+    if not os.path.exists(audio_path):
+        return f"Error: No se encontró el archivo de audio en {audio_path}"
+    mode = mode.lower()
+    if mode == "auto":
+        mode = "onnx" if SEPARATION_MODEL_PATH else "dsp"
+    if mode not in ("dsp", "onnx"):
+        return f"Error: Modo de separación '{mode}' no soportado. Usa 'dsp', 'onnx' o 'auto'."
+    output_dir = output_dir or os.path.join(
+        SEPARATION_OUTPUT_DIR, os.path.splitext(os.path.basename(audio_path))[0]
+    )
+    pool = get_dsp_pool()
+    try:
+        with phase("dsp"):
+            result = separate_file(
+                audio_path, output_dir,
+                mode=mode,
+                model_path=SEPARATION_MODEL_PATH or None,
+                chunk_seconds=SEPARATION_CHUNK_SECONDS,
+                overlap_seconds=SEPARATION_OVERLAP_SECONDS,
+                workers=dsp_pool_workers(),
+                executor=pool,
+                progress=progress,
+            )
+        record_bytes_read(result["bytes_read"])
+    except BrokenProcessPool:
+        # Que las siguientes herramientas no hereden el pool roto
+        replace_broken_dsp_pool(pool)
+        return "Error al separar el audio: murió un proceso de separación (¿memoria insuficiente?)."
+    except Exception as e:
+        return f"Error al separar el audio: {str(e)}"
 
-Para implementar completamente, instala Spleeter:
-`pip install spleeter tensorflow`
+    stems = "\n".join(f"- {name}: `{path}`" for name, path in result["stems"].items())
+    speed = result["duration"] / result["seconds"] if result["seconds"] else 0.0
+    return (
+        f"🎵 **Separación de Instrumentos** (modo {result['mode']})\n\n"
+        f"{stems}\n\n"
+        f"{result['duration']:.1f} s de audio en {result['seconds']:.1f} s "
+        f"({speed:.1f}x tiempo real, {result['chunks']} bloques)."
+    )
 
-Por ahora, usa el análisis general para obtener información detallada del audio.
-    """
\ No newline at end of file
+@tool
+def separate_audio_stems(audio_path: str, output_dir: Optional[str] = None, mode: str = "auto") -> str:
+    """
+    Separa un archivo de audio en stems WAV: voces, batería, bajo y resto.
+
+    Args:
+        audio_path: Ruta al archivo de audio
+        output_dir: Carpeta de salida opcional
+        mode: 'auto' (por defecto), 'dsp' u 'onnx'
+    """
+    return separate_audio(audio_path, output_dir, mode)
@@ -1,21 +1,52 @@
+import threading
 import reapy
-from typing import List
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import List, Optional
 from langchain.tools import tool
-from core.utils import _find_track, _find_fx
+from langchain_core.runnables import RunnableConfig
+from core.utils import _find_track, _find_fx, _get_param_index, get_project_index, RPR, PARAM_CATEGORIES
+from core.rpc import rpc_counter
+from core.transaction import reaper_transaction
 from core.models import ParameterChange
 
+# Última lectura de parámetros por (conversación, GUID del FX) para devolver sólo cambios
+_param_snapshots = OrderedDict()
+_PARAM_SNAPSHOT_LIMIT = 256
+_snapshot_lock = threading.Lock()
+
+def _matches_pattern(name, pattern):
+    if any(c in pattern for c in "*?["):
+        return fnmatchcase(name, pattern)
+    return pattern in name
+
 @tool
-def list_tracks_and_vsts() -> str:
+def list_tracks_and_vsts(only_with_fx: bool = True, name_pattern: Optional[str] = None, max_depth: Optional[int] = None) -> str:
     """
     Lista todas las pistas del proyecto de Reaper y los VSTs que contienen.
+
+    Args:
+        only_with_fx: Si es True (por defecto), sólo lista pistas con al menos un VST
+        name_pattern: Filtro opcional por nombre de pista (subcadena, o patrón con * y ?)
+        max_depth: Profundidad máxima de carpetas (0 = sólo pistas de primer nivel)
     """
     try:
         project = reapy.Project()
-        track_info = [
-            f"Pista: '{track.name}' | VSTs: {', '.join([f"'{fx.name}' (clean: '{fx.name.split(': ')[-1]}')" for fx in track.fxs])}"
-            for track in project.tracks if track.fxs
-        ]
-        return "\n".join(track_info) if track_info else "No se encontraron pistas con plugins VST."
+        index = get_project_index(project)
+        pattern = name_pattern.lower() if name_pattern else None
+        track_info = []
+        for entry in index.tracks:
+            if only_with_fx and not entry["fxs"]:
+                continue
+            if max_depth is not None and entry["depth"] > max_depth:
+                continue
+            if pattern and not _matches_pattern(entry["name"].lower(), pattern):
+                continue
+            vsts = ", ".join(f"'{fx['name']}' (clean: '{fx['clean_name']}')" for fx in entry["fxs"])
+            track_info.append(f"Pista: '{entry['name']}' | VSTs: {vsts}")
+        if track_info:
+            return "\n".join(track_info)
+        return "No se encontraron pistas con plugins VST." if only_with_fx else "No se encontraron pistas."
     except Exception as e:
         return f"Error al conectar con Reaper: {e}."
 
@@ -30,7 +61,10 @@ def add_vst_to_track(track_name: str, vst_name: str) -> str:
         if error or track is None:
             return error or f"Error: No se encontró la pista '{track_name}'."
         try:
-            new_fx = track.add_fx(vst_name)
+            with reaper_transaction(f"Añadir '{vst_name}' a '{track.name}'") as tx:
+                new_fx = track.add_fx(vst_name)
+                if new_fx:
+                    tx.record_added_fx(track.id, new_fx.index)
             if new_fx and hasattr(new_fx, "name"):
                 return f"Éxito: Se añadió '{new_fx.name}' a la pista '{track.name}'."
             return f"Error: No se pudo añadir el VST '{vst_name}'. ¿El nombre es correcto y está disponible en Reaper?"
@@ -52,15 +86,33 @@ def remove_vst_from_track(track_name: str, vst_name: str) -> str:
         fx_to_remove, error = _find_fx(track, vst_name)
         if error or fx_to_remove is None:
             return error or f"Error: No se pudo encontrar el VST '{vst_name}' en la pista especificada."
-        fx_to_remove.delete()
+        # Un único cambio: no hay nada que revertir si falla
+        with reaper_transaction(f"Eliminar '{fx_to_remove.name}' de '{track.name}'"):
+            fx_to_remove.delete()
         return f"Éxito: Se eliminó el VST de la pista '{track.name}'."
     except Exception as e:
         return f"Error inesperado al eliminar VST: {e}"
 
+def _thread_id(config):
+    return (config or {}).get("configurable", {}).get("thread_id", "default")
+
+def _read_param_values(track, fx, indices):
+    with reapy.inside_reaper():
+        return {i: RPR.TrackFX_GetParamNormalized(track.id, fx.index, i) for i in indices}
+
+def _read_formatted_values(track, fx, indices):
+    with reapy.inside_reaper():
+        return {i: RPR.TrackFX_GetFormattedParamValue(track.id, fx.index, i, "", 256)[4] for i in indices}
+
 @tool
-def list_vst_parameters(track_name: str, vst_name: str) -> str:
+def list_vst_parameters(track_name: str, vst_name: str, parameters: Optional[List[str]] = None,
+                        full: bool = False, config: RunnableConfig = None) -> str:
     """
     Lista los parámetros de un VST, incluyendo su valor actual formateado.
+
+    La primera llamada en la conversación devuelve todos los parámetros. Las siguientes
+    devuelven sólo los que cambiaron desde la última consulta (con un token de versión).
+    Usa `parameters` para consultar sólo algunos, o full=True para la lista completa.
     """
     try:
         project = reapy.Project()
@@ -70,36 +122,212 @@ def list_vst_parameters(track_name: str, vst_name: str) -> str:
         fx, error = _find_fx(track, vst_name)
         if error or fx is None:
             return error or f"Error: No se encontró el VST '{vst_name}' en la pista especificada."
-        params_list = [f"'{p.name}' (Valor Actual: {p.formatted})" for p in fx.params]
-        return f"Parámetros para '{fx.name}' en '{track.name}':\n" + ", ".join(params_list)
+        param_index = _get_param_index(track, fx)
+        fx_name = fx.name
+
+        notes = []
+        if parameters:
+            indices = []
+            for name in parameters:
+                i = param_index.match(name)
+                if i is None:
+                    notes.append(f"Parámetro '{name}' no encontrado.")
+                elif i not in indices:
+                    indices.append(i)
+        else:
+            indices = list(range(len(param_index.names)))
+
+        key = (_thread_id(config), param_index.fx_guid)
+        values = _read_param_values(track, fx, indices)
+        with _snapshot_lock:
+            snapshot = _param_snapshots.get(key)
+            previous_version = snapshot["version"] if snapshot else None
+            if snapshot and not full and not parameters:
+                shown = [i for i in indices if abs(values[i] - snapshot["values"].get(i, -1.0)) > 1e-6]
+            else:
+                shown = indices
+
+            version = (previous_version or 0) + 1
+            stored = dict(snapshot["values"]) if snapshot else {}
+            stored.update(values)
+            _param_snapshots[key] = {"version": version, "values": stored}
+            _param_snapshots.move_to_end(key)
+            while len(_param_snapshots) > _PARAM_SNAPSHOT_LIMIT:
+                _param_snapshots.popitem(last=False)
+
+        formatted = _read_formatted_values(track, fx, shown)
+        params_list = [f"'{param_index.names[i]}' (Valor Actual: {formatted[i]})" for i in shown]
+        if shown is indices:
+            header = f"Parámetros para '{fx_name}' en '{track_name}' (versión v{version}):"
+        elif params_list:
+            header = (f"Parámetros de '{fx_name}' en '{track_name}' que cambiaron desde "
+                      f"v{previous_version} (versión v{version}; full=True para la lista completa):")
+        else:
+            header = (f"Sin cambios en '{fx_name}' de '{track_name}' desde v{previous_version} "
+                      f"(versión v{version}; full=True para la lista completa).")
+        return "\n".join([header] + ([", ".join(params_list)] if params_list else []) + notes)
     except Exception as e:
         return f"Error inesperado al listar parámetros: {e}"
 
+# Límites de search_vst_parameters: tamaño de página y presupuesto de salida (~4 caracteres por token)
+_SEARCH_MAX_PAGE_SIZE = 25
+_SEARCH_MAX_TOKENS = 1000
+_CHARS_PER_TOKEN = 4
+
+def _read_param_ranges(track, fx, param_index, indices):
+    """Rango formateado (mín., máx.) de cada parámetro; se memoriza en el índice del FX."""
+    missing = [i for i in indices if i not in param_index.ranges]
+    if missing:
+        with reapy.inside_reaper():
+            for i in missing:
+                low = RPR.TrackFX_FormatParamValueNormalized(track.id, fx.index, i, 0.0, "", 256)
+                high = RPR.TrackFX_FormatParamValueNormalized(track.id, fx.index, i, 1.0, "", 256)
+                # Algunos plugins no saben formatear valores arbitrarios: rango desconocido
+                param_index.ranges[i] = (low[5], high[5]) if low[0] and high[0] else None
+    return {i: param_index.ranges[i] for i in indices}
+
 @tool
-def set_multiple_vst_parameters(track_name: str, vst_name: str, changes: List[ParameterChange]) -> str:
+def search_vst_parameters(track_name: str, vst_name: str, query: Optional[str] = None,
+                          category: Optional[str] = None, page: int = 1, page_size: int = 10,
+                          max_tokens: int = 400) -> str:
     """
-    Ajusta MÚLTIPLES parámetros de un VST en una sola llamada.
+    Busca parámetros de un VST por nombre (subcadena o aproximado) y/o categoría, con paginación.
+    Úsala con plugins grandes (sintetizadores, channel strips) en lugar de `list_vst_parameters`.
+    Sin `query` ni `category` devuelve un resumen de categorías con ejemplos.
+
+    Args:
+        query: Texto a buscar, ej: 'cutoff', 'attack', 'band 2 gain'
+        category: 'eq', 'dynamics', 'time', 'modulation', 'synth', 'mix' u 'other'
+        page: Página de resultados (empieza en 1)
+        page_size: Resultados por página (máx. 25)
+        max_tokens: Tope aproximado de la respuesta (máx. 1000)
     """
     try:
         project = reapy.Project()
         track, error = _find_track(project, track_name)
-        if error or not track:
+        if error or track is None:
             return error or f"Error: No se encontró la pista '{track_name}'."
         fx, error = _find_fx(track, vst_name)
-        if error or not fx:
-            return error or f"Error: No se encontró el VST '{vst_name}' en la pista '{track.name}'."
-        results = []
-        for change in changes:
-            for i, p in enumerate(fx.params):
-                if p.name.lower() == change.parameter_name.lower():
-                    if 0.0 <= change.value <= 1.0:
-                        fx.params[i] = change.value
-                        results.append(f"  - '{p.name}' ajustado a {change.value:.2f}.")
-                    else:
-                        results.append(f"  - ERROR: Valor para '{p.name}' fuera de rango (0-1): {change.value}.")
-                    break
-            else:
-                results.append(f"  - ERROR: Parámetro '{change.parameter_name}' no encontrado.")
-        return f"Resultados de los ajustes en '{fx.name}':\n" + "\n".join(results)
+        if error or fx is None:
+            return error or f"Error: No se encontró el VST '{vst_name}' en la pista especificada."
+        param_index = _get_param_index(track, fx)
+        fx_name = fx.name
+        category = category.lower().strip() if category else None
+        valid_categories = [name for name, _ in PARAM_CATEGORIES] + ["other"]
+        if category and category not in valid_categories:
+            return f"Error: Categoría '{category}' no válida. Usa una de: {', '.join(valid_categories)}."
+        max_chars = max(1, min(max_tokens, _SEARCH_MAX_TOKENS)) * _CHARS_PER_TOKEN
+
+        if not query and not category:
+            groups = OrderedDict((name, []) for name in valid_categories)
+            for i, cat in enumerate(param_index.categories):
+                groups[cat].append(param_index.names[i])
+            lines = [f"'{fx_name}' en '{track_name}': {len(param_index.names)} parámetros por categoría "
+                     f"(usa `category` o `query` para ver valores):"]
+            for cat, names in groups.items():
+                if names:
+                    sample = ", ".join(f"'{n}'" for n in names[:4])
+                    lines.append(f"- {cat} ({len(names)}): {sample}{', ...' if len(names) > 4 else ''}")
+            return "\n".join(lines)[:max_chars]
+
+        matches = param_index.search(query, category)
+        if not matches:
+            return f"Ningún parámetro de '{fx_name}' coincide con la búsqueda."
+        page_size = max(1, min(page_size, _SEARCH_MAX_PAGE_SIZE))
+        pages = (len(matches) + page_size - 1) // page_size
+        page = max(1, min(page, pages))
+        shown = matches[(page - 1) * page_size:page * page_size]
+
+        formatted = _read_formatted_values(track, fx, shown)
+        ranges = _read_param_ranges(track, fx, param_index, shown)
+        header = f"Parámetros de '{fx_name}' en '{track_name}' — página {page}/{pages} ({len(matches)} coincidencias):"
+        lines = [header]
+        used = len(header)
+        truncated = False
+        for i in shown:
+            value_range = f" [rango: {ranges[i][0]} … {ranges[i][1]}]" if ranges[i] else ""
+            line = f"- '{param_index.names[i]}' = {formatted[i]}{value_range} ({param_index.categories[i]})"
+            if used + len(line) + 1 > max_chars:
+                truncated = True
+                break
+            lines.append(line)
+            used += len(line) + 1
+        if truncated:
+            lines.append("(Respuesta recortada por max_tokens; reduce page_size o afina la búsqueda.)")
+        elif page < pages:
+            lines.append(f"(Más resultados: page={page + 1}.)")
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Error inesperado al buscar parámetros: {e}"
+
+def _apply_parameter_changes(track, fx, param_index, changes, fuzzy=True, tx=None):
+    """
+    Valida los cambios localmente y aplica los válidos en una única sesión remota.
+
+    Devuelve una línea de resultado por cambio. La comparten set_multiple_vst_parameters
+    y las herramientas que calculan los valores por su cuenta (p. ej. evaluate_eq_candidates).
+
+    Sólo se escriben los nombres exactos o con sinónimos; un nombre aproximado nunca se
+    escribe, con fuzzy=True se devuelve como sugerencia. Si varios cambios apuntan al
+    mismo parámetro con valores distintos, no se aplica ninguno y se informa del conflicto.
+    Con una transacción `tx`, anota los valores anteriores para poder revertirlos.
+    """
+    indices = [param_index.match(change.parameter_name, fuzzy=False) for change in changes]
+    requested = {}
+    for change, i in zip(changes, indices):
+        if i is not None:
+            requested.setdefault(i, []).append(change)
+
+    results, writes = [], {}
+    for change, i in zip(changes, indices):
+        if i is None:
+            suggestion = param_index.closest(change.parameter_name) if fuzzy else None
+            hint = (f" ¿Quisiste decir '{param_index.names[suggestion]}'? No se aplicó; repite el cambio con ese nombre."
+                    if suggestion is not None else "")
+            results.append(f"  - ERROR: Parámetro '{change.parameter_name}' no encontrado.{hint}")
+            continue
+        name = param_index.names[i]
+        resolved = "" if name.lower() == change.parameter_name.lower() else f" (solicitado como '{change.parameter_name}')"
+        if len({c.value for c in requested[i]}) > 1:
+            conflict = ", ".join(f"'{c.parameter_name}' = {c.value}" for c in requested[i])
+            results.append(f"  - ERROR: Valores en conflicto para '{name}' ({conflict}); no se aplicó ninguno.")
+        elif 0.0 <= change.value <= 1.0:
+            writes[i] = change.value
+            results.append(f"  - '{name}' ajustado a {change.value:.2f}{resolved}.")
+        else:
+            results.append(f"  - ERROR: Valor para '{name}' fuera de rango (0-1): {change.value}.")
+
+    if writes:
+        with reapy.inside_reaper():
+            if tx is not None:
+                tx.record_params(track.id, fx.index, writes)
+            for i, value in writes.items():
+                RPR.TrackFX_SetParamNormalized(track.id, fx.index, i, value)
+    return results
+
+@tool
+def set_multiple_vst_parameters(track_name: str, vst_name: str, changes: List[ParameterChange], fuzzy: bool = True) -> str:
+    """
+    Ajusta MÚLTIPLES parámetros de un VST en una sola llamada.
+    Acepta nombres exactos o con sinónimos (ej: 'Frequency Band 1' -> 'Freq-Band 1'). Con fuzzy=True,
+    un nombre sólo aproximado no se aplica: se devuelve el parámetro sugerido para repetir el cambio.
+    """
+    try:
+        with rpc_counter.measure() as rpc:
+            project = reapy.Project()
+            track, error = _find_track(project, track_name)
+            if error or not track:
+                return error or f"Error: No se encontró la pista '{track_name}'."
+            fx, error = _find_fx(track, vst_name)
+            if error or not fx:
+                return error or f"Error: No se encontró el VST '{vst_name}' en la pista '{track.name}'."
+            param_index = _get_param_index(track, fx)
+            fx_name = fx.name
+            with reaper_transaction(f"Ajustar parámetros de '{fx_name}'") as tx:
+                results = _apply_parameter_changes(track, fx, param_index, changes, fuzzy=fuzzy, tx=tx)
+        return (
+            f"Resultados de los ajustes en '{fx_name}':\n" + "\n".join(results)
+            + f"\n(Round-trips a Reaper: {rpc['calls']})"
+        )
     except Exception as e:
-        return f"Error inesperado al ajustar múltiples parámetros: {e}"
\ No newline at end of file
+        return f"Error inesperado al ajustar múltiples parámetros: {e}"
@@ -1,14 +1,14 @@
 import os
-import uuid
 import base64
+from functools import lru_cache
 import gradio as gr
 from styles import theme_aware_css
-from chat import chat_function, clear_conversation, update_language
-from tools.ml_tools import analyze_uploaded_audio, suggest_audio_processing, separate_audio_placeholder
+from chat import chat_function, clear_conversation, restore_conversation
 from i18n.utils import i18n, t
 
+@lru_cache(maxsize=8)
 def get_image_base64(image_path):
-    """Convierte una imagen a base64 para embedder en HTML"""
+    """Convierte una imagen a base64 para embedder en HTML (se codifica una sola vez por ruta)"""
     try:
         with open(image_path, "rb") as img_file:
             return base64.b64encode(img_file.read()).decode()
@@ -24,18 +24,19 @@ def build_ui():
             # Header con soporte dinámico de idioma
             header_html = gr.HTML(elem_id="header-container")
             
-            def update_header():
+            def update_header(lang=None):
                 return f"""
                     <div class="header">
                         {f"<img src='data:image/png;base64,{get_image_base64('assets/eqnity.png')}' alt='EQnity AI Logo' style='height:64px;width:64px;'>"}
                         <div>
-                            <h1>{t('app_title')}</h1>
-                            <p>{t('app_subtitle')}</p>
+                            <h1>{t('app_title', lang)}</h1>
+                            <p>{t('app_subtitle', lang)}</p>
                         </div>
                     </div>
                 """
 
-            session_id = gr.State(value=str(uuid.uuid4()))
+            # Guardado en el navegador: la conversación se recupera tras recargar o reiniciar el servidor
+            session_id = gr.BrowserState("", storage_key="eqnity_session_id")
             
             # Selector de idioma
             with gr.Row():
@@ -95,32 +96,32 @@ def build_ui():
             # Ejemplos - usando un Markdown en lugar de Examples para poder actualizarlo
             examples_markdown = gr.Markdown(elem_id="examples-section")
             
-            def get_examples_html():
+            def get_examples_html(lang=None):
                 return f"""
-### {t('examples_title')}
-- {t('example_1')}
-- {t('example_2')}
-- {t('example_3')}
+### {t('examples_title', lang)}
+- {t('example_1', lang)}
+- {t('example_2', lang)}
+- {t('example_3', lang)}
                 """
             
             # Información adicional
             info_markdown = gr.Markdown(elem_id="info-markdown")
             
-            def update_info_text():
+            def update_info_text(lang=None):
                 return f"""
-### {t('quick_commands')}
-- {t('analysis_cmd')}
-- {t('processing_cmd')}
-- {t('export_cmd')}
+### {t('quick_commands', lang)}
+- {t('analysis_cmd', lang)}
+- {t('processing_cmd', lang)}
+- {t('export_cmd', lang)}
 
-### {t('ml_analysis')}
-- {t('upload_audio_first')}
+### {t('ml_analysis', lang)}
+- {t('upload_audio_first', lang)}
 - Obtén sugerencias de procesamiento basadas en características del audio
-- Separación de instrumentos (próximamente)
+- Separación de instrumentos en stems WAV (voces, batería, bajo y resto)
 
-### {t('tips')}
-{t('tip_specific')}
-{t('tip_thinking')}
+### {t('tips', lang)}
+{t('tip_specific', lang)}
+{t('tip_thinking', lang)}
                 """
 
         # Funciones existentes actualizadas
@@ -130,68 +131,72 @@ def build_ui():
             history.append({"role": "user", "content": message})
             return history, ""
 
-        def stream_response(history, session_id):
+        async def stream_response(history, session_id, lang):
             user_message = history[-1]["content"]
-            for updated_history in chat_function(user_message, history, session_id):
+            async for updated_history in chat_function(user_message, history, session_id, lang):
                 yield updated_history
 
         # Funciones ML actualizadas
-        def handle_analyze_audio(audio_path, history):
+        def handle_analyze_audio(audio_path, history, lang):
             if not audio_path:
-                history.append({"role": "assistant", "content": t('upload_audio_first')})
+                history.append({"role": "assistant", "content": t('upload_audio_first', lang)})
                 return history
             
-            history.append({"role": "user", "content": f"{t('analyze_audio')}: {os.path.basename(audio_path)}"})
+            history.append({"role": "user", "content": f"{t('analyze_audio', lang)}: {os.path.basename(audio_path)}"})
+            from tools.ml_tools import analyze_uploaded_audio
             result = analyze_uploaded_audio.invoke({"audio_path": audio_path})
             history.append({"role": "assistant", "content": result})
             return history
 
-        def handle_suggest_processing(audio_path, history):
+        def handle_suggest_processing(audio_path, history, lang):
             if not audio_path:
-                history.append({"role": "assistant", "content": t('upload_audio_first')})
+                history.append({"role": "assistant", "content": t('upload_audio_first', lang)})
                 return history
             
-            history.append({"role": "user", "content": f"{t('suggest_processing_for')}: {os.path.basename(audio_path)}"})
+            history.append({"role": "user", "content": f"{t('suggest_processing_for', lang)}: {os.path.basename(audio_path)}"})
+            from tools.ml_tools import suggest_audio_processing
             result = suggest_audio_processing.invoke({"audio_path": audio_path})
             history.append({"role": "assistant", "content": result})
             return history
 
-        def handle_separate_audio(audio_path, history):
+        def handle_separate_audio(audio_path, history, lang, progress=gr.Progress()):
             if not audio_path:
-                history.append({"role": "assistant", "content": t('upload_audio_first')})
+                history.append({"role": "assistant", "content": t('upload_audio_first', lang)})
                 return history
             
-            history.append({"role": "user", "content": f"{t('separate_instruments_from')}: {os.path.basename(audio_path)}"})
-            result = separate_audio_placeholder(audio_path)
+            history.append({"role": "user", "content": f"{t('separate_instruments_from', lang)}: {os.path.basename(audio_path)}"})
+            from tools.ml_tools import separate_audio
+            result = separate_audio(
+                audio_path,
+                progress=lambda done, total: progress(done / total, desc=t('separating', lang)),
+            )
             history.append({"role": "assistant", "content": result})
             return history
 
-        # Función para cambiar idioma
-        def change_language(lang_value, history):
-            update_language(lang_value)
-            
+        # Función para cambiar idioma (sólo en esta sesión: el selector guarda el idioma de cada sesión)
+        def change_language(lang, history):
             # Actualizar el mensaje inicial del chatbot
             new_history = [{
                 "role": "assistant",
-                "content": t('welcome_message')
+                "content": t('welcome_message', lang)
             }]
             
             # Retornar todos los componentes actualizados
             return (
-                update_header(),  # header_html
+                update_header(lang),  # header_html
                 new_history,  # chatbot value
-                gr.update(label=t('conversation')),  # chatbot label
-                gr.update(placeholder=t('input_placeholder')),  # msg
-                gr.update(value=t('send')),  # send button
-                gr.update(label=t('audio_track')),  # audio_upload
-                gr.update(value=t('analyze')),  # analyze_btn
-                gr.update(value=t('suggest_processing')),  # suggest_btn
-                gr.update(value=t('separate_instruments')),  # separate_btn
-                gr.update(value=t('clear_conversation')),  # clear button
-                f"### {t('ml_analysis')}",  # ml_analysis_label
-                get_examples_html(),  # examples_markdown
-                update_info_text(),  # info_markdown
-                gr.update(label=t('language'))  # language_selector
+                gr.update(label=t('conversation', lang)),  # chatbot label
+                gr.update(placeholder=t('input_placeholder', lang)),  # msg
+                gr.update(value=t('send', lang)),  # send button
+                gr.update(label=t('audio_track', lang)),  # audio_upload
+                gr.update(value=t('analyze', lang)),  # analyze_btn
+                gr.update(value=t('suggest_processing', lang)),  # suggest_btn
+                gr.update(value=t('separate_instruments', lang)),  # separate_btn
+                gr.update(value=t('clear_conversation', lang)),  # clear button
+                f"### {t('ml_analysis', lang)}",  # ml_analysis_label
+                get_examples_html(lang),  # examples_markdown
+                update_info_text(lang),  # info_markdown
+                gr.update(label=t('language', lang))  # language_selector
             )
 
         # Event handlers existentes
@@ -201,7 +206,7 @@ def build_ui():
             [chatbot, msg]
         ).then(
             stream_response,
-            [chatbot, session_id],
+            [chatbot, session_id, language_selector],
             chatbot
         )
 
@@ -211,13 +216,13 @@ def build_ui():
             [chatbot, msg]
         ).then(
             stream_response,
-            [chatbot, session_id],
+            [chatbot, session_id, language_selector],
             chatbot
         )
 
         clear.click(
             fn=clear_conversation,
-            inputs=[session_id],
+            inputs=[session_id, language_selector],
             outputs=[chatbot],
             queue=False
         )
@@ -225,19 +230,19 @@ def build_ui():
         # Event handlers ML
         analyze_btn.click(
             handle_analyze_audio,
-            inputs=[audio_upload, chatbot],
+            inputs=[audio_upload, chatbot, language_selector],
             outputs=[chatbot]
         )
 
         suggest_btn.click(
             handle_suggest_processing,
-            inputs=[audio_upload, chatbot],
+            inputs=[audio_upload, chatbot, language_selector],
             outputs=[chatbot]
         )
 
         separate_btn.click(
             handle_separate_audio,
-            inputs=[audio_upload, chatbot],
+            inputs=[audio_upload, chatbot, language_selector],
             outputs=[chatbot]
         )
 
@@ -268,5 +273,10 @@ def build_ui():
             fn=lambda: (update_header(), get_examples_html(), update_info_text()),
             outputs=[header_html, examples_markdown, info_markdown]
         )
+        demo.load(
+            fn=restore_conversation,
+            inputs=[session_id, language_selector],
+            outputs=[session_id, chatbot]
+        )
 
     return demo
\ No newline at end of file